@@ -2,11 +2,9 @@ import streamlit as st
 import asyncio
 import nest_asyncio
 import os
-import shutil
-import subprocess
-import sys
-from src.agent import Agent
+from src.agent import Agent, DEFAULT_SYSTEM_PROMPT
 from src.config import config
+from src.jobs import start_ingestion_job, get_current_job
 
 # Apply nest_asyncio to allow nested event loops if necessary
 nest_asyncio.apply()
@@ -33,8 +31,7 @@ if "messages" not in st.session_state:
 
 if "system_prompt" not in st.session_state:
     # Initialize with default prompt from Agent
-    temp_agent = Agent()
-    st.session_state.system_prompt = temp_agent.system_prompt
+    st.session_state.system_prompt = DEFAULT_SYSTEM_PROMPT
 
 if "agent" not in st.session_state:
     st.session_state.agent = Agent(
@@ -43,6 +40,42 @@ if "agent" not in st.session_state:
         embedding_model=st.session_state.embedding_model
     )
 
+def render_ingestion_job(polling: bool = False):
+    """
+    Shows progress of the background ingestion job. While the job runs, this is
+    rendered as a fragment that refreshes itself every second (`polling`).
+    """
+    job = get_current_job()
+    if not job:
+        return
+    snap = job.snapshot()
+
+    if job.running:
+        eta = snap["eta_seconds"]
+        eta_text = f", ~{eta:.0f}s left" if eta is not None else ""
+        st.progress(snap["progress"], text=f"Indexing {snap['done']}/{snap['total']} files{eta_text}")
+        if snap["current_file"]:
+            st.caption(f"Last file: `{os.path.basename(snap['current_file'])}`")
+        if st.button("⏹️ Cancel Indexing"):
+            job.cancel()
+        return
+    if polling:
+        # The job just finished: a full rerun shows the result and stops the timer.
+        # A rebuilt collection reaches the agent through the index alias.
+        st.rerun()
+
+    stats = snap["stats"] or {}
+    summary = (
+        f"{stats.get('updated', 0)} updated, {stats.get('skipped', 0)} unchanged, "
+        f"{stats.get('removed', 0)} removed, {stats.get('embedded', 0)} chunks embedded"
+    )
+    if snap["status"] == "completed":
+        st.success(f"Indexing complete: {summary}")
+    elif snap["status"] == "cancelled":
+        st.warning(f"Indexing cancelled after {snap['done']}/{snap['total']} files: {summary}")
+    else:
+        st.error(f"Indexing failed: {snap['error']}")
+
 # Sidebar
 with st.sidebar:
     st.title("🤖 DevMind AI")
@@ -65,48 +98,35 @@ with st.sidebar:
                 if not os.path.exists(config.DOCS_SOURCE_PATH):
                     os.makedirs(config.DOCS_SOURCE_PATH)
                 
-                saved_count = 0
+                saved_paths = []
                 for uploaded_file in uploaded_files:
                     file_path = os.path.join(config.DOCS_SOURCE_PATH, uploaded_file.name)
                     with open(file_path, "wb") as f:
                         f.write(uploaded_file.getbuffer())
-                    saved_count += 1
-                st.success(f"Saved {saved_count} files!")
+                    saved_paths.append(file_path)
+                st.success(f"Saved {len(saved_paths)} files!")
+
+                # Index only the uploaded files, in the background
+                start_ingestion_job(
+                    files=saved_paths,
+                    embedding_model=st.session_state.embedding_model,
+                    client=st.session_state.agent.tools.chroma_client
+                )
 
         st.divider()
         
         # Ingest Button
         if st.button("🔄 Re-index Knowledge Base"):
-            status_container = st.status("Indexing documents...", expanded=True)
-            try:
-                # Run ingest script as subprocess
-                script_path = os.path.join("scripts", "ingest_data.py")
-                
-                # Pass current embedding model via env var
-                env = os.environ.copy()
-                env["EMBEDDING_MODEL"] = st.session_state.embedding_model
-                
-                result = subprocess.run(
-                    [sys.executable, script_path],
-                    capture_output=True,
-                    text=True,
-                    cwd=os.getcwd(),
-                    env=env
-                )
-                
-                if result.returncode == 0:
-                    status_container.update(label="Indexing Complete!", state="complete", expanded=False)
-                    st.success(f"Knowledge base updated using {st.session_state.embedding_model}!")
-                    with st.expander("See Output"):
-                        st.code(result.stdout)
-                else:
-                    status_container.update(label="Indexing Failed", state="error", expanded=True)
-                    st.error("Error during indexing")
-                    st.code(result.stderr + "\n" + result.stdout)
-                    
-            except Exception as e:
-                status_container.update(label="Error", state="error")
-                st.error(f"Failed to run script: {e}")
+            start_ingestion_job(
+                embedding_model=st.session_state.embedding_model,
+                client=st.session_state.agent.tools.chroma_client
+            )
+
+        job = get_current_job()
+        if job and job.running:
+            st.fragment(render_ingestion_job, run_every=1.0)(polling=True)
+        else:
+            render_ingestion_job()
 
     # --- Settings Section ---
     with st.expander("⚙️ Settings", expanded=False):
@@ -151,12 +171,8 @@ with st.sidebar:
         welcome_msg = f"Hello! I am **DevMind**, your AI assistant powered by `{current_model}`.\n\nI can help you with:\n- Searching your local knowledge base\n- Finding information on the web\n- Generating code and guides\n\nHow can I help you today?"
         
         st.session_state.messages = [{"role": "assistant", "content": welcome_msg}]
-        # Re-initialize agent to clear short-term memory
-        st.session_state.agent = Agent(
-            system_prompt=st.session_state.system_prompt, 
-            model_name=current_model,
-            embedding_model=st.session_state.embedding_model
-        )
+        # Clear short-term memory; models and clients stay loaded
+        st.session_state.agent.reset()
         st.rerun()
 
 # --- Main Chat Interface ---
@@ -177,9 +193,20 @@ if prompt := st.chat_input("How can I help you today?"):
     with st.chat_message("assistant"):
         # Status container for tools
         status_container = st.status("Thinking...", expanded=True)
+        # The answer is rendered while it is generated
+        answer_placeholder = st.empty()
+        streamed = []
         
         async def streamlit_callback(event_type, data):
-            if event_type == "tool_start":
+            if event_type == "token":
+                streamed.append(data["text"])
+                answer_placeholder.markdown("".join(streamed) + "▌")
+            elif event_type == "tool_start":
+                # Text the model wrote before calling a tool moves into the status log
+                if streamed:
+                    status_container.markdown("".join(streamed))
+                    streamed.clear()
+                    answer_placeholder.empty()
                 tool_name = data["name"]
                 status_container.write(f"🔧 **Calling Tool:** `{tool_name}`")
             elif event_type == "tool_end":
@@ -193,8 +220,13 @@ if prompt := st.chat_input("How can I help you today?"):
             # Run async agent
             response = asyncio.run(st.session_state.agent.run(prompt, callback=streamlit_callback))
             
+            steps = st.session_state.agent.step_tokens
+            if steps:
+                status_container.caption(
+                    "Prompt tokens per step: " + ", ".join(str(s["reported"] or s["estimated"]) for s in steps)
+                )
             status_container.update(label="Response Ready!", state="complete", expanded=False)
-            st.markdown(response)
+            answer_placeholder.markdown(response)
             
             # Add assistant response to history
             st.session_state.messages.append({"role": "assistant", "content": response})
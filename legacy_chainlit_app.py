@@ -11,6 +11,7 @@ async def start():
     """
     Initializes the agent session.
     """
+    # Models and clients are shared process-wide, the session only holds its conversation
     agent = Agent()
     cl.user_session.set("agent", agent)
     
@@ -25,23 +26,35 @@ async def main(message: cl.Message):
     Handles incoming user messages.
     """
     agent = cl.user_session.get("agent")
+    # Message receiving the streamed tokens of the current LLM step
+    streamed = None
     
     # Callback function to handle UI updates from the agent
     async def agent_callback(event_type, data):
-        if event_type == "tool_start":
+        nonlocal streamed
+        if event_type == "token":
+            if streamed is None:
+                streamed = cl.Message(content="", author="DevMind")
+            await streamed.stream_token(data["text"])
+
+        elif event_type == "tool_start":
+            # Text the model wrote before calling a tool stays as its own message
+            if streamed is not None:
+                await streamed.send()
+                streamed = None
             tool_name = data["name"]
             # Create a step to show tool execution
             step = cl.Step(name=tool_name, type="tool")
             step.input = str(data["args"])
             await step.send()
             # Store step in session to update it later (optional, simplified here)
-            cl.user_session.set(f"step_{tool_name}", step)
+            cl.user_session.set(f"step_{data.get('id') or tool_name}", step)
             
         elif event_type == "tool_end":
             tool_name = data["name"]
             result = data["result"]
             # Retrieve the step
-            step = cl.user_session.get(f"step_{tool_name}")
+            step = cl.user_session.get(f"step_{data.get('id') or tool_name}")
             if step:
                 step.output = str(result)
                 await step.update()
@@ -49,8 +62,12 @@ async def main(message: cl.Message):
     # Run agent asynchronously
     response = await agent.run(message.content, callback=agent_callback)
     
-    # Send final answer
-    await cl.Message(
-        content=response,
-        author="DevMind"
-    ).send()
+    # Send final answer (errors and non-streamed answers arrive without tokens)
+    if streamed is not None:
+        streamed.content = response
+        await streamed.send()
+    else:
+        await cl.Message(
+            content=response,
+            author="DevMind"
+        ).send()
@@ -6,6 +6,34 @@ from src.utils import setup_logger
 
 logger = setup_logger("Main")
 
+THINKING = "Thinking..."
+
+class StreamPrinter:
+    """Agent callback that prints the answer while it is generated."""
+
+    def __init__(self):
+        self.streaming = False
+
+    async def __call__(self, event_type, data):
+        if event_type == "token":
+            if not self.streaming:
+                self.streaming = True
+                print("\r" + " " * len(THINKING) + "\rAgent: ", end="")
+            print(data["text"], end="", flush=True)
+        elif event_type == "tool_start":
+            # Text written before a tool call stays on screen, the call goes on its own line
+            print("\n" if self.streaming else "\r" + " " * len(THINKING) + "\r", end="")
+            print(f"[tool] {data['name']}")
+            print(THINKING, end="", flush=True)
+            self.streaming = False
+
+    def finish(self, answer: str):
+        if self.streaming:
+            print("\n")
+        else:
+            print(f"\rAgent: {answer}\n")
+        self.streaming = False
+
 async def run_chat(query: str = None):
     logger.info("Initializing DevMind Agent...")
     try:
@@ -16,9 +44,9 @@ async def run_chat(query: str = None):
         
         if query:
             print(f"User: {query}")
-            print("Thinking...", end="", flush=True)
-            ans = await agent.run(query)
-            print(f"\rAgent: {ans}\n")
+            print(THINKING, end="", flush=True)
+            printer = StreamPrinter()
+            printer.finish(await agent.run(query, callback=printer))
             return
 
         while True:
@@ -29,9 +57,9 @@ async def run_chat(query: str = None):
                 if q.lower() in ["exit", "quit"]:
                     break
                 
-                print("Thinking...", end="", flush=True)
-                ans = await agent.run(q)
-                print(f"\rAgent: {ans}\n")
+                print(THINKING, end="", flush=True)
+                printer = StreamPrinter()
+                printer.finish(await agent.run(q, callback=printer))
                 
             except KeyboardInterrupt:
                 print("\nExiting...")
@@ -0,0 +1,73 @@
+import os
+import sys
+import glob
+import time
+import argparse
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import config
+from src.utils import setup_logger, chunk_text, count_tokens
+from src.chunking import chunk_markdown
+
+logger = setup_logger("BenchmarkChunking")
+
+def measure(name: str, chunker, documents: list[str], repeats: int) -> dict:
+    """Runs a chunker over all documents and collects size and speed figures."""
+    chunks = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        chunks = [chunk for doc in documents for chunk in chunker(doc)]
+    elapsed = (time.perf_counter() - started) / repeats
+
+    token_counts = [count_tokens(chunk) for chunk in chunks]
+    total_chars = sum(len(doc) for doc in documents)
+    return {
+        "name": name,
+        "chunks": len(chunks),
+        "total_tokens": sum(token_counts),
+        "avg_tokens": sum(token_counts) / len(token_counts) if token_counts else 0,
+        "max_tokens": max(token_counts, default=0),
+        "seconds": elapsed,
+        "mb_per_sec": (total_chars / 1_000_000) / elapsed if elapsed > 0 else 0.0
+    }
+
+def run_benchmark(path: str, repeats: int):
+    files = glob.glob(f"{path}/**/*.md", recursive=True)
+    documents = []
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8") as f:
+            documents.append(f.read())
+
+    if not documents:
+        logger.error(f"No Markdown files found in {path}")
+        return
+
+    source_tokens = sum(count_tokens(doc) for doc in documents)
+    logger.info(f"Benchmarking {len(documents)} documents ({source_tokens} tokens), {repeats} repeats each.")
+
+    results = [
+        measure("chunk_text (1000/100 chars)", chunk_text, documents, repeats),
+        measure(
+            f"chunk_markdown ({config.CHUNK_MAX_TOKENS} tokens)",
+            lambda doc: [chunk.text for chunk in chunk_markdown(doc)],
+            documents,
+            repeats
+        )
+    ]
+
+    print(f"\n{'Chunker':<32} {'Chunks':>8} {'Tokens':>9} {'Dup %':>7} {'Avg':>7} {'Max':>6} {'MB/s':>8}")
+    for r in results:
+        duplication = (r["total_tokens"] - source_tokens) / source_tokens * 100 if source_tokens else 0.0
+        print(
+            f"{r['name']:<32} {r['chunks']:>8} {r['total_tokens']:>9} {duplication:>6.1f}% "
+            f"{r['avg_tokens']:>7.1f} {r['max_tokens']:>6} {r['mb_per_sec']:>8.2f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare chunk_text with the Markdown-aware chunker")
+    parser.add_argument("--path", type=str, default=config.DOCS_SOURCE_PATH, help="Directory with .md files")
+    parser.add_argument("--repeats", type=int, default=3, help="Timing repeats per chunker")
+    args = parser.parse_args()
+    run_benchmark(args.path, args.repeats)
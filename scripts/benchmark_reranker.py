@@ -0,0 +1,117 @@
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import config
+from src.utils import setup_logger
+from src.loaders import SUPPORTED_EXTENSIONS, load_chunks
+from src.reranker import BACKENDS, BatchingReranker, load_cross_encoder
+
+logger = setup_logger("BenchmarkReranker")
+
+def build_queries(path: str, queries: int, candidates: int, seed: int) -> list[tuple[str, list[str]]]:
+    """
+    Builds retrieval-like workloads from the knowledge base: the query is the
+    opening words of a chunk, the candidates are that chunk plus random others.
+    """
+    passages = []
+    for ext in SUPPORTED_EXTENSIONS:
+        for file_path in glob.glob(f"{path}/**/*{ext}", recursive=True):
+            passages.extend(chunk.text for chunk in load_chunks(file_path))
+    if len(passages) < candidates:
+        return []
+
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(queries):
+        docs = rng.sample(passages, candidates)
+        words = docs[0].split()
+        start = rng.randrange(max(1, len(words) - 12))
+        workload.append((" ".join(words[start:start + 12]), docs))
+    return workload
+
+def rank(scores) -> np.ndarray:
+    return np.argsort(np.argsort(-np.asarray(scores)))
+
+def agreement(reference: list, scores: list) -> dict:
+    """Top-1 / top-3 agreement and Spearman correlation with the reference ranking."""
+    top1, top3, spearman = [], [], []
+    for ref, cand in zip(reference, scores):
+        ref_order, cand_order = np.argsort(-np.asarray(ref)), np.argsort(-np.asarray(cand))
+        top1.append(ref_order[0] == cand_order[0])
+        top3.append(len(set(ref_order[:3]) & set(cand_order[:3])) / 3)
+        spearman.append(np.corrcoef(rank(ref), rank(cand))[0, 1])
+    return {"top1": float(np.mean(top1)), "top3": float(np.mean(top3)), "spearman": float(np.nanmean(spearman))}
+
+def measure(backend: str, workload: list, threads: int, max_length: int, concurrency: int) -> dict:
+    encoder = load_cross_encoder(backend=backend, threads=threads, max_length=max_length)
+    pairs = [[[query, doc] for doc in docs] for query, docs in workload]
+    encoder.predict(pairs[0], show_progress_bar=False)  # warm-up
+
+    latencies, scores = [], []
+    for query_pairs in pairs:
+        started = time.perf_counter()
+        scores.append(encoder.predict(query_pairs, batch_size=config.RERANKER_BATCH_SIZE, show_progress_bar=False))
+        latencies.append(time.perf_counter() - started)
+
+    # Concurrent queries through the batching wrapper, as ToolSet serves them
+    reranker = BatchingReranker(encoder)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(reranker.predict, pairs))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "backend": backend,
+        "scores": scores,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "batched_qps": len(pairs) / elapsed if elapsed > 0 else 0.0
+    }
+
+def run_benchmark(path: str, backends: list[str], queries: int, candidates: int, threads: int, max_length: int, concurrency: int):
+    workload = build_queries(path, queries, candidates, seed=1)
+    if not workload:
+        logger.error(f"Not enough chunks in {path} to build {candidates} candidates per query")
+        return
+    logger.info(f"Benchmarking {len(workload)} queries x {candidates} candidates, threads={threads or 'default'}, max_length={max_length}.")
+
+    results = []
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        try:
+            results.append(measure(backend, workload, threads, max_length, concurrency))
+        except Exception as e:
+            logger.error(f"Backend {backend} failed: {e}")
+
+    if not results or results[0]["backend"] != "torch":
+        logger.error("The torch reference run failed, cannot compare rankings.")
+        return
+    reference = results[0]["scores"]
+    print(f"\n{'Backend':<12} {'p50 ms':>8} {'p95 ms':>8} {'Speedup':>8} {f'QPS x{concurrency}':>10} {'Top-1':>7} {'Top-3':>7} {'Spearman':>9}")
+    for r in results:
+        agree = agreement(reference, r["scores"])
+        print(
+            f"{r['backend']:<12} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {results[0]['p50_ms'] / r['p50_ms']:>7.2f}x "
+            f"{r['batched_qps']:>10.1f} {agree['top1']:>7.1%} {agree['top3']:>7.1%} {agree['spearman']:>9.3f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare reranker engines against the PyTorch CrossEncoder")
+    parser.add_argument("--path", type=str, default=config.DOCS_SOURCE_PATH, help="Knowledge base directory")
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx", "onnx-int8"], choices=BACKENDS)
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries")
+    parser.add_argument("--candidates", type=int, default=10, help="Candidates per query (as in retrieve_knowledge)")
+    parser.add_argument("--threads", type=int, default=config.RERANKER_THREADS, help="Inference threads (0 = default)")
+    parser.add_argument("--max-length", type=int, default=config.RERANKER_MAX_LENGTH, help="Max tokens per pair")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel queries for the batching run")
+    args = parser.parse_args()
+    run_benchmark(args.path, args.backends, args.queries, args.candidates, args.threads, args.max_length, args.concurrency)
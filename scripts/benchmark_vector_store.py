@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import config
+from src.utils import setup_logger
+from src.vector_store import open_vector_client
+
+logger = setup_logger("BenchmarkVectorStore")
+
+COLLECTION = "benchmark"
+# chroma, or the NumPy backend with a stored encoding, with or without float32 re-scoring
+VARIANTS = ("chroma", "float16", "int8", "float16-norescore", "int8-norescore")
+
+def parse_variant(variant: str) -> tuple[str, str, bool]:
+    """Returns (backend, dtype, rescore)."""
+    if variant == "chroma":
+        return "chroma", "float32", False
+    dtype, _, suffix = variant.partition("-")
+    return "numpy", dtype, suffix != "norescore"
+
+def rss_mb() -> float:
+    """Resident memory of this process (Linux), 0 where /proc is not available."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+def live_vectors() -> np.ndarray:
+    """Embeddings of the live index, read page by page."""
+    from src.index_alias import live_collection_name
+    collection = open_vector_client().get_collection(name=live_collection_name())
+    pages = []
+    for offset in range(0, collection.count(), 1000):
+        pages.append(np.asarray(collection.get(limit=1000, offset=offset, include=["embeddings"])["embeddings"]))
+    return np.concatenate(pages).astype(np.float32) if pages else np.empty((0, 0), dtype=np.float32)
+
+def synthetic_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    """Unit vectors around a few hundred topic centres, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(1, count // 500), dim))
+    vectors = centres[rng.integers(len(centres), size=count)] + 0.5 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Stored vectors with noise, so the nearest neighbours are not trivially the source row."""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(len(vectors), size=count)] + 0.3 * rng.normal(size=(count, vectors.shape[1])) / np.sqrt(vectors.shape[1])
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list[set]:
+    truth = []
+    for query in queries:
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        truth.append(set(np.argpartition(distances, k)[:k].tolist()))
+    return truth
+
+def build(variant: str, path: str, vectors: np.ndarray, batch: int = 4096) -> tuple[float, dict]:
+    """Indexes the vectors, returns (seconds, bytes per stored array of the NumPy backend)."""
+    backend, dtype, rescore = parse_variant(variant)
+    # The encoding is fixed when the collection is created
+    config.NUMPY_STORE_DTYPE, config.NUMPY_RESCORE_ENABLED = dtype, rescore
+    client = open_vector_client(backend, path)
+    collection = client.get_or_create_collection(name=COLLECTION)
+    started = time.perf_counter()
+    for start in range(0, len(vectors), batch):
+        end = min(start + batch, len(vectors))
+        collection.upsert(
+            ids=[str(i) for i in range(start, end)],
+            embeddings=vectors[start:end],
+            documents=[f"chunk {i}" for i in range(start, end)]
+        )
+    seconds = time.perf_counter() - started
+    return seconds, collection.storage_bytes() if backend == "numpy" else {}
+
+def measure(variant: str, path: str, queries: np.ndarray, truth: list[set], k: int) -> dict:
+    """Runs in a fresh process, so resident memory reflects only this variant."""
+    before = rss_mb()
+    collection = open_vector_client(parse_variant(variant)[0], path).get_collection(name=COLLECTION)
+    collection.query(query_embeddings=queries[:1], n_results=k, include=["distances"])  # warm-up, loads the index
+    loaded = rss_mb()
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=["distances"])
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len({int(i) for i in result["ids"][0]} & expected) / k)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "rss_mb": max(loaded, rss_mb()) - before,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "recall": float(np.mean(recalls))
+    }
+
+def run_benchmark(variants: list[str], chunks: int, dim: int, queries: int, k: int, from_index: bool):
+    vectors = live_vectors() if from_index else synthetic_vectors(chunks, dim, seed=1)
+    if len(vectors) <= k:
+        logger.error(f"Need more than {k} vectors, got {len(vectors)}")
+        return
+    query_vectors = make_queries(vectors, queries, seed=2)
+    truth = exact_top_k(vectors, query_vectors, k)
+    logger.info(f"Benchmarking {len(vectors)} vectors x {vectors.shape[1]} dims, {queries} queries, top-{k}.")
+    # What every query scans with full float32 vectors
+    float32_mb = vectors.nbytes / (1024 * 1024)
+
+    workdir = tempfile.mkdtemp(prefix="devmind_vector_bench_")
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for variant in variants:
+            path = os.path.join(workdir, variant)
+            try:
+                seconds, arrays = build(variant, path, vectors)
+                with context.Pool(1) as pool:
+                    stats = pool.apply(measure, (variant, path, query_vectors, truth, k))
+            except Exception as e:
+                logger.error(f"Variant {variant} failed: {e}")
+                continue
+            # The float32 originals are only read for the shortlist
+            scan_mb = sum(size for name, size in arrays.items() if name != "full") / (1024 * 1024) if arrays else None
+            results.append({"variant": variant, "build_s": seconds, "disk_mb": dir_size_mb(path), "scan_mb": scan_mb, **stats})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\nfloat32 vectors: {float32_mb:.1f} MB. Saved and lost are relative to exact float32 search.")
+    print(
+        f"{'Variant':<18} {'Build s':>8} {'Disk MB':>8} {'Scan MB':>8} {'Saved':>7} {'RSS MB':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {f'Recall@{k}':>10} {'Lost':>7}"
+    )
+    for r in results:
+        scan = f"{r['scan_mb']:>8.2f} {1 - r['scan_mb'] / float32_mb:>7.1%}" if r["scan_mb"] is not None else f"{'-':>8} {'-':>7}"
+        print(
+            f"{r['variant']:<18} {r['build_s']:>8.1f} {r['disk_mb']:>8.1f} {scan} {r['rss_mb']:>8.1f} "
+            f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['recall']:>10.1%} {1 - r['recall']:>7.1%}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare vector stores and embedding encodings on latency, memory and recall")
+    parser.add_argument("--variants", nargs="+", default=["chroma", "float16", "int8", "int8-norescore"], choices=VARIANTS)
+    parser.add_argument("--chunks", type=int, default=100000, help="Synthetic vectors to index")
+    parser.add_argument("--dim", type=int, default=768, help="Synthetic vector dimension (nomic-embed-text: 768)")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--from-index", action="store_true", help="Use the embeddings of the live index instead of synthetic ones")
+    parser.add_argument("--block-rows", type=int, default=config.NUMPY_SEARCH_BLOCK_ROWS, help="Rows per block in the NumPy search")
+    args = parser.parse_args()
+    os.environ["NUMPY_SEARCH_BLOCK_ROWS"] = str(args.block_rows)
+    config.NUMPY_SEARCH_BLOCK_ROWS = args.block_rows
+    run_benchmark(args.variants, args.chunks, args.dim, args.queries, args.k, args.from_index)
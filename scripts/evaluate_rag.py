@@ -6,6 +6,7 @@ from ragas import evaluate
 from ragas.metrics._context_precision import ContextPrecision
 from ragas.metrics._faithfulness import Faithfulness
 from ragas.metrics._answer_relevance import AnswerRelevancy
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 
 # Add project root to sys.path
@@ -13,13 +14,31 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.config import config
 from src.utils import setup_logger
+from src.embedding_cache import cached_embeddings, get_embedding_cache
 
 logger = setup_logger("Evaluator")
 
+class CachedOllamaEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by the shared on-disk embedding cache.
+    Like OllamaEmbeddings, it uses Ollama's /api/embed endpoint.
+    """
+    def __init__(self, model: str):
+        self.model = model
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return cached_embeddings(texts, model=self.model)
+
+    def embed_query(self, text: str) -> list[float]:
+        return cached_embeddings([text], model=self.model)[0]
+
 def get_evaluator_models():
     # LangChain ChatOllama uses 'base_url'
     llm = ChatOllama(model=config.LLM_MODEL, base_url=config.native_ollama_url) 
-    embeddings = OllamaEmbeddings(model=config.EMBEDDING_MODEL, base_url=config.native_ollama_url)
+    if get_embedding_cache():
+        embeddings = CachedOllamaEmbeddings(model=config.EMBEDDING_MODEL)
+    else:
+        embeddings = OllamaEmbeddings(model=config.EMBEDDING_MODEL, base_url=config.native_ollama_url)
     return llm, embeddings
 
 def run_evaluation():
@@ -62,6 +81,9 @@ def run_evaluation():
         df_results = results.to_pandas()
         df_results.to_csv(output_file, index=False)
         logger.info(f"Report saved to {output_file}")
+
+        if get_embedding_cache():
+            get_embedding_cache().log_stats()
         
     except Exception as e:
         logger.error(f"Error during evaluation: {e}")
@@ -1,73 +1,61 @@
 import os
 import sys
-import glob
-import chromadb
+import argparse
 from tqdm import tqdm
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.config import config
-from src.utils import setup_logger, get_ollama_embedding, chunk_text
+from src.ingestion import ingest_documents
+from src.watcher import KnowledgeBaseWatcher
+from src.vector_store import VECTOR_BACKENDS
 
-logger = setup_logger("Ingest")
-
-def ingest_documents():
-    logger.info(f"Connecting to ChromaDB at {config.CHROMA_DB_PATH}...")
-    try:
-        client = chromadb.PersistentClient(path=config.CHROMA_DB_PATH)
-        collection = client.get_or_create_collection(name="devmind_docs")
-    except Exception as e:
-        logger.critical(f"Failed to connect to ChromaDB: {e}")
-        return
-
-    logger.info(f"Scanning documents in {config.DOCS_SOURCE_PATH}...")
-    files = glob.glob(f"{config.DOCS_SOURCE_PATH}/**/*.md", recursive=True)
-    
-    logger.info(f"Found {len(files)} documents.")
-    
-    for file_path in tqdm(files, desc="Processing files"):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            if not content.strip():
-                logger.warning(f"Skipping empty file: {file_path}")
-                continue
-                
-            chunks = chunk_text(content)
-            
-            ids = []
-            embeddings = []
-            documents = []
-            metadatas = []
-            
-            for i, chunk in enumerate(chunks):
-                vector = get_ollama_embedding(chunk)
-                if not vector:
-                    logger.warning(f"Failed to get embedding for chunk {i} in {file_path}")
-                    continue
-                    
-                # Unique ID
-                file_name = os.path.basename(file_path)
-                chunk_id = f"{file_name}_{i}"
-                
-                ids.append(chunk_id)
-                embeddings.append(vector)
-                documents.append(chunk)
-                metadatas.append({"source": file_path, "chunk_index": i})
-            
-            if ids:
-                collection.upsert(
-                    ids=ids,
-                    embeddings=embeddings,
-                    documents=documents,
-                    metadatas=metadatas
-                )
-        except Exception as e:
-            logger.error(f"Error processing file {file_path}: {e}")
-            
-    logger.info(f"Ingestion complete! Total documents in DB: {collection.count()}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Index the knowledge base into the vector store")
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE, help="Chunks per embedding request")
+    parser.add_argument("--concurrency", type=int, default=config.INGEST_CONCURRENCY, help="Embedding requests in flight")
+    parser.add_argument("--max-retries", type=int, default=config.INGEST_MAX_RETRIES, help="Attempts per failed batch")
+    parser.add_argument("--workers", type=int, default=config.INGEST_WORKERS, help="Processes for reading and chunking (0 = in-process)")
+    parser.add_argument("--queue-size", type=int, default=config.INGEST_QUEUE_SIZE, help="Max files or file parts buffered between stages")
+    parser.add_argument("--part-size", type=int, default=config.INGEST_PART_CHUNKS, help="Chunks of one file sent to the embed stage at a time")
+    parser.add_argument("--upsert-batch-size", type=int, default=config.INGEST_UPSERT_BATCH_SIZE, help="Chunks per vector store upsert")
+    parser.add_argument("--sequential", action="store_true", help="Embed one chunk per request (legacy mode)")
+    parser.add_argument("--verify", action="store_true", help="Check the first batched vector against the single-call path")
+    parser.add_argument("--backend", choices=VECTOR_BACKENDS, default=config.VECTOR_BACKEND, help="Vector store to index into")
+    parser.add_argument("--full", action="store_true", help="Rebuild into a new collection generation and swap it in when done")
+    parser.add_argument("--watch", action="store_true", help="Keep running and re-index files as they change")
+    parser.add_argument("--debounce", type=float, default=config.WATCH_DEBOUNCE_SECONDS, help="Seconds a file must be quiet before re-indexing")
+    parser.add_argument("--poll-interval", type=float, default=config.WATCH_POLL_INTERVAL, help="Seconds between scans in polling mode")
+    parser.add_argument("--polling", action="store_true", help="Poll for changes instead of using inotify")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    ingest_documents()
+    args = parse_args()
+    config.VECTOR_BACKEND = args.backend
+    pipeline_options = dict(
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        part_size=args.part_size,
+        upsert_batch_size=args.upsert_batch_size,
+        sequential=args.sequential,
+        verify=args.verify
+    )
+
+    if args.watch:
+        watcher = KnowledgeBaseWatcher(
+            debounce=args.debounce,
+            poll_interval=args.poll_interval,
+            force_polling=args.polling,
+            **pipeline_options
+        )
+        watcher.run()
+    else:
+        ingest_documents(
+            full=args.full,
+            progress=lambda items: tqdm(items, desc="Processing file parts"),
+            **pipeline_options
+        )
@@ -1,38 +1,20 @@
 import json
-from openai import OpenAI
-from langfuse.openai import OpenAI as LangfuseOpenAI
+import time
+import asyncio
+import threading
+from openai import AsyncOpenAI
+from langfuse.openai import AsyncOpenAI as LangfuseAsyncOpenAI
 from langfuse import observe
 from src.config import config
 from src.utils import setup_logger
+from src.registry import get_or_create
 from .tools import ToolSet, TOOLS_SCHEMA
 from .tracker import RagasTracker
+from .history import HistoryManager, prompt_tokens
 
 logger = setup_logger("Agent")
 
-class Agent:
-    def __init__(self, system_prompt: str = None, model_name: str = None, embedding_model: str = None):
-        self.model_name = model_name if model_name else config.LLM_MODEL
-        self.embedding_model = embedding_model if embedding_model else config.EMBEDDING_MODEL
-        logger.info(f"Initializing Agent with LLM: {self.model_name}, Embedding: {self.embedding_model}")
-        
-        # Check if LangFuse is configured
-        if config.LANGFUSE_PUBLIC_KEY and config.LANGFUSE_SECRET_KEY:
-            logger.info("LangFuse credentials found. Initializing LangFuse client.")
-            self.client = LangfuseOpenAI(
-                base_url=config.OLLAMA_BASE_URL,
-                api_key="ollama"
-            )
-        else:
-            logger.warning("LangFuse credentials NOT found. Using standard OpenAI client.")
-            self.client = OpenAI(
-                base_url=config.OLLAMA_BASE_URL,
-                api_key="ollama"
-            )
-            
-        self.tools = ToolSet(embedding_model=self.embedding_model)
-        self.tracker = RagasTracker()
-        
-        default_prompt = """You are DevMind, an expert AI assistant strictly focused on software development and technical tasks.
+DEFAULT_SYSTEM_PROMPT = """You are DevMind, an expert AI assistant strictly focused on software development and technical tasks.
         
         Your capabilities include:
         - Writing, debugging, and explaining code.
@@ -57,16 +39,67 @@ class Agent:
         5. When asked to write code or guides, create high-quality markdown artifacts using the `save_solution` tool.
         6. Be concise, professional, and technically accurate.
         """
+
+def create_llm_client():
+    if config.LANGFUSE_PUBLIC_KEY and config.LANGFUSE_SECRET_KEY:
+        logger.info("LangFuse credentials found. Initializing LangFuse client.")
+        return LangfuseAsyncOpenAI(
+            base_url=config.OLLAMA_BASE_URL,
+            api_key="ollama"
+        )
+    logger.warning("LangFuse credentials NOT found. Using standard OpenAI client.")
+    return AsyncOpenAI(
+        base_url=config.OLLAMA_BASE_URL,
+        api_key="ollama"
+    )
+
+# Async clients keep their connections on the event loop that opened them, so every
+# loop (the Chainlit server, each asyncio.run of Streamlit and the CLI) gets its own:
+# event loop -> client
+_llm_clients = {}
+_llm_clients_lock = threading.Lock()
+
+def get_llm_client():
+    """The LLM client shared by every Agent on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _llm_clients_lock:
+        client = _llm_clients.get(loop)
+        if client is None:
+            for closed in [other for other in _llm_clients if other.is_closed()]:
+                del _llm_clients[closed]
+            client = _llm_clients[loop] = create_llm_client()
+    return client
+
+class Agent:
+    def __init__(self, system_prompt: str = None, model_name: str = None, embedding_model: str = None):
+        self.model_name = model_name if model_name else config.LLM_MODEL
+        self.embedding_model = embedding_model if embedding_model else config.EMBEDDING_MODEL
+        logger.info(f"Initializing Agent with LLM: {self.model_name}, Embedding: {self.embedding_model}")
         
-        self.system_prompt = system_prompt if system_prompt else default_prompt
+        # Clients and models are shared process-wide; an Agent only owns its conversation
+        self.tools = get_or_create(("toolset", self.embedding_model), lambda: ToolSet(embedding_model=self.embedding_model))
+        self.tracker = RagasTracker()
+        self.history_manager = HistoryManager()
         
+        self.system_prompt = system_prompt if system_prompt else DEFAULT_SYSTEM_PROMPT
+        self.reset()
+
+    @property
+    def client(self):
+        return get_llm_client()
+
+    def reset(self):
+        """Starts a new conversation; shared clients and models stay loaded."""
         self.history = [{"role": "system", "content": self.system_prompt}]
         self.current_contexts = []
+        # Prompt tokens of each LLM request of the last run
+        self.step_tokens = []
 
     @observe(name="Agent.run")
     async def run(self, user_query: str, callback=None) -> str:
         self.history.append({"role": "user", "content": user_query})
         self.current_contexts = []
+        self.step_tokens = []
         
         max_steps = 10
         step = 0
@@ -74,53 +107,32 @@ class Agent:
         while step < max_steps:
             step += 1
             try:
-                # Synchronous call in async context (Ollama is fast enough locally)
-                # Ideally, we should use AsyncOpenAI, but for now we keep it simple
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=self.history,
-                    tools=TOOLS_SCHEMA,
-                    tool_choice="auto",
-                    name="LLM-Generation" # LangFuse specific
-                )
-                
-                message = response.choices[0].message
+                self.history = self.history_manager.compact(self.history)
+                estimated = prompt_tokens(self.history)
+                message, reported = await self._stream_completion(callback)
+                self.step_tokens.append({"step": step, "estimated": estimated, "reported": reported})
+                logger.info(f"Step {step}: {reported or estimated} prompt tokens ({'reported' if reported else 'estimated'}).")
                 
-                if message.tool_calls:
+                if message.get("tool_calls"):
                     self.history.append(message)
                     
-                    for tool_call in message.tool_calls:
-                        func_name = tool_call.function.name
-                        args_str = tool_call.function.arguments
-                        try:
-                            args = json.loads(args_str)
-                        except json.JSONDecodeError:
-                            logger.error(f"JSON Decode Error for args: {args_str}")
-                            args = {}
-
-                        logger.info(f"Tool Call: {func_name}")
-                        
-                        # UI Callback for Tool Start
-                        if callback:
-                            await callback("tool_start", {"name": func_name, "args": args})
-
-                        result = self._execute_tool(func_name, args)
-                        
-                        # UI Callback for Tool End
-                        if callback:
-                            await callback("tool_end", {"name": func_name, "result": result})
-
+                    # Independent calls run concurrently, results keep the call order
+                    limit = asyncio.Semaphore(max(1, config.TOOL_CALL_CONCURRENCY))
+                    results = await asyncio.gather(*(
+                        self._run_tool_call(tool_call, limit, callback) for tool_call in message["tool_calls"]
+                    ))
+                    for tool_call, (func_name, result) in zip(message["tool_calls"], results):
                         if func_name in ["retrieve_knowledge", "web_search"]:
                             self.current_contexts.append(str(result))
                         
                         self.history.append({
-                            "tool_call_id": tool_call.id,
+                            "tool_call_id": tool_call["id"],
                             "role": "tool",
                             "name": func_name,
                             "content": str(result)
                         })
                 else:
-                    final_answer = message.content
+                    final_answer = message["content"] or ""
                     self.history.append({"role": "assistant", "content": final_answer})
                     self.tracker.log_turn(user_query, final_answer, self.current_contexts)
                     return final_answer
@@ -131,15 +143,98 @@ class Agent:
         
         return "Error: Maximum steps exceeded."
 
+    async def _run_tool_call(self, tool_call: dict, limit: asyncio.Semaphore, callback=None) -> tuple[str, str]:
+        """Runs one tool call once a slot is free. Returns (tool name, result)."""
+        func_name = tool_call["function"]["name"]
+        args_str = tool_call["function"]["arguments"]
+        try:
+            args = json.loads(args_str)
+        except json.JSONDecodeError:
+            logger.error(f"JSON Decode Error for args: {args_str}")
+            args = {}
+
+        async with limit:
+            logger.info(f"Tool Call: {func_name}")
+            
+            # UI Callback for Tool Start (the id tells concurrent calls of one tool apart)
+            if callback:
+                await callback("tool_start", {"id": tool_call["id"], "name": func_name, "args": args})
+
+            result = await self._execute_tool(func_name, args)
+            
+            # UI Callback for Tool End
+            if callback:
+                await callback("tool_end", {"id": tool_call["id"], "name": func_name, "result": result})
+        return func_name, result
+
+    async def _stream_completion(self, callback=None) -> tuple[dict, int | None]:
+        """
+        Requests the next step with stream=True. Content deltas are passed on
+        as `token` events while they arrive; tool-call deltas are joined by their
+        index. Returns the assistant message for the history and the prompt
+        tokens reported by the server (None if it sends no usage).
+        """
+        client = self.client
+        kwargs = {"name": "LLM-Generation"} if isinstance(client, LangfuseAsyncOpenAI) else {}
+        started = time.perf_counter()
+        stream = await client.chat.completions.create(
+            model=self.model_name,
+            messages=self.history,
+            tools=TOOLS_SCHEMA,
+            tool_choice="auto",
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+
+        content = []
+        # index -> tool call being assembled
+        tool_calls = {}
+        first_token = None
+        reported = None
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage and getattr(usage, "prompt_tokens", None):
+                reported = usage.prompt_tokens
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if first_token is None and (delta.content or delta.tool_calls):
+                first_token = time.perf_counter() - started
+            if delta.content:
+                content.append(delta.content)
+                if callback:
+                    await callback("token", {"text": delta.content})
+            for call in delta.tool_calls or []:
+                slot = tool_calls.setdefault(call.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+                if call.id:
+                    slot["id"] = call.id
+                if call.function and call.function.name:
+                    slot["function"]["name"] = call.function.name
+                if call.function and call.function.arguments:
+                    slot["function"]["arguments"] += call.function.arguments
+
+        if first_token is not None:
+            logger.info(f"First token after {first_token:.2f}s, completion after {time.perf_counter() - started:.2f}s.")
+        message = {"role": "assistant", "content": "".join(content) or None}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        return message, reported
+
     @observe(as_type="generation")
-    def _execute_tool(self, name: str, args: dict) -> str:
+    async def _execute_tool(self, name: str, args: dict) -> str:
         try:
             if name == "retrieve_knowledge":
-                return self.tools.retrieve_knowledge(args.get("query", ""))
+                return await self.tools.aretrieve_knowledge(
+                    args.get("queries") or args.get("query", ""),
+                    sources=args.get("sources"),
+                    tags=args.get("tags"),
+                    doc_types=args.get("doc_types")
+                )
             elif name == "web_search":
-                return self.tools.web_search(args.get("query", ""))
+                return await self.tools.aweb_search(args.get("query", ""))
             elif name == "save_solution":
-                return self.tools.save_solution(args.get("filename", ""), args.get("content", ""))
+                return await self.tools.asave_solution(args.get("filename", ""), args.get("content", ""))
             else:
                 return f"Error: Unknown tool {name}"
         except Exception as e:
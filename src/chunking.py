@@ -0,0 +1,173 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+from src.config import config
+from src.utils import count_tokens, split_by_tokens
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+# Blocks are joined with a blank line, which costs about one token
+SEPARATOR_TOKENS = 1
+
+@dataclass
+class Chunk:
+    text: str
+    heading_path: str = ""
+    tokens: int = 0
+    # 1-based page number for paged documents (PDF)
+    page: int = None
+
+def closes_fence(line: str, fence: str) -> bool:
+    """A closing fence is a line of only the fence character, at least as long as the opening."""
+    marker = line.strip()
+    return len(marker) >= len(fence) and marker == fence[0] * len(marker)
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """
+    Groups Markdown lines into blocks: ("heading" | "code" | "paragraph", text).
+    Fenced code blocks are kept whole, paragraphs end at blank lines.
+    """
+    paragraph = []
+    code = []
+    fence = None
+
+    for line in lines:
+        if fence:
+            code.append(line)
+            if closes_fence(line, fence):
+                yield "code", "".join(code).rstrip("\n")
+                code = []
+                fence = None
+            continue
+
+        match = FENCE_RE.match(line)
+        if match or HEADING_RE.match(line) or not line.strip():
+            if paragraph:
+                yield "paragraph", "".join(paragraph).rstrip("\n")
+                paragraph = []
+            if match:
+                fence = match.group(1)
+                code = [line]
+            elif line.strip():
+                yield "heading", line.rstrip("\n")
+            continue
+
+        paragraph.append(line)
+
+    # An unclosed fence still keeps its content
+    if code:
+        yield "code", "".join(code).rstrip("\n")
+    if paragraph:
+        yield "paragraph", "".join(paragraph).rstrip("\n")
+
+def _pack(pieces: list[str], separator: str, max_tokens: int) -> Iterator[str]:
+    """Greedily joins pieces up to max_tokens, hard-splitting any piece that is too long."""
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if tokens > max_tokens:
+            if current:
+                yield separator.join(current)
+                current, current_tokens = [], 0
+            yield from split_by_tokens(piece, max_tokens)
+            continue
+        if current and current_tokens + tokens + SEPARATOR_TOKENS > max_tokens:
+            yield separator.join(current)
+            current, current_tokens = [], 0
+        current_tokens += tokens + (SEPARATOR_TOKENS if current else 0)
+        current.append(piece)
+    if current:
+        yield separator.join(current)
+
+def _split_block(kind: str, text: str, max_tokens: int) -> Iterator[str]:
+    """Splits an oversized block along lines (code) or sentences (prose)."""
+    if kind == "code":
+        lines = text.split("\n")
+        opening = lines[0]
+        fence = FENCE_RE.match(opening).group(1)
+        closing = lines[-1] if len(lines) > 1 and closes_fence(lines[-1], fence) else ""
+        body = lines[1:-1] if closing else lines[1:]
+        # Each piece is re-wrapped in the original fence so it stays valid Markdown
+        budget = max(1, max_tokens - count_tokens(opening) - count_tokens(closing or opening))
+        for piece in _pack(body, "\n", budget):
+            yield f"{opening}\n{piece}\n{closing or fence}"
+    else:
+        yield from _pack(SENTENCE_RE.split(text), " ", max_tokens)
+
+def chunk_markdown(
+    source: str | Iterable[str],
+    max_tokens: int = None,
+    min_tokens: int = None
+) -> Iterator[Chunk]:
+    """
+    Streams Markdown into chunks of at most max_tokens tokens.
+    Chunks break at headings (once they hold at least min_tokens), never
+    inside a fenced code block unless the block alone exceeds the limit,
+    and carry the heading path ("Title > Section") they belong to.
+    `source` may be a string or any iterable of lines, e.g. an open file.
+    """
+    max_tokens = max_tokens or config.CHUNK_MAX_TOKENS
+    min_tokens = config.CHUNK_MIN_TOKENS if min_tokens is None else min_tokens
+    lines = source.splitlines(keepends=True) if isinstance(source, str) else source
+
+    headings = []
+    parts = []
+    kinds = []
+    parts_tokens = 0
+    parts_path = ""
+
+    def current_path() -> str:
+        return " > ".join(title for _, title in headings)
+
+    def flush(final: bool = False) -> Chunk:
+        """
+        Emits the pending parts, carrying trailing headings over to the next chunk.
+        The final chunk keeps them, as no chunk follows.
+        """
+        nonlocal parts, kinds, parts_tokens, parts_path
+        carried = []
+        while not final and kinds and kinds[-1] == "heading" and len(kinds) > len(carried) + 1:
+            carried.insert(0, parts.pop())
+            kinds.pop()
+        text = "\n\n".join(parts)
+        chunk = Chunk(text=text, heading_path=parts_path, tokens=count_tokens(text))
+        parts, kinds = carried, ["heading"] * len(carried)
+        parts_tokens = sum(count_tokens(part) for part in carried)
+        parts_path = current_path()
+        return chunk
+
+    for kind, text in iter_blocks(lines):
+        if kind == "heading":
+            if parts and parts_tokens >= min_tokens:
+                yield flush()
+            match = HEADING_RE.match(text)
+            level = len(match.group(1))
+            headings = [h for h in headings if h[0] < level] + [(level, match.group(2))]
+
+        tokens = count_tokens(text)
+        if tokens > max_tokens:
+            if parts and kinds[-1] != "heading":
+                yield flush()
+            # Headings left pending (or carried over) are prepended to the first piece
+            prefix = parts
+            budget = max(1, max_tokens - parts_tokens - SEPARATOR_TOKENS) if prefix else max_tokens
+            for piece in _split_block(kind, text, budget):
+                piece = "\n\n".join(prefix + [piece])
+                prefix = []
+                yield Chunk(text=piece, heading_path=current_path(), tokens=count_tokens(piece))
+            parts, kinds, parts_tokens = [], [], 0
+            continue
+
+        if parts and parts_tokens + tokens + SEPARATOR_TOKENS > max_tokens:
+            yield flush()
+        # A chunk that holds only headings so far belongs to the innermost one
+        if all(k == "heading" for k in kinds):
+            parts_path = current_path()
+        parts.append(text)
+        kinds.append(kind)
+        parts_tokens += tokens + (SEPARATOR_TOKENS if len(parts) > 1 else 0)
+
+    if parts:
+        yield flush(final=True)
@@ -20,6 +20,115 @@ class Config:
     # Models
     RERANKER_MODEL: str = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
 
+    # Reranker engine: torch, torch-int8 (dynamic quantization), onnx or onnx-int8
+    RERANKER_BACKEND: str = os.getenv("RERANKER_BACKEND", "torch")
+    RERANKER_ONNX_FILE: str = os.getenv("RERANKER_ONNX_FILE", "onnx/model_quantized.onnx")
+    RERANKER_THREADS: int = int(os.getenv("RERANKER_THREADS", "0"))  # 0 keeps the library default
+    RERANKER_MAX_LENGTH: int = int(os.getenv("RERANKER_MAX_LENGTH", "512"))
+    RERANKER_BATCH_SIZE: int = int(os.getenv("RERANKER_BATCH_SIZE", "32"))
+    RERANKER_MAX_BATCH_PAIRS: int = int(os.getenv("RERANKER_MAX_BATCH_PAIRS", "256"))
+
+    # Cascade reranking: rerank depth follows the vector distance gaps, results follow the score threshold
+    RERANK_CASCADE_ENABLED: bool = os.getenv("RERANK_CASCADE_ENABLED", "false").lower() == "true"
+    CASCADE_MIN_CANDIDATES: int = int(os.getenv("CASCADE_MIN_CANDIDATES", "5"))
+    CASCADE_MAX_CANDIDATES: int = int(os.getenv("CASCADE_MAX_CANDIDATES", "30"))
+    CASCADE_SKIP_MARGIN: float = float(os.getenv("CASCADE_SKIP_MARGIN", "0.35"))
+    CASCADE_SHORT_MARGIN: float = float(os.getenv("CASCADE_SHORT_MARGIN", "0.2"))
+    CASCADE_WIDE_SPREAD: float = float(os.getenv("CASCADE_WIDE_SPREAD", "0.05"))
+    RERANK_SCORE_THRESHOLD: float = float(os.getenv("RERANK_SCORE_THRESHOLD", "0.1"))
+    RERANK_MIN_RESULTS: int = int(os.getenv("RERANK_MIN_RESULTS", "1"))
+    RERANK_MAX_RESULTS: int = int(os.getenv("RERANK_MAX_RESULTS", "5"))
+
+    # Context assembly: retrieved chunks are stitched by chunk_index and packed into a token budget
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONTEXT_NEIGHBOR_CHUNKS: int = int(os.getenv("CONTEXT_NEIGHBOR_CHUNKS", "1"))
+    CONTEXT_MAX_OVERLAP_CHARS: int = int(os.getenv("CONTEXT_MAX_OVERLAP_CHARS", "200"))
+
+    # Async agent: blocking tool calls run on shared thread pools, off the event loop
+    IO_POOL_WORKERS: int = int(os.getenv("IO_POOL_WORKERS", "16"))
+    RETRIEVAL_POOL_WORKERS: int = int(os.getenv("RETRIEVAL_POOL_WORKERS", "8"))
+    # Tool calls of one LLM step that run at the same time
+    TOOL_CALL_CONCURRENCY: int = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
+
+    # Conversation history sent to the LLM: old tool outputs, then old turns are compacted above the budget (0 disables)
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+    HISTORY_TOOL_OUTPUT_TOKENS: int = int(os.getenv("HISTORY_TOOL_OUTPUT_TOKENS", "80"))
+    HISTORY_TURN_SUMMARY_TOKENS: int = int(os.getenv("HISTORY_TURN_SUMMARY_TOKENS", "60"))
+
+    # Chunking
+    TOKENIZER_ENCODING: str = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+    CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", "512"))
+    CHUNK_MIN_TOKENS: int = int(os.getenv("CHUNK_MIN_TOKENS", "64"))
+
+    # Ingestion
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "32"))
+    INGEST_CONCURRENCY: int = int(os.getenv("INGEST_CONCURRENCY", "4"))
+    INGEST_MAX_RETRIES: int = int(os.getenv("INGEST_MAX_RETRIES", "3"))
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "64"))
+    # Chunks of one file handed to the embed stage at a time
+    INGEST_PART_CHUNKS: int = int(os.getenv("INGEST_PART_CHUNKS", "256"))
+    INGEST_UPSERT_BATCH_SIZE: int = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "1024"))
+    INGEST_JOB_POOL_THRESHOLD: int = int(os.getenv("INGEST_JOB_POOL_THRESHOLD", "50"))
+    WATCH_DEBOUNCE_SECONDS: float = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2.0"))
+    WATCH_POLL_INTERVAL: float = float(os.getenv("WATCH_POLL_INTERVAL", "5.0"))
+    INGEST_MANIFEST_PATH: str = os.getenv(
+        "INGEST_MANIFEST_PATH",
+        os.path.join(os.getenv("CHROMA_DB_PATH", "./data/chroma_db"), "ingest_manifest.json")
+    )
+
+    # Blue-green rebuilds: the alias file points at the live collection generation
+    INDEX_ALIAS_PATH: str = os.getenv(
+        "INDEX_ALIAS_PATH",
+        os.path.join(os.getenv("CHROMA_DB_PATH", "./data/chroma_db"), "index_alias.json")
+    )
+    INDEX_VALIDATION_SAMPLES: int = int(os.getenv("INDEX_VALIDATION_SAMPLES", "5"))
+    INDEX_KEEP_GENERATIONS: int = int(os.getenv("INDEX_KEEP_GENERATIONS", "1"))
+
+    # Vector store: chroma (SQLite + HNSW) or numpy (memory-mapped float16 matrix, exact search)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+    NUMPY_STORE_DIR: str = os.getenv(
+        "NUMPY_STORE_DIR",
+        os.path.join(os.getenv("CHROMA_DB_PATH", "./data/chroma_db"), "numpy")
+    )
+    NUMPY_SEARCH_BLOCK_ROWS: int = int(os.getenv("NUMPY_SEARCH_BLOCK_ROWS", "16384"))
+    # Stored encoding of new collections: float16 or int8 (scalar quantization with a per-row scale)
+    NUMPY_STORE_DTYPE: str = os.getenv("NUMPY_STORE_DTYPE", "float16")
+    # Keep float32 originals on disk and re-score NUMPY_RESCORE_FACTOR x n_results shortlisted rows with them
+    NUMPY_RESCORE_ENABLED: bool = os.getenv("NUMPY_RESCORE_ENABLED", "true").lower() == "true"
+    NUMPY_RESCORE_FACTOR: int = int(os.getenv("NUMPY_RESCORE_FACTOR", "4"))
+
+    # Hybrid retrieval: BM25 lexical index fused with dense results (reciprocal-rank fusion)
+    LEXICAL_INDEX_ENABLED: bool = os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() == "true"
+    LEXICAL_INDEX_DIR: str = os.getenv(
+        "LEXICAL_INDEX_DIR",
+        os.path.join(os.getenv("CHROMA_DB_PATH", "./data/chroma_db"), "lexical")
+    )
+    LEXICAL_SEGMENT_DOCS: int = int(os.getenv("LEXICAL_SEGMENT_DOCS", "20000"))
+    LEXICAL_MAX_SEGMENTS: int = int(os.getenv("LEXICAL_MAX_SEGMENTS", "8"))
+    RETRIEVAL_CANDIDATES: int = int(os.getenv("RETRIEVAL_CANDIDATES", "10"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+
+    # Near-duplicate chunk detection (MinHash, estimated Jaccard similarity of word shingles)
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+    # Embedding Cache
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite3")
+    EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+
+    # Reranker score cache: (normalized query, chunk content, reranker) -> score
+    SCORE_CACHE_ENABLED: bool = os.getenv("SCORE_CACHE_ENABLED", "true").lower() == "true"
+    SCORE_CACHE_PATH: str = os.getenv("SCORE_CACHE_PATH", "./data/score_cache.sqlite3")
+    SCORE_CACHE_MAX_ENTRIES: int = int(os.getenv("SCORE_CACHE_MAX_ENTRIES", "200000"))
+
+    # Semantic cache of retrieve_knowledge results, matched by query embedding cosine similarity
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+    SEMANTIC_CACHE_TTL_SECONDS: float = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+
     # LangFuse Settings
     LANGFUSE_PUBLIC_KEY: str = os.getenv("LANGFUSE_PUBLIC_KEY", "")
     LANGFUSE_SECRET_KEY: str = os.getenv("LANGFUSE_SECRET_KEY", "")
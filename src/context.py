@@ -0,0 +1,165 @@
+from dataclasses import dataclass, field
+from src.config import config
+from src.scope import format_citation
+from src.utils import setup_logger, count_tokens, split_by_tokens
+
+logger = setup_logger("Context")
+
+# Chunks are split at block boundaries, so adjacent ones are rejoined with a blank line
+CHUNK_SEPARATOR = "\n\n"
+PASSAGE_SEPARATOR = "\n\n---\n\n"
+# Shorter common prefixes/suffixes are treated as coincidence, not overlap
+MIN_OVERLAP_CHARS = 20
+
+def strip_overlap(previous: str, text: str, max_chars: int = None) -> str | None:
+    """
+    Removes the start of `text` that repeats the end of `previous` (the overlap
+    of fixed-size chunking). Returns the remainder, or None if there is no overlap.
+    """
+    max_chars = config.CONTEXT_MAX_OVERLAP_CHARS if max_chars is None else max_chars
+    for size in range(min(max_chars, len(previous), len(text)), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:]
+    return None
+
+@dataclass
+class Passage:
+    """A run of consecutive chunks of one source."""
+    source: str
+    # chunk_index -> (document, metadata), and the indexes that were retrieval hits
+    chunks: dict = field(default_factory=dict)
+    hits: set = field(default_factory=set)
+    rank: int = 0
+
+    def text(self, hits_only: bool = False) -> str:
+        indexes = sorted(self.hits if hits_only else self.chunks)
+        parts = []
+        previous = None
+        for index in indexes:
+            document = self.chunks[index][0]
+            if previous is not None and index == previous[0] + 1:
+                remainder = strip_overlap(previous[1], document)
+                if remainder is not None:
+                    # Overlapping chunks were cut mid-text, so they join without a separator
+                    parts.append(remainder)
+                    previous = (index, document)
+                    continue
+            if parts:
+                parts.append(CHUNK_SEPARATOR if previous and index == previous[0] + 1 else "\n\n[...]\n\n")
+            parts.append(document)
+            previous = (index, document)
+        return "".join(parts)
+
+    def citation(self, hits_only: bool = False) -> str:
+        first = min(self.hits if hits_only else self.chunks)
+        return format_citation(self.chunks[first][1])
+
+class ContextAssembler:
+    """
+    Turns ranked (chunk_id, document, metadata) hits into the context passed to
+    the LLM: hits from the same source that are adjacent by `chunk_index` are
+    merged into one passage with chunking overlap removed, optionally widened
+    by `neighbors` chunks on each side, and passages are packed best first up
+    to `budget_tokens` tokens.
+    """
+    def __init__(self, collection=None, budget_tokens: int = None, neighbors: int = None):
+        self.collection = collection
+        self.budget_tokens = budget_tokens or config.CONTEXT_TOKEN_BUDGET
+        self.neighbors = config.CONTEXT_NEIGHBOR_CHUNKS if neighbors is None else neighbors
+
+    def assemble(self, hits: list[tuple], budget_tokens: int = None) -> tuple[str, int]:
+        """Returns (context, tokens used). An exhausted budget (0 or less) gives no context."""
+        budget = budget_tokens if budget_tokens is not None else self.budget_tokens
+        if budget <= 0:
+            return "", 0
+        passages = self._passages(hits)
+        packed = []
+        used = 0
+        for passage in passages:
+            block = None
+            # A widened passage that does not fit is retried without its neighbours
+            for hits_only in (False, True):
+                candidate = f"{passage.citation(hits_only)}\n{passage.text(hits_only)}"
+                tokens = count_tokens(candidate) + (count_tokens(PASSAGE_SEPARATOR) if packed else 0)
+                if used + tokens <= budget:
+                    block = candidate
+                    break
+                if passage.hits == set(passage.chunks):
+                    break
+            if block is None:
+                if not packed:
+                    # The best passage alone exceeds the budget, keep its beginning
+                    block = split_by_tokens(f"{passage.citation(True)}\n{passage.text(True)}", budget)[0]
+                    tokens = count_tokens(block)
+                else:
+                    continue
+            packed.append(block)
+            used += tokens
+        if len(packed) < len(passages):
+            logger.info(f"Context budget of {budget} tokens fits {len(packed)} of {len(passages)} passages.")
+        return PASSAGE_SEPARATOR.join(packed), used
+
+    def _passages(self, hits: list[tuple]) -> list[Passage]:
+        by_source = {}
+        unordered = []
+        for rank, (chunk_id, document, metadata) in enumerate(hits):
+            metadata = metadata or {}
+            index = metadata.get("chunk_index")
+            source = metadata.get("source")
+            if index is None or source is None:
+                # Without a position the chunk cannot be stitched, it stands alone
+                unordered.append(Passage(source=source, chunks={0: (document, metadata)}, hits={0}, rank=rank))
+                continue
+            passage = by_source.setdefault(source, Passage(source=source, rank=rank))
+            passage.chunks[index] = (document, metadata)
+            passage.hits.add(index)
+
+        if self.neighbors and self.collection is not None:
+            self._add_neighbors(by_source)
+
+        passages = unordered
+        for source, whole in by_source.items():
+            passages.extend(self._split_runs(whole))
+        return sorted(passages, key=lambda passage: passage.rank)
+
+    def _split_runs(self, whole: Passage) -> list[Passage]:
+        """Splits one source's chunks into runs of consecutive indexes that contain a hit."""
+        runs = []
+        current = None
+        for index in sorted(whole.chunks):
+            if current is None or index != max(current.chunks) + 1:
+                current = Passage(source=whole.source, rank=whole.rank)
+                runs.append(current)
+            current.chunks[index] = whole.chunks[index]
+            if index in whole.hits:
+                current.hits.add(index)
+        runs = [run for run in runs if run.hits]
+        # Runs of the same source keep the source's rank, in document order
+        for offset, run in enumerate(runs):
+            run.rank = whole.rank + offset / len(runs)
+        return runs
+
+    def _add_neighbors(self, by_source: dict):
+        """Fetches the chunks around each hit in a single ChromaDB call."""
+        clauses = []
+        for source, passage in by_source.items():
+            wanted = {
+                index + offset
+                for index in passage.hits
+                for offset in range(-self.neighbors, self.neighbors + 1)
+            }
+            wanted = sorted(index for index in wanted if index >= 0 and index not in passage.chunks)
+            if wanted:
+                clauses.append({"$and": [{"source": source}, {"chunk_index": {"$in": wanted}}]})
+        if not clauses:
+            return
+        where = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        try:
+            fetched = self.collection.get(where=where, include=["documents", "metadatas"])
+        except Exception as e:
+            logger.error(f"Could not fetch neighbouring chunks: {e}")
+            return
+        for document, metadata in zip(fetched["documents"], fetched["metadatas"]):
+            passage = by_source.get(metadata.get("source"))
+            if passage is not None and document:
+                passage.chunks.setdefault(metadata["chunk_index"], (document, metadata))
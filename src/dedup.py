@@ -0,0 +1,112 @@
+import re
+import base64
+import hashlib
+import numpy as np
+from src.config import config
+
+WORD_RE = re.compile(r"\w+")
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+# 16 bands of 4 rows: pairs with Jaccard 0.8 share a band with ~99.9% probability
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+
+def minhash(text: str) -> np.ndarray | None:
+    """
+    MinHash signature of the text's word 3-shingles (NUM_PERM uint32 values).
+    The share of equal positions in two signatures estimates their Jaccard
+    similarity. Returns None for texts without words.
+    """
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest() for s in shingles)
+    hashes = np.frombuffer(digests, dtype=np.uint32).astype(np.uint64)
+    # Universal hashing (a*x + b) mod p; x < 2^32 so the product fits in uint64
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME
+    return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+def encode_signature(signature: np.ndarray | None) -> str | None:
+    return base64.b64encode(signature.tobytes()).decode("ascii") if signature is not None else None
+
+def decode_signature(encoded: str | None) -> np.ndarray | None:
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.uint32) if encoded else None
+
+class MinHashIndex:
+    """
+    LSH index over MinHash signatures: items sharing any band are compared
+    and the most similar one at or above `threshold` is returned.
+    """
+    def __init__(self, threshold: float = None):
+        self.threshold = config.DEDUP_THRESHOLD if threshold is None else threshold
+        self._tables = [{} for _ in range(BANDS)]
+        self._signatures = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._signatures
+
+    def get(self, item_id: str) -> np.ndarray | None:
+        return self._signatures.get(item_id)
+
+    @staticmethod
+    def _keys(signature: np.ndarray) -> list[bytes]:
+        return [signature[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+
+    def add(self, item_id: str, signature: np.ndarray):
+        self.remove(item_id)
+        self._signatures[item_id] = signature
+        for table, key in zip(self._tables, self._keys(signature)):
+            table.setdefault(key, set()).add(item_id)
+
+    def remove(self, item_id: str):
+        signature = self._signatures.pop(item_id, None)
+        if signature is None:
+            return
+        for table, key in zip(self._tables, self._keys(signature)):
+            bucket = table.get(key)
+            if bucket:
+                bucket.discard(item_id)
+                if not bucket:
+                    del table[key]
+
+    def find(self, signature: np.ndarray, exclude: set = None) -> str | None:
+        """Returns the most similar indexed item at or above the threshold, if any."""
+        candidates = set()
+        for table, key in zip(self._tables, self._keys(signature)):
+            candidates.update(table.get(key, ()))
+        best, best_score = None, self.threshold
+        for item_id in sorted(candidates):
+            if exclude and item_id in exclude:
+                continue
+            score = similarity(signature, self._signatures[item_id])
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = item_id, score
+        return best
+
+def dedupe_texts(texts: list[str], threshold: float = None) -> list[int]:
+    """
+    Returns positions of the texts to keep: the first of every group of
+    near duplicates, in the original order.
+    """
+    index = MinHashIndex(threshold)
+    keep = []
+    for i, text in enumerate(texts):
+        signature = minhash(text)
+        if signature is not None:
+            if index.find(signature) is not None:
+                continue
+            index.add(str(i), signature)
+        keep.append(i)
+    return keep
@@ -0,0 +1,98 @@
+import sqlite3
+import hashlib
+from array import array
+from src.config import config
+from src.utils import setup_logger, get_ollama_embedding, get_ollama_embeddings
+from src.sqlite_lru import SQLiteLRUCache
+
+logger = setup_logger("EmbeddingCache")
+
+class EmbeddingCache(SQLiteLRUCache):
+    """
+    Content-addressed embedding cache in a local SQLite file.
+    Keys are (model, sha256(text)); vectors are stored as float32 blobs.
+    Every vector comes from /api/embed. Rows keyed by endpoint, cached before
+    the legacy /api/embeddings path was dropped, are never read and age out.
+    The total blob size is capped and the least recently used rows are evicted.
+    """
+    TABLE = "embeddings"
+    COLUMNS = {"model": "TEXT NOT NULL", "vector": "BLOB NOT NULL"}
+    SIZE_SQL = "LENGTH(vector)"
+    ITEM_NAME = "embeddings"
+
+    def __init__(self, path: str, max_mb: int = 512):
+        super().__init__(path, max_mb * 1024 * 1024)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}|{digest}"
+
+    def get_many(self, model: str, texts: list[str]) -> dict[str, list[float]]:
+        """Returns cached vectors by text and refreshes their LRU timestamp."""
+        keys = {self.make_key(model, text): text for text in texts}
+        return {keys[key]: array("f", blob).tolist() for key, blob in self._get(list(keys), "vector").items()}
+
+    def put_many(self, model: str, items: dict[str, list[float]]):
+        self._put([
+            (self.make_key(model, text), model, array("f", vector).tobytes())
+            for text, vector in items.items() if vector
+        ])
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["size_mb"] = stats["size"] / (1024 * 1024)
+        return stats
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            f"Embedding cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.1%} hit rate), "
+            f"{s['entries']} entries, {s['size_mb']:.1f} MB"
+        )
+
+# Global cache instance shared by ingestion, retrieval and evaluation
+_embedding_cache = None
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    global _embedding_cache
+    if _embedding_cache is None and config.EMBEDDING_CACHE_ENABLED:
+        try:
+            _embedding_cache = EmbeddingCache(config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_MAX_MB)
+        except sqlite3.Error as e:
+            logger.error(f"Could not open embedding cache at {config.EMBEDDING_CACHE_PATH}: {e}")
+    return _embedding_cache
+
+def cached_embedding(text: str, model: str = config.EMBEDDING_MODEL) -> list[float]:
+    """
+    get_ollama_embedding with the on-disk cache in front of it.
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return get_ollama_embedding(text, model=model)
+
+    found = cache.get_many(model, [text])
+    if text in found:
+        return found[text]
+    vector = get_ollama_embedding(text, model=model)
+    if vector:
+        cache.put_many(model, {text: vector})
+    return vector
+
+def cached_embeddings(texts: list[str], model: str = config.EMBEDDING_MODEL) -> list[list[float]]:
+    """
+    get_ollama_embeddings with the on-disk cache in front of it.
+    Only texts missing from the cache are sent to Ollama.
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return get_ollama_embeddings(texts, model=model)
+
+    found = cache.get_many(model, texts)
+    missing = list(dict.fromkeys(text for text in texts if text not in found))
+    if missing:
+        vectors = get_ollama_embeddings(missing, model=model)
+        fresh = dict(zip(missing, vectors))
+        cache.put_many(model, fresh)
+        found.update(fresh)
+    return [found[text] for text in texts]
@@ -0,0 +1,33 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from src.config import config
+from src.registry import get_or_create
+
+# Pool kind -> Config field with its size. Blocking calls run here so the event
+# loop keeps serving other sessions:
+# - io: web search and file writes (threads mostly wait on sockets and disks)
+# - retrieval: embedding, vector search and reranking (NumPy, SQLite, torch and
+#   ONNX Runtime release the GIL, and the reranker batches concurrent queries)
+POOL_WORKERS = {
+    "io": "IO_POOL_WORKERS",
+    "retrieval": "RETRIEVAL_POOL_WORKERS",
+}
+
+def get_executor(kind: str) -> ThreadPoolExecutor:
+    """The process-wide thread pool for one kind of blocking work."""
+    workers = max(1, getattr(config, POOL_WORKERS[kind]))
+    return get_or_create(
+        ("executor", kind, workers),
+        lambda: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"devmind-{kind}")
+    )
+
+async def run_blocking(kind: str, func, *args, **kwargs):
+    """
+    Awaits `func(*args, **kwargs)` on the `kind` pool. The caller's context
+    variables (e.g. the LangFuse trace) are visible inside the call.
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(kind), call)
@@ -0,0 +1,114 @@
+from src.config import config
+from src.utils import setup_logger, count_tokens, split_by_tokens
+
+logger = setup_logger("History")
+
+# Role markers and separators the chat template adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "Summary of the earlier conversation (older turns were compacted):"
+COMPACTED_PREFIX = "[Compacted "
+# Lines of tool results worth keeping after compaction: retrieval citations and web URLs
+REFERENCE_PREFIXES = ("[Source:", "URL:")
+
+def message_tokens(message: dict) -> int:
+    """Estimated prompt tokens of one chat message, tool-call arguments included."""
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content") or "")
+    for call in message.get("tool_calls") or []:
+        tokens += count_tokens(call["function"]["name"]) + count_tokens(call["function"]["arguments"])
+    return tokens
+
+def prompt_tokens(messages: list[dict]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+def shorten(text: str, max_tokens: int) -> str:
+    """The first `max_tokens` tokens of `text`, marked as cut if anything was dropped."""
+    text = (text or "").strip()
+    if count_tokens(text) <= max_tokens:
+        return text
+    return split_by_tokens(text, max_tokens)[0].rstrip() + " [...]"
+
+def compact_tool_output(message: dict, max_tokens: int) -> dict:
+    """
+    An old tool message with its result cut to `max_tokens` tokens. The sources
+    and URLs it cited are kept, so the model can still refer to them.
+    """
+    content = message.get("content") or ""
+    references = dict.fromkeys(
+        line.strip() for line in content.splitlines() if line.strip().startswith(REFERENCE_PREFIXES)
+    )
+    summary = f"{COMPACTED_PREFIX}{message.get('name', 'tool')} output, {count_tokens(content)} tokens] {shorten(content, max_tokens)}"
+    if references:
+        summary += "\nReferences: " + "; ".join(references)
+    return {**message, "content": summary}
+
+def summarize_turn(messages: list[dict], max_tokens: int) -> str:
+    """One summary line for a finished turn: the question, the tools used and the answer."""
+    question = next((m.get("content") or "" for m in messages if m.get("role") == "user"), "")
+    tools = dict.fromkeys(m.get("name", "tool") for m in messages if m.get("role") == "tool")
+    answers = [m.get("content") or "" for m in messages if m.get("role") == "assistant" and not m.get("tool_calls")]
+    line = f"- User: {shorten(question, max_tokens)}"
+    if tools:
+        line += f" | Tools: {', '.join(tools)}"
+    return line + f" | Answer: {shorten(answers[-1] if answers else '(none)', max_tokens)}"
+
+class HistoryManager:
+    """
+    Keeps the messages sent to the LLM within a token budget. The system prompt
+    and the latest exchange (from the last user message on) are never changed.
+    Over budget, older tool outputs are cut first, then the oldest turns are
+    folded into one summary message after the system prompt.
+    """
+
+    def __init__(self, budget_tokens: int = None, tool_output_tokens: int = None, turn_summary_tokens: int = None):
+        self.budget_tokens = config.HISTORY_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+        self.tool_output_tokens = config.HISTORY_TOOL_OUTPUT_TOKENS if tool_output_tokens is None else tool_output_tokens
+        self.turn_summary_tokens = config.HISTORY_TURN_SUMMARY_TOKENS if turn_summary_tokens is None else turn_summary_tokens
+
+    @staticmethod
+    def _is_summary(message: dict) -> bool:
+        return message.get("role") == "system" and (message.get("content") or "").startswith(SUMMARY_HEADER)
+
+    def compact(self, history: list[dict]) -> list[dict]:
+        """Returns the history within the budget (the same list if it already fits)."""
+        total = prompt_tokens(history)
+        if self.budget_tokens <= 0 or total <= self.budget_tokens:
+            return history
+
+        head = 2 if len(history) > 1 and self._is_summary(history[1]) else 1
+        latest = max((i for i, m in enumerate(history) if m.get("role") == "user"), default=len(history))
+        older = list(history[head:latest])
+        before = total
+
+        # 1. Old tool outputs, oldest first
+        for i, message in enumerate(older):
+            if total <= self.budget_tokens:
+                break
+            if message.get("role") == "tool" and not (message.get("content") or "").startswith(COMPACTED_PREFIX):
+                older[i] = compact_tool_output(message, self.tool_output_tokens)
+                total += message_tokens(older[i]) - message_tokens(message)
+
+        # 2. Old turns, oldest first, into the summary message
+        lines = history[1]["content"].split("\n")[1:] if head == 2 else []
+        summary_tokens = message_tokens(history[1]) if head == 2 else 0
+        while total > self.budget_tokens and older:
+            end = next((i for i, m in enumerate(older) if i > 0 and m.get("role") == "user"), len(older))
+            turn, older = older[:end], older[end:]
+            lines.append(summarize_turn(turn, self.turn_summary_tokens))
+            summary = {"role": "system", "content": "\n".join([SUMMARY_HEADER] + lines)}
+            total += message_tokens(summary) - summary_tokens - prompt_tokens(turn)
+            summary_tokens = message_tokens(summary)
+
+        if lines:
+            # The summary itself is bounded: the oldest lines go once it outgrows the budget
+            while len(lines) > 1 and total > self.budget_tokens:
+                total -= message_tokens({"content": lines.pop(0) + "\n"}) - MESSAGE_OVERHEAD_TOKENS
+            summary = [{"role": "system", "content": "\n".join([SUMMARY_HEADER] + lines)}]
+        else:
+            summary = []
+
+        compacted = history[:1] + summary + older + history[latest:]
+        total = prompt_tokens(compacted)
+        logger.info(f"Compacted history from {before} to {total} tokens (budget {self.budget_tokens}).")
+        if total > self.budget_tokens:
+            logger.warning(f"The latest exchange alone needs {total} tokens, over the history budget of {self.budget_tokens}.")
+        return compacted
@@ -0,0 +1,158 @@
+import os
+import json
+import random
+import shutil
+from datetime import datetime
+from src.config import config
+from src.utils import setup_logger
+from src.lexical import LexicalIndex, lexical_index_path
+
+logger = setup_logger("IndexAlias")
+
+COLLECTION_NAME = "devmind_docs"
+GENERATION_PREFIX = f"{COLLECTION_NAME}_g"
+# Nearest neighbors fetched per validation sample, so identical twins do not hide the chunk itself
+VALIDATION_NEIGHBORS = 10
+
+def read_alias() -> dict:
+    try:
+        with open(config.INDEX_ALIAS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read index alias {config.INDEX_ALIAS_PATH}: {e}")
+        return {}
+
+def live_collection_name() -> str:
+    """The collection queries should go to. Without an alias it is the legacy devmind_docs."""
+    return read_alias().get("collection", COLLECTION_NAME)
+
+def alias_mtime() -> float | None:
+    try:
+        return os.stat(config.INDEX_ALIAS_PATH).st_mtime
+    except OSError:
+        return None
+
+def write_alias(collection_name: str):
+    """Points the alias at another collection. os.replace makes the swap atomic."""
+    os.makedirs(os.path.dirname(os.path.abspath(config.INDEX_ALIAS_PATH)), exist_ok=True)
+    data = {
+        "collection": collection_name,
+        "previous": live_collection_name(),
+        "updated_at": datetime.now().isoformat()
+    }
+    tmp_path = f"{config.INDEX_ALIAS_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, config.INDEX_ALIAS_PATH)
+
+def new_generation_name() -> str:
+    # Sortable by creation time, which garbage collection relies on
+    return f"{GENERATION_PREFIX}{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+
+def manifest_path(collection_name: str) -> str:
+    """Every generation has its own manifest next to INGEST_MANIFEST_PATH."""
+    if collection_name == COLLECTION_NAME:
+        return config.INGEST_MANIFEST_PATH
+    root, ext = os.path.splitext(config.INGEST_MANIFEST_PATH)
+    return f"{root}.{collection_name}{ext}"
+
+def validate_collection(collection, manifest, samples: int = None) -> str | None:
+    """
+    Checks a freshly built collection before it goes live.
+    Returns the reason it is not fit to serve, or None if it is.
+    """
+    samples = config.INDEX_VALIDATION_SAMPLES if samples is None else samples
+    expected = manifest.chunk_count()
+    count = collection.count()
+    if count == 0:
+        return "collection is empty"
+    if count != expected:
+        return f"collection holds {count} chunks but the manifest lists {expected}"
+    lexical_path = lexical_index_path(collection.name)
+    if config.LEXICAL_INDEX_ENABLED and os.path.exists(lexical_path):
+        lexical_count = LexicalIndex(lexical_path).doc_count()
+        if lexical_count != count:
+            return f"lexical index holds {lexical_count} chunks but the collection {count}"
+
+    # Every sampled vector must find itself as the nearest neighbor. Distances are
+    # only compared with each other: quantized stores (int8 without re-scoring)
+    # give a vector a non-zero distance to itself. An identical twin ties with it.
+    ids = random.sample(sorted(manifest.stored_chunk_ids()), min(samples, expected))
+    stored = collection.get(ids=ids, include=["embeddings"])
+    if len(stored["ids"]) != len(ids):
+        return "sampled chunks are missing from the collection"
+    results = collection.query(
+        query_embeddings=stored["embeddings"], n_results=min(VALIDATION_NEIGHBORS, count), include=["distances"]
+    )
+    for chunk_id, found, distances in zip(stored["ids"], results["ids"], results["distances"]):
+        if chunk_id not in found or distances[found.index(chunk_id)] > distances[0] * (1 + 1e-6) + 1e-9:
+            return f"sample query for {chunk_id} did not return the chunk itself"
+    return None
+
+def publish_collection(client, collection, manifest) -> bool:
+    """
+    Swaps a rebuilt collection in as the live index and drops old generations.
+    A collection that already is live is left as it is.
+    """
+    live_name = live_collection_name()
+    if collection.name == live_name:
+        return True
+
+    problem = validate_collection(collection, manifest)
+    if problem:
+        logger.error(f"Not publishing {collection.name}: {problem}. Still serving {live_name}.")
+        return False
+
+    write_alias(collection.name)
+    logger.info(f"Index alias now points to {collection.name} ({collection.count()} chunks), was {live_name}.")
+    collect_generations(client)
+    return True
+
+def discard_collection(client, collection):
+    """Drops an unfinished rebuild, unless it is the live collection."""
+    if collection.name == live_collection_name():
+        return
+    logger.info(f"Discarding unfinished index generation {collection.name}.")
+    _drop(client, collection.name)
+
+def collect_generations(client, keep: int = None):
+    """
+    Deletes index generations that are neither live nor among the `keep`
+    most recent previous ones. Readers still holding a previous generation
+    can finish their queries before it goes away.
+    """
+    keep = config.INDEX_KEEP_GENERATIONS if keep is None else keep
+    live_name = live_collection_name()
+    generations = sorted(
+        name for name in _collection_names(client)
+        if name == COLLECTION_NAME or name.startswith(GENERATION_PREFIX)
+    )
+    older = [name for name in generations if name != live_name and (name == COLLECTION_NAME or name < live_name)]
+    # Generations newer than the live one are rebuilds in progress, never touch them
+    for name in older[:max(0, len(older) - keep)]:
+        logger.info(f"Removing old index generation {name}.")
+        _drop(client, name)
+
+def drop_unfinished_generations(client):
+    """Removes generations newer than the live one, left behind by interrupted rebuilds."""
+    live_name = live_collection_name()
+    for name in _collection_names(client):
+        if name.startswith(GENERATION_PREFIX) and name > live_name:
+            logger.info(f"Removing unfinished index generation {name}.")
+            _drop(client, name)
+
+def _collection_names(client) -> list[str]:
+    # Older ChromaDB versions return names, newer ones return Collection objects
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+def _drop(client, collection_name: str):
+    try:
+        client.delete_collection(name=collection_name)
+    except Exception as e:
+        logger.error(f"Could not delete collection {collection_name}: {e}")
+    path = manifest_path(collection_name)
+    if os.path.exists(path):
+        os.remove(path)
+    shutil.rmtree(lexical_index_path(collection_name), ignore_errors=True)
@@ -0,0 +1,872 @@
+import os
+import glob
+import math
+import time
+import queue
+import threading
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from src.config import config
+from src.utils import setup_logger, get_ollama_embedding
+from src.loaders import SUPPORTED_EXTENSIONS, load_chunks, doc_type
+from src.lexical import LexicalIndex, lexical_index_path
+from src.dedup import MinHashIndex, minhash, encode_signature, decode_signature
+from src.index_alias import (
+    COLLECTION_NAME, live_collection_name, new_generation_name, manifest_path,
+    publish_collection, discard_collection, drop_unfinished_generations
+)
+from src.manifest import IngestManifest, hash_file, hash_text, make_chunk_ids
+from src.embedding_cache import cached_embedding, cached_embeddings, get_embedding_cache
+from src.score_cache import get_score_cache
+from src.scope import source_tags, merged_tags
+from src.registry import get_vector_client
+
+logger = setup_logger("Ingest")
+
+@dataclass
+class PreparedPart:
+    """Output of the read/chunk stage: up to `part_size` consecutive chunks of one file."""
+    source: str
+    stat: os.stat_result = None
+    file_hash: str = None
+    # None when the file content is unchanged and there is nothing to chunk
+    chunks: list = field(default_factory=list)
+    # Encoded MinHash per chunk (None when deduplication is off)
+    signatures: list = None
+    error: str = None
+    # Position of the first chunk in the file, and whether the file ends with this part
+    start: int = 0
+    last: bool = True
+
+@dataclass
+class FileState:
+    """
+    Bookkeeping for one file while its parts move through the stages.
+    The planning fields are only written by the main thread, the rest only
+    by the writer, which records the file once its last part is written.
+    """
+    source: str
+    stat: os.stat_result
+    file_hash: str
+    old_ids: set
+    old_refs: set
+    # Planning: repeat counts for make_chunk_ids, chunk IDs seen so far (excluded
+    # as canonical chunks), IDs the file will store, canonical chunks it refers to
+    id_counts: dict = field(default_factory=dict)
+    own_ids: set = field(default_factory=set)
+    planned_ids: set = field(default_factory=set)
+    refs: set = field(default_factory=set)
+    parts: int = 0
+    # Writing
+    written: int = 0
+    total: int = None
+    failed: bool = False
+    new_ids: list = field(default_factory=list)
+    failed_ids: set = field(default_factory=set)
+    # (position in file, chunk_id, chunk_hash, signature) of every stored chunk
+    stored: list = field(default_factory=list)
+    duplicates: dict = field(default_factory=dict)
+
+@dataclass
+class EmbedJob:
+    """One part of a file: its chunks that still need vectors, plus everything the writer needs."""
+    part: PreparedPart
+    file: FileState
+    number: int
+    chunk_ids: list[str] = field(default_factory=list)
+    chunk_hashes: list[str] = field(default_factory=list)
+    metadatas: list[dict] = field(default_factory=list)
+    # Positions within the part
+    new_positions: list[int] = field(default_factory=list)
+    kept_positions: list[int] = field(default_factory=list)
+    # Positions that are near duplicates of chunks stored by other files
+    duplicate_positions: list[int] = field(default_factory=list)
+    duplicates: dict = field(default_factory=dict)
+
+@dataclass
+class WriteJob:
+    job: EmbedJob
+    vectors: dict = field(default_factory=dict)
+    # Embedding or writing the part failed, the whole file is given up
+    failed: bool = False
+
+def iter_parts(source: str, known_hash: str = None, part_size: int = None) -> Iterator[PreparedPart]:
+    """
+    Reads, hashes and chunks one file, yielding its chunks in parts of at most
+    `part_size`. Never raises: a failure ends the file with an error part.
+    The file is streamed twice (hash, then chunks) and never held in memory whole.
+    """
+    part_size = max(1, part_size or config.INGEST_PART_CHUNKS)
+    start = 0
+    try:
+        stat = os.stat(source)
+        file_hash = hash_file(source)
+        if file_hash == known_hash:
+            yield PreparedPart(source=source, stat=stat, file_hash=file_hash, chunks=None)
+            return
+
+        def make_part(chunks: list, last: bool) -> PreparedPart:
+            signatures = [encode_signature(minhash(chunk.text)) for chunk in chunks] if config.DEDUP_ENABLED else None
+            return PreparedPart(
+                source=source, stat=stat, file_hash=file_hash, chunks=chunks,
+                signatures=signatures, start=start, last=last
+            )
+
+        chunks = []
+        for chunk in load_chunks(source):
+            if len(chunks) == part_size:
+                yield make_part(chunks, last=False)
+                start += len(chunks)
+                chunks = []
+            chunks.append(chunk)
+        yield make_part(chunks, last=True)
+    except Exception as e:
+        yield PreparedPart(source=source, error=str(e), start=start)
+
+# Queue a worker process puts its parts on, set by the pool initializer
+_part_queue = None
+
+def _init_worker(part_queue):
+    global _part_queue
+    _part_queue = part_queue
+
+def prepare_file(source: str, known_hash: str = None, part_size: int = None):
+    """
+    Runs in a worker process: streams the parts of one file onto the shared
+    part queue, which is bounded, so a large file waits for the embed stage.
+    """
+    for part in iter_parts(source, known_hash, part_size):
+        _part_queue.put(part)
+
+def embed_batch_with_retry(batch: list[str], model: str, max_retries: int) -> list[list[float]] | None:
+    """
+    Embeds one batch, retrying with exponential backoff.
+    Returns None if every attempt failed so the caller can skip just this batch.
+    """
+    for attempt in range(1, max_retries + 1):
+        try:
+            return cached_embeddings(batch, model=model)
+        except Exception as e:
+            logger.warning(f"Embedding batch failed (attempt {attempt}/{max_retries}): {e}")
+            if attempt < max_retries:
+                time.sleep(2 ** (attempt - 1))
+    return None
+
+def verify_embeddings(chunk: str, vector: list[float], model: str, tolerance: float = 1e-3) -> bool:
+    """
+    Compares a batched embedding against the single-call path.
+    Both use /api/embed, so the raw vectors must match: a scale difference
+    (e.g. one path not normalized) fails even if the direction is the same.
+    """
+    reference = get_ollama_embedding(chunk, model=model)
+    if not reference or len(reference) != len(vector):
+        logger.error("Verification failed: reference embedding unavailable or dimension mismatch.")
+        return False
+
+    max_diff = max(abs(a - b) for a, b in zip(vector, reference))
+    norm, reference_norm = math.sqrt(sum(a * a for a in vector)), math.sqrt(sum(b * b for b in reference))
+    logger.info(
+        f"Batched vs single embedding: max difference {max_diff:.6f}, "
+        f"norms {norm:.6f} / {reference_norm:.6f}"
+    )
+    return max_diff <= tolerance and abs(norm - reference_norm) <= tolerance * max(reference_norm, 1.0)
+
+def open_collection(full: bool = False, model: str = None, client=None):
+    """
+    Opens the live collection together with its manifest. When the manifest
+    can no longer be trusted, a new generation is created instead: it is
+    built next to the live one, which keeps serving queries until
+    publish_collection() swaps the alias. An already open vector store client can be reused.
+    Returns (client, collection, manifest).
+    """
+    model = model or config.EMBEDDING_MODEL
+    client = client or get_vector_client()
+    live_name = live_collection_name()
+    collection = client.get_or_create_collection(name=live_name)
+    manifest = IngestManifest(manifest_path(live_name))
+
+    # Without a trustworthy manifest we cannot tell which stored IDs are stale,
+    # and vectors from another model may have a different dimension.
+    rebuild_reason = None
+    if full:
+        rebuild_reason = "full re-index requested"
+    elif not manifest.exists and collection.count() > 0:
+        rebuild_reason = "no manifest found for existing collection"
+    elif manifest.exists and manifest.embedding_model != model:
+        rebuild_reason = f"embedding model changed ({manifest.embedding_model} -> {model})"
+    elif manifest.files and collection.count() == 0:
+        rebuild_reason = "collection is empty but manifest is not"
+
+    if rebuild_reason:
+        drop_unfinished_generations(client)
+        name = new_generation_name()
+        logger.info(f"Building new index generation {name}: {rebuild_reason}. Queries keep using {live_name}.")
+        collection = client.create_collection(name=name)
+        manifest = IngestManifest(manifest_path(name))
+        manifest.reset(model)
+    elif not manifest.exists:
+        manifest.reset(model)
+
+    return client, collection, manifest
+
+def finish_run(client, collection, manifest, completed: bool):
+    """
+    Publishes a rebuilt generation once its run completed, or discards it.
+    Incremental runs write to the live collection and need nothing here.
+    Returns the collection that is live afterwards.
+    """
+    if completed and publish_collection(client, collection, manifest):
+        return collection
+    discard_collection(client, collection)
+    return client.get_or_create_collection(name=live_collection_name())
+
+def open_lexical_index(collection) -> LexicalIndex | None:
+    """
+    Opens the BM25 index that belongs to a collection, backfilling it from
+    ChromaDB when the collection was built before the index existed.
+    """
+    if not config.LEXICAL_INDEX_ENABLED:
+        return None
+    index = LexicalIndex(lexical_index_path(collection.name))
+    total = collection.count()
+    if index.doc_count() == 0 and total > 0:
+        logger.info(f"Building lexical index for {total} chunks of {collection.name}...")
+        for offset in range(0, total, 1000):
+            batch = collection.get(limit=1000, offset=offset, include=["documents"])
+            for chunk_id, document in zip(batch["ids"], batch["documents"]):
+                index.add(chunk_id, document or "")
+        index.commit()
+    return index
+
+def scan_documents(path: str = None) -> list[str]:
+    path = path or config.DOCS_SOURCE_PATH
+    return sorted(
+        file_path
+        for ext in SUPPORTED_EXTENSIONS
+        for file_path in glob.glob(f"{path}/**/*{ext}", recursive=True)
+    )
+
+class IngestionPipeline:
+    """
+    Staged ingestion: read+chunk (process pool) -> embed (I/O threads) -> write (single thread).
+    Stages are connected by bounded queues, so memory use depends on the
+    queue sizes and not on the size of the corpus.
+    """
+    _DONE = object()
+
+    def __init__(
+        self,
+        collection,
+        manifest: IngestManifest,
+        model: str = None,
+        batch_size: int = config.INGEST_BATCH_SIZE,
+        concurrency: int = config.INGEST_CONCURRENCY,
+        max_retries: int = config.INGEST_MAX_RETRIES,
+        workers: int = config.INGEST_WORKERS,
+        queue_size: int = config.INGEST_QUEUE_SIZE,
+        part_size: int = config.INGEST_PART_CHUNKS,
+        upsert_batch_size: int = config.INGEST_UPSERT_BATCH_SIZE,
+        sequential: bool = False,
+        verify: bool = False,
+        dedup: bool = config.DEDUP_ENABLED,
+        lexical_index: LexicalIndex = None,
+        start_method: str = None,
+        on_file_done=None
+    ):
+        self.collection = collection
+        self.manifest = manifest
+        self.model = model or config.EMBEDDING_MODEL
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(1, max_retries)
+        self.workers = workers
+        self.queue_size = max(1, queue_size)
+        self.part_size = max(1, part_size)
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.sequential = sequential
+        self.verify = verify
+        self.start_method = start_method
+        # Called from pipeline threads with (source, status) as each file finishes
+        self.on_file_done = on_file_done
+
+        self._pool = None
+        self._writer_error = None
+        # Queue worker processes put parts on, and the files they are reading
+        self._parts = None
+        self._futures = {}
+        # Files with parts planned but not the last one yet
+        self._files = {}
+        self.stop_event = threading.Event()
+        self.stats = {
+            "skipped": 0, "updated": 0, "removed": 0, "failed": 0,
+            "embedded": 0, "deduplicated": 0, "deleted_chunks": 0
+        }
+        self._stats_lock = threading.Lock()
+        self._verify_lock = threading.Lock()
+
+        # BM25 index kept in step with the collection (optional)
+        self.lexical_index = lexical_index
+
+        # Near-duplicate lookup over stored chunks and chunks planned in this run
+        self.dedup = dedup
+        self._index = MinHashIndex()
+        if dedup:
+            for chunk_id, signature in manifest.signatures():
+                if chunk_id not in self._index:
+                    self._index.add(chunk_id, decode_signature(signature))
+        self._dedup_lock = threading.Lock()
+        # Planned chunks that are not written yet, and how many planned files refer to a chunk
+        self._in_flight = set()
+        self._pending_refs = {}
+        # Chunk IDs that may have lost their last reference
+        self._gc_candidates = set()
+        # Written files waiting for the chunks they refer to
+        self._deferred = []
+
+    def _count(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _file_done(self, source: str, status: str):
+        """Counts a finished file ("updated", "skipped", "removed", "failed") and reports it."""
+        self._count(status)
+        if self.on_file_done:
+            try:
+                self.on_file_done(source, status)
+            except Exception as e:
+                logger.error(f"Progress callback failed: {e}")
+
+    # --- Stage 1: read + chunk ---------------------------------------------
+
+    def _changed_files(self, files: list[str]):
+        """Yields (source, known file hash) for every file whose size or mtime changed."""
+        for source in files:
+            if self.stop_event.is_set():
+                return
+            try:
+                if self.manifest.is_unchanged(source, os.stat(source)):
+                    self._file_done(source, "skipped")
+                    continue
+            except OSError as e:
+                logger.error(f"Cannot stat {source}: {e}")
+                self._file_done(source, "failed")
+                continue
+            known = self.manifest.get(source)
+            yield source, known.get("file_hash") if known else None
+
+    def _prepared_parts(self, files: list[str]):
+        """
+        Yields PreparedPart results, keeping at most `queue_size` files in
+        flight in the process pool. Workers put parts on a bounded queue, so
+        neither many files nor one large file pile up in memory. Parts of one
+        file arrive in order, parts of different files interleave.
+        """
+        changed = self._changed_files(files)
+        if self._pool is None:
+            for source, known_hash in changed:
+                yield from iter_parts(source, known_hash, self.part_size)
+            return
+
+        while True:
+            while len(self._futures) < self.queue_size and not self.stop_event.is_set():
+                source, known_hash = next(changed, (None, None))
+                if source is None:
+                    break
+                self._futures[source] = self._pool.submit(prepare_file, source, known_hash, self.part_size)
+            if not self._futures:
+                return
+            try:
+                part = self._parts.get(timeout=1.0)
+            except queue.Empty:
+                # A worker process that died never sends the last part of its file
+                for source, future in list(self._futures.items()):
+                    if future.done() and future.exception() is not None:
+                        del self._futures[source]
+                        yield PreparedPart(source=source, error=str(future.exception()))
+                continue
+            if part.last:
+                self._futures.pop(part.source, None)
+            yield part
+
+    def _close_pool(self):
+        """Cancels queued files and lets running workers finish, draining the parts they still put."""
+        for future in self._futures.values():
+            future.cancel()
+        while any(not future.done() for future in self._futures.values()):
+            try:
+                self._parts.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._futures = {}
+        self._pool.shutdown(cancel_futures=True)
+        self._pool = None
+
+    def _plan(self, part: PreparedPart) -> EmbedJob | None:
+        """Diffs a prepared part against the manifest and returns the work left to do."""
+        source = part.source
+        if part.chunks is None:
+            # Same content as indexed, only the mtime changed
+            self.manifest.touch(source, part.stat)
+            self._file_done(source, "skipped")
+            return None
+
+        state = self._files.get(source)
+        if state is None:
+            state = self._files[source] = FileState(
+                source=source, stat=part.stat, file_hash=part.file_hash,
+                old_ids=set(self.manifest.chunk_ids(source)), old_refs=set(self.manifest.duplicate_ids(source))
+            )
+            # Only chunks of other files can be canonical; this file's own may be going away
+            state.own_ids.update(state.old_ids)
+        if part.last:
+            del self._files[source]
+            if part.start == 0 and not part.chunks:
+                logger.warning(f"Skipping empty file: {source}")
+
+        chunks = part.chunks
+        chunk_hashes = [hash_text(chunk.text) for chunk in chunks]
+        chunk_ids = make_chunk_ids(source, chunk_hashes, state.id_counts)
+        state.own_ids.update(chunk_ids)
+        tags = source_tags(source)
+        metadatas = []
+        for i, (chunk, chunk_hash) in enumerate(zip(chunks, chunk_hashes)):
+            metadata = {
+                "source": source,
+                "sources": [source],
+                "chunk_index": part.start + i,
+                "chunk_hash": chunk_hash,
+                "heading_path": chunk.heading_path,
+                "tokens": chunk.tokens,
+                "doc_type": doc_type(source)
+            }
+            # ChromaDB metadata values cannot be None or empty lists
+            if chunk.page is not None:
+                metadata["page"] = chunk.page
+            if tags:
+                metadata["tags"] = tags
+            metadatas.append(metadata)
+
+        signatures = part.signatures if self.dedup and part.signatures else [None] * len(chunks)
+        job = EmbedJob(
+            part=part, file=state, number=state.parts,
+            chunk_ids=chunk_ids, chunk_hashes=chunk_hashes, metadatas=metadatas
+        )
+        state.parts += 1
+        with self._dedup_lock:
+            for i, cid in enumerate(chunk_ids):
+                if cid in state.old_ids:
+                    job.kept_positions.append(i)
+                    continue
+                signature = decode_signature(signatures[i])
+                canonical = self._index.find(signature, exclude=state.own_ids) if signature is not None else None
+                if canonical:
+                    job.duplicate_positions.append(i)
+                    job.duplicates[canonical] = encode_signature(self._index.get(canonical))
+                    continue
+                # Only chunks whose content-addressed ID is not stored yet need embedding
+                job.new_positions.append(i)
+                if signature is not None:
+                    self._index.add(cid, signature)
+                    self._in_flight.add(cid)
+            # A canonical chunk is protected from garbage collection until the file is recorded
+            for canonical in job.duplicates.keys() - state.refs:
+                self._pending_refs[canonical] = self._pending_refs.get(canonical, 0) + 1
+                state.refs.add(canonical)
+
+        state.planned_ids.update(chunk_ids[i] for i in job.new_positions + job.kept_positions)
+        self._count("deduplicated", len(job.duplicate_positions))
+        return job
+
+    def _end_file(self, source: str) -> EmbedJob | None:
+        """
+        An empty last part for a file that failed or was cut off after some of
+        its parts were planned, so the writer gives the whole file up.
+        """
+        state = self._files.pop(source, None)
+        if state is None:
+            return None
+        state.failed = True
+        job = EmbedJob(part=PreparedPart(source=source, chunks=[], last=True), file=state, number=state.parts)
+        state.parts += 1
+        return job
+
+    # --- Stage 2: embed -------------------------------------------------------
+
+    def _embed_worker(self, embed_queue: queue.Queue, write_queue: queue.Queue):
+        while True:
+            job = embed_queue.get()
+            if job is self._DONE:
+                break
+            try:
+                item = WriteJob(job=job, vectors=self._embed(job))
+            except Exception as e:
+                logger.error(f"Error embedding {job.part.source}: {e}")
+                item = WriteJob(job=job, failed=True)
+            write_queue.put(item)
+
+    def _embed(self, job: EmbedJob) -> dict:
+        texts = [job.part.chunks[i].text for i in job.new_positions]
+        if self.sequential:
+            vectors = [cached_embedding(text, model=self.model) for text in texts]
+        else:
+            vectors = []
+            for start in range(0, len(texts), self.batch_size):
+                if self.stop_event.is_set():
+                    return {}
+                batch = texts[start:start + self.batch_size]
+                result = embed_batch_with_retry(batch, self.model, self.max_retries)
+                vectors.extend(result if result is not None else [None] * len(batch))
+            self._verify_once(texts, vectors)
+        return {pos: vector for pos, vector in zip(job.new_positions, vectors) if vector}
+
+    def _verify_once(self, texts: list[str], vectors: list):
+        with self._verify_lock:
+            if not self.verify or not vectors or not vectors[0]:
+                return
+            self.verify = False
+            if not verify_embeddings(texts[0], vectors[0], self.model):
+                logger.critical("Batched embeddings do not match the single-call path. Aborting.")
+                self.stop_event.set()
+
+    # --- Stage 3: write -------------------------------------------------------
+
+    def _writer(self, write_queue: queue.Queue):
+        buffer = []
+        buffered_chunks = 0
+        item = None
+        try:
+            while True:
+                item = write_queue.get()
+                if item is self._DONE:
+                    break
+                buffer.append(item)
+                buffered_chunks += len(item.vectors)
+                if buffered_chunks >= self.upsert_batch_size:
+                    self._flush(buffer)
+                    buffer, buffered_chunks = [], 0
+            if buffer:
+                self._flush(buffer)
+            self._record_ready(final=True)
+            self._collect_garbage()
+        except Exception as e:
+            # Stop the other stages and keep draining, so nothing blocks on the
+            # bounded queue; run() re-raises the error once the stages are joined.
+            logger.critical(f"Writer failed, stopping the pipeline: {e}")
+            self._writer_error = e
+            self.stop_event.set()
+            while item is not self._DONE:
+                item = write_queue.get()
+
+    def _flush(self, buffer: list[WriteJob]):
+        """Writes the parts of several files in one upsert, then records finished files in the manifest."""
+        ids, embeddings, documents, metadatas = [], [], [], []
+        kept_ids, kept_metadatas = [], []
+        written = [item for item in buffer if not item.failed]
+        for item in written:
+            job = item.job
+            for pos, vector in item.vectors.items():
+                ids.append(job.chunk_ids[pos])
+                embeddings.append(vector)
+                documents.append(job.part.chunks[pos].text)
+                metadatas.append(job.metadatas[pos])
+            # Unchanged chunks may have moved; refresh their position without re-embedding.
+            # Their source list is left alone, other files may refer to them.
+            kept_ids.extend(job.chunk_ids[i] for i in job.kept_positions)
+            kept_metadatas.extend(
+                {key: value for key, value in job.metadatas[i].items() if key != "sources"}
+                for i in job.kept_positions
+            )
+
+        try:
+            for start in range(0, len(ids), self.upsert_batch_size):
+                end = start + self.upsert_batch_size
+                self.collection.upsert(
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    documents=documents[start:end],
+                    metadatas=metadatas[start:end]
+                )
+            for start in range(0, len(kept_ids), self.upsert_batch_size):
+                end = start + self.upsert_batch_size
+                self.collection.update(ids=kept_ids[start:end], metadatas=kept_metadatas[start:end])
+        except Exception as e:
+            logger.error(f"Error writing {len(written)} file parts to the vector store: {e}")
+            for item in written:
+                item.failed = True
+        else:
+            self._count("embedded", len(ids))
+            if self.lexical_index:
+                for chunk_id, document in zip(ids, documents):
+                    self.lexical_index.add(chunk_id, document)
+
+        for item in buffer:
+            self._part_written(item)
+        self._record_ready()
+        self._collect_garbage()
+
+    def _part_written(self, item: WriteJob):
+        """Adds a written (or failed) part to its file; a file is done once all its parts are."""
+        job, state = item.job, item.job.file
+        state.written += 1
+        state.new_ids.extend(job.chunk_ids[pos] for pos in job.new_positions)
+        if item.failed:
+            state.failed = True
+        else:
+            signatures = job.part.signatures or [None] * len(job.chunk_ids)
+            for pos in job.new_positions:
+                if pos not in item.vectors:
+                    logger.warning(f"Failed to get embedding for chunk {job.part.start + pos} in {state.source}")
+                    state.failed_ids.add(job.chunk_ids[pos])
+            state.stored.extend(
+                (job.part.start + pos, job.chunk_ids[pos], job.chunk_hashes[pos], signatures[pos])
+                for pos in job.new_positions + job.kept_positions
+            )
+            state.duplicates.update(job.duplicates)
+        if job.part.last:
+            state.total = job.number + 1
+        if state.written != state.total:
+            return
+        if state.failed:
+            self._give_up(state)
+        else:
+            self._deferred.append(state)
+
+    def _record_ready(self, final: bool = False):
+        """
+        Records written files in the manifest. A file that refers to a chunk
+        planned by another file waits until that chunk is written or has failed.
+        """
+        while self._deferred:
+            with self._dedup_lock:
+                ready = [
+                    state for state in self._deferred
+                    if final or not any(cid in self._in_flight for cid in state.duplicates)
+                ]
+            if not ready:
+                return
+            ready_ids = {id(state) for state in ready}
+            self._deferred = [state for state in self._deferred if id(state) not in ready_ids]
+            for state in ready:
+                self._record(state)
+
+    def _record(self, state: FileState):
+        self._resolve(state, state.failed_ids)
+
+        # References to chunks that never got stored are dropped like failed chunks
+        duplicates = {cid: signature for cid, signature in state.duplicates.items() if self.manifest.sources_of(cid)}
+        lost = len(state.duplicates) - len(duplicates)
+        if lost:
+            logger.warning(f"{lost} near-duplicate chunks of {state.source} lost their canonical chunk")
+
+        # Failed chunks are left out of the manifest so the next run retries them.
+        # Forgetting the file hash forces that next run to look at the file again.
+        stored = [entry[1:] for entry in sorted(state.stored) if entry[1] not in state.failed_ids]
+        self.manifest.update(
+            state.source, state.stat, None if state.failed_ids or lost else state.file_hash,
+            [c[0] for c in stored], [c[1] for c in stored], [c[2] for c in stored], duplicates
+        )
+        self._release_refs(state)
+        with self._dedup_lock:
+            self._gc_candidates.update((state.old_ids | state.old_refs) - state.planned_ids - set(state.duplicates))
+            # Re-embedded chunks were upserted with only this file as source
+            self._gc_candidates.update(cid for cid, _, _ in stored if len(self.manifest.sources_of(cid)) > 1)
+        self._file_done(state.source, "updated")
+
+    # --- Near-duplicate bookkeeping ---------------------------------------------
+
+    def _resolve(self, state: FileState, failed_ids: set):
+        """Marks the file's planned chunks as written, dropping failed ones from the index."""
+        with self._dedup_lock:
+            for cid in state.new_ids:
+                if cid in self._in_flight:
+                    self._in_flight.discard(cid)
+                    if cid in failed_ids:
+                        self._index.remove(cid)
+
+    def _release_refs(self, state: FileState):
+        with self._dedup_lock:
+            for cid in state.refs:
+                self._pending_refs[cid] -= 1
+                if not self._pending_refs[cid]:
+                    del self._pending_refs[cid]
+                self._gc_candidates.add(cid)
+
+    def _give_up(self, state: FileState):
+        """
+        Drops a file that failed part way: it keeps its old manifest entry, so
+        the next run tries again, and chunks written for it that nothing
+        refers to are collected.
+        """
+        self._resolve(state, set(state.new_ids))
+        self._release_refs(state)
+        with self._dedup_lock:
+            self._gc_candidates.update(state.new_ids)
+        self._file_done(state.source, "failed")
+
+    def _collect_garbage(self):
+        """
+        Deletes chunks no file refers to any more and refreshes the source
+        list of chunks shared by several files.
+        """
+        delete, refresh = [], {}
+        with self._dedup_lock:
+            candidates, self._gc_candidates = self._gc_candidates, set()
+            for cid in candidates:
+                if self._pending_refs.get(cid):
+                    # A planned file is about to refer to it, look again later
+                    self._gc_candidates.add(cid)
+                    continue
+                sources = self.manifest.sources_of(cid)
+                if sources:
+                    refresh[cid] = sources
+                else:
+                    delete.append(cid)
+                    self._index.remove(cid)
+
+        try:
+            for start in range(0, len(delete), self.upsert_batch_size):
+                self.collection.delete(ids=delete[start:start + self.upsert_batch_size])
+            refresh_ids = list(refresh)
+            for start in range(0, len(refresh_ids), self.upsert_batch_size):
+                batch = refresh_ids[start:start + self.upsert_batch_size]
+                self.collection.update(
+                    ids=batch,
+                    metadatas=[self._shared_metadata(cid, refresh[cid]) for cid in batch]
+                )
+        except Exception as e:
+            logger.error(f"Error cleaning up chunks in the vector store: {e}")
+            return
+        if self.lexical_index and delete:
+            self.lexical_index.delete(delete)
+        if delete and get_score_cache():
+            get_score_cache().invalidate(delete)
+        self._count("deleted_chunks", len(delete))
+
+    def _shared_metadata(self, chunk_id: str, sources: list[str]) -> dict:
+        """Metadata update for a chunk whose list of referring files changed (None drops a key)."""
+        metadata = {"source": sources[0], "sources": sources, "tags": merged_tags(sources) or None}
+        if not self.manifest.stores(sources[0], chunk_id):
+            # The storing file is gone and the chunk moved to a file that only refers to it.
+            # Its position and page belong to the old file, so it must not be stitched to
+            # neighbours in the new one.
+            metadata.update(chunk_index=None, page=None)
+        return metadata
+
+    # --- Orchestration --------------------------------------------------------
+
+    def remove_sources(self, sources: list[str]):
+        """Deletes every chunk of files that no longer exist."""
+        for source in sources:
+            self._gc_candidates.update(self.manifest.remove(source))
+            self._file_done(source, "removed")
+        self._collect_garbage()
+
+    def run(self, files: list[str], progress=None) -> dict:
+        """
+        Pushes `files` through all stages and returns the run statistics.
+        `progress` is an optional iterable wrapper such as tqdm.
+        """
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        embedders = [
+            threading.Thread(target=self._embed_worker, args=(embed_queue, write_queue), daemon=True)
+            for _ in range(self.concurrency)
+        ]
+        writer = threading.Thread(target=self._writer, args=(write_queue,), daemon=True)
+        for thread in embedders + [writer]:
+            thread.start()
+
+        self._pool = None
+        if self.workers > 0:
+            context = multiprocessing.get_context(self.start_method)
+            self._parts = context.Queue(maxsize=self.queue_size)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context,
+                initializer=_init_worker, initargs=(self._parts,)
+            )
+        started = time.perf_counter()
+        try:
+            parts = self._prepared_parts(files)
+            if progress:
+                parts = progress(parts)
+            for part in parts:
+                if part.error:
+                    logger.error(f"Error processing file {part.source}: {part.error}")
+                    job = self._end_file(part.source)
+                    if job is None:
+                        self._file_done(part.source, "failed")
+                        continue
+                else:
+                    job = self._plan(part)
+                if job:
+                    embed_queue.put(job)
+                if self.stop_event.is_set():
+                    break
+        finally:
+            # Files cut off by a stop are given up as a whole
+            for source in list(self._files):
+                embed_queue.put(self._end_file(source))
+            for _ in embedders:
+                embed_queue.put(self._DONE)
+            for thread in embedders:
+                thread.join()
+            write_queue.put(self._DONE)
+            writer.join()
+            if self._pool:
+                self._close_pool()
+            self.manifest.embedding_model = self.model
+            self.manifest.save()
+            if self.lexical_index:
+                self.lexical_index.commit()
+
+        if self._writer_error:
+            raise self._writer_error
+        self.stats["seconds"] = time.perf_counter() - started
+        return self.stats
+
+def log_stats(stats: dict):
+    elapsed = stats.get("seconds", 0.0)
+    rate = stats["embedded"] / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Files: {stats['updated']} updated, {stats['skipped']} unchanged, {stats['removed']} removed, "
+        f"{stats['failed']} failed. Chunks: {stats['embedded']} embedded, "
+        f"{stats.get('deduplicated', 0)} near duplicates skipped, {stats['deleted_chunks']} deleted."
+    )
+    logger.info(f"Embedded {stats['embedded']} chunks in {elapsed:.1f}s ({rate:.1f} chunks/sec).")
+    if get_embedding_cache():
+        get_embedding_cache().log_stats()
+
+def ingest_documents(full: bool = False, progress=None, **pipeline_options) -> dict | None:
+    """
+    Indexes every document under DOCS_SOURCE_PATH incrementally.
+    `pipeline_options` are passed to IngestionPipeline (batch_size, workers, ...).
+    """
+    logger.info(f"Connecting to the {config.VECTOR_BACKEND} vector store...")
+    try:
+        client, collection, manifest = open_collection(full=full)
+    except Exception as e:
+        logger.critical(f"Failed to connect to the {config.VECTOR_BACKEND} vector store: {e}")
+        return None
+
+    logger.info(f"Scanning documents in {config.DOCS_SOURCE_PATH}...")
+    files = scan_documents()
+    logger.info(f"Found {len(files)} documents.")
+
+    pipeline_options.setdefault("lexical_index", open_lexical_index(collection))
+    pipeline = IngestionPipeline(collection, manifest, **pipeline_options)
+    mode = "sequential" if pipeline.sequential else f"batched (batch_size={pipeline.batch_size})"
+    logger.info(
+        f"Pipeline: {pipeline.workers} read/chunk processes, {pipeline.concurrency} embedding threads, "
+        f"{mode}, upserts of {pipeline.upsert_batch_size}."
+    )
+
+    on_disk = set(files)
+    pipeline.remove_sources([source for source in manifest.files if source not in on_disk])
+    stats = pipeline.run(files, progress=progress)
+
+    log_stats(stats)
+    collection = finish_run(client, collection, manifest, completed=not pipeline.stop_event.is_set())
+    logger.info(f"Ingestion complete! Total documents in {collection.name}: {collection.count()}")
+    return stats
@@ -0,0 +1,161 @@
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from src.config import config
+from src.utils import setup_logger
+from src.index_alias import live_collection_name
+from src.ingestion import (
+    IngestionPipeline, SUPPORTED_EXTENSIONS, open_collection, open_lexical_index, finish_run, scan_documents, log_stats
+)
+
+logger = setup_logger("Jobs")
+
+class IngestionJob:
+    """
+    Runs the ingestion pipeline in a background thread of the current process.
+    The UI polls `snapshot()` for progress and may call `cancel()` at any time.
+    """
+    def __init__(
+        self,
+        files: list[str] = None,
+        embedding_model: str = None,
+        client=None,
+        full: bool = False,
+        **pipeline_options
+    ):
+        # files=None means a full scan of DOCS_SOURCE_PATH
+        self.files = files
+        self.embedding_model = embedding_model or config.EMBEDDING_MODEL
+        self.client = client
+        self.full = full
+        self.pipeline_options = pipeline_options
+
+        self.status = "pending"
+        self.error = None
+        self.stats = None
+        self.collection = None
+        self.total = 0
+        self.done = 0
+        self.current_file = None
+        self.recent = deque(maxlen=20)
+        self.started_at = None
+        self.finished_at = None
+
+        self._pipeline = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="ingestion-job", daemon=True)
+
+    def start(self) -> "IngestionJob":
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._pipeline:
+            self._pipeline.stop_event.set()
+
+    @property
+    def running(self) -> bool:
+        return self.status in ("pending", "running")
+
+    def _on_file_done(self, source: str, status: str):
+        with self._lock:
+            self.done += 1
+            self.current_file = source
+            self.recent.append((source, status))
+
+    def eta_seconds(self) -> float | None:
+        if not self.started_at or self.done == 0 or self.total == 0:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.done * (self.total - self.done)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.status,
+                "done": self.done,
+                "total": self.total,
+                "progress": self.done / self.total if self.total else 0.0,
+                "current_file": self.current_file,
+                "eta_seconds": self.eta_seconds(),
+                "recent": list(self.recent),
+                "stats": self.stats,
+                "error": self.error
+            }
+
+    def _run(self):
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            live_name = live_collection_name()
+            self.client, self.collection, manifest = open_collection(
+                full=self.full, model=self.embedding_model, client=self.client
+            )
+            if self.files is None:
+                files = scan_documents()
+                removed = [s for s in manifest.files if s not in set(files)]
+            else:
+                files = [f for f in self.files if f.endswith(SUPPORTED_EXTENSIONS)]
+                removed = []
+                if self.collection.name != live_name:
+                    # A new generation replaces the live index, so it must hold the whole knowledge base
+                    logger.warning(
+                        f"Index {self.collection.name} is rebuilt from scratch, indexing all of "
+                        f"{config.DOCS_SOURCE_PATH} instead of only the {len(files)} given files."
+                    )
+                    scanned = scan_documents()
+                    files = scanned + [f for f in files if f not in set(scanned)]
+            self.total = len(files) + len(removed)
+
+            options = {"start_method": "spawn", "lexical_index": open_lexical_index(self.collection), **self.pipeline_options}
+            # Spawning worker processes costs more than chunking a few uploads in-process
+            if len(files) < config.INGEST_JOB_POOL_THRESHOLD:
+                options["workers"] = 0
+            self._pipeline = IngestionPipeline(
+                self.collection, manifest, model=self.embedding_model, on_file_done=self._on_file_done, **options
+            )
+            if self._cancelled.is_set():
+                self._pipeline.stop_event.set()
+
+            self._pipeline.remove_sources(removed)
+            self.stats = self._pipeline.run(files)
+            log_stats(self.stats)
+
+            # A rebuilt generation only replaces the live index once it is complete and valid
+            built = self.collection
+            completed = not self._pipeline.stop_event.is_set()
+            self.collection = finish_run(self.client, built, manifest, completed=completed)
+            if self._cancelled.is_set():
+                self.status = "cancelled"
+            elif self.collection.name != built.name:
+                self.error = f"Rebuilt index {built.name} failed validation, still serving {self.collection.name}"
+                self.status = "failed"
+            else:
+                self.status = "completed"
+        except Exception as e:
+            logger.error(f"Ingestion job failed: {e}")
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.finished_at = datetime.now()
+
+# Only one job writes to the index at a time, shared by all sessions of the process
+_current_job = None
+_jobs_lock = threading.Lock()
+
+def start_ingestion_job(**job_options) -> IngestionJob:
+    """
+    Starts a background ingestion job, or returns the one already running.
+    """
+    global _current_job
+    with _jobs_lock:
+        if _current_job and _current_job.running:
+            return _current_job
+        _current_job = IngestionJob(**job_options).start()
+        return _current_job
+
+def get_current_job() -> IngestionJob | None:
+    return _current_job
@@ -0,0 +1,300 @@
+import os
+import re
+import json
+import math
+import shutil
+import hashlib
+import threading
+from collections import Counter
+import numpy as np
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("Lexical")
+
+# Identifiers such as get_ollama_embedding, CHROMA_DB_PATH, E1234, os.path.join
+# are kept whole and also split into their parts.
+TOKEN_RE = re.compile(r"\w+(?:[.\-:/]\w+)*")
+PART_RE = re.compile(r"[._\-:/]+")
+SEGMENT_FILES = ("term_hashes", "term_offsets", "post_docs", "post_tfs", "doc_lengths", "doc_ids")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for match in TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        parts = [part for part in PART_RE.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def lexical_index_path(collection_name: str) -> str:
+    return os.path.join(config.LEXICAL_INDEX_DIR, collection_name)
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = None) -> list[str]:
+    """Merges ranked ID lists; an ID scores sum(1 / (k + rank)) over the lists it appears in."""
+    k = config.RRF_K if k is None else k
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item_id: -scores[item_id])
+
+class Segment:
+    """
+    One immutable, memory-mapped slice of the index. Postings are grouped by
+    term, and terms are stored as sorted 64-bit hashes, so a lookup is a
+    binary search over the mapped array and nothing is parsed at load time.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        # Segments are numbered in write order (seg_000001, ...)
+        suffix = os.path.basename(path).rsplit("_", 1)[-1]
+        self.number = int(suffix) if suffix.isdigit() else 0
+        self._ids = None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in SEGMENT_FILES}
+        self.term_hashes = arrays["term_hashes"]
+        self.term_offsets = arrays["term_offsets"]
+        self.post_docs = arrays["post_docs"]
+        self.post_tfs = arrays["post_tfs"]
+        self.doc_lengths = arrays["doc_lengths"]
+        self.doc_ids = arrays["doc_ids"]
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def ids(self) -> set[str]:
+        """Chunk IDs of the segment, decoded on first use."""
+        if self._ids is None:
+            self._ids = {chunk_id.decode("utf-8") for chunk_id in self.doc_ids}
+        return self._ids
+
+    def postings(self, value: np.uint64) -> tuple[np.ndarray, np.ndarray] | None:
+        i = int(np.searchsorted(self.term_hashes, value))
+        if i >= len(self.term_hashes) or self.term_hashes[i] != value:
+            return None
+        start, end = int(self.term_offsets[i]), int(self.term_offsets[i + 1])
+        return self.post_docs[start:end], self.post_tfs[start:end]
+
+    @staticmethod
+    def write(path: str, doc_ids: list[str], doc_lengths, hashes, docs, tfs):
+        """Writes postings given as parallel (term hash, doc, tf) arrays."""
+        os.makedirs(path, exist_ok=True)
+        order = np.lexsort((docs, hashes))
+        hashes, docs, tfs = hashes[order], docs[order], tfs[order]
+        terms, starts = np.unique(hashes, return_index=True)
+        offsets = np.append(starts, len(hashes)).astype(np.uint64)
+        # Fixed-width byte strings keep the ID array memory-mappable
+        ids = np.array([chunk_id.encode("utf-8") for chunk_id in doc_ids] or [b""], dtype=bytes)[:len(doc_ids)]
+        np.save(os.path.join(path, "term_hashes.npy"), terms.astype(np.uint64))
+        np.save(os.path.join(path, "term_offsets.npy"), offsets)
+        np.save(os.path.join(path, "post_docs.npy"), docs.astype(np.uint32))
+        np.save(os.path.join(path, "post_tfs.npy"), np.minimum(tfs, 65535).astype(np.uint16))
+        np.save(os.path.join(path, "doc_lengths.npy"), np.asarray(doc_lengths, dtype=np.uint32))
+        np.save(os.path.join(path, "doc_ids.npy"), ids)
+
+class LexicalIndex:
+    """
+    BM25 index over chunk texts, stored next to a Chroma collection.
+    New chunks are buffered and written as an immutable segment on commit();
+    deleted chunks are tombstoned until segments are merged. A tombstone only
+    hides the copies in segments written before the delete, so a chunk ID that
+    comes back (a reverted edit, a restored file) is searchable again.
+    `segments.json` is replaced atomically, so readers always see a consistent
+    set of segments.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.meta_path = os.path.join(path, "segments.json")
+        self._lock = threading.Lock()
+        self._pending = []
+        self._dirty = False
+        self._meta_mtime = None
+        self._load()
+
+    # --- Reading -----------------------------------------------------------------
+
+    def _load(self):
+        meta = {"segments": [], "next_segment": 1, "tombstones": []}
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._meta_mtime = os.stat(self.meta_path).st_mtime
+        except FileNotFoundError:
+            self._meta_mtime = None
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read lexical index {self.path}: {e}")
+        self.next_segment = meta["next_segment"]
+        # chunk_id -> first segment number its tombstone does not apply to.
+        # Older indexes stored a plain list, which covers every segment written so far.
+        tombstones = meta["tombstones"]
+        self.tombstones = dict(tombstones) if isinstance(tombstones, dict) else dict.fromkeys(tombstones, self.next_segment)
+        self.segments = []
+        for name in meta["segments"]:
+            try:
+                self.segments.append(Segment(os.path.join(self.path, name)))
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not open lexical segment {name}: {e}")
+        self.total_docs = sum(len(segment) for segment in self.segments)
+        self.total_length = sum(int(segment.doc_lengths.sum()) for segment in self.segments)
+        self.dead_docs = self._count_dead()
+
+    def _count_dead(self) -> int:
+        """Stored postings hidden by tombstones."""
+        return sum(
+            1 for segment in self.segments for chunk_id, horizon in self.tombstones.items()
+            if segment.number < horizon and chunk_id in segment.ids()
+        )
+
+    def refresh(self):
+        """Picks up segments committed by another process (one stat call)."""
+        try:
+            mtime = os.stat(self.meta_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._meta_mtime:
+            with self._lock:
+                self._load()
+
+    def doc_count(self) -> int:
+        return self.total_docs - self.dead_docs + len(self._pending)
+
+    def search(self, query: str, k: int = None) -> list[tuple[str, float]]:
+        """Returns up to k (chunk_id, BM25 score) pairs, best first."""
+        k = k or config.RETRIEVAL_CANDIDATES
+        terms = Counter(tokenize(query))
+        segments, tombstones = self.segments, self.tombstones
+        live_docs = self.total_docs - self.dead_docs
+        if not terms or live_docs <= 0:
+            return []
+        avg_length = self.total_length / max(1, self.total_docs)
+
+        hashes = {term: np.uint64(term_hash(term)) for term in terms}
+        postings = [{term: segment.postings(value) for term, value in hashes.items()} for segment in segments]
+        # Document frequency over all segments (tombstoned chunks count until the next merge)
+        df = {term: sum(len(p[term][0]) for p in postings if p[term] is not None) for term in terms}
+
+        results = []
+        for segment, segment_postings in zip(segments, postings):
+            scores = np.zeros(len(segment), dtype=np.float32)
+            for term, found in segment_postings.items():
+                if found is None:
+                    continue
+                docs, tfs = found
+                idf = math.log(1 + (live_docs - df[term] + 0.5) / (df[term] + 0.5))
+                tf = tfs.astype(np.float32)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.doc_lengths[docs] / avg_length)
+                # A term lists each document once, so plain fancy indexing is safe
+                scores[docs] += terms[term] * idf * tf * (BM25_K1 + 1) / (tf + norm)
+            matched = np.flatnonzero(scores)
+            if not len(matched):
+                continue
+            top = min(len(matched), k + len(tombstones))
+            best = matched[np.argpartition(-scores[matched], top - 1)[:top]]
+            for doc in best:
+                chunk_id = segment.doc_ids[doc].decode("utf-8")
+                if segment.number >= tombstones.get(chunk_id, 0):
+                    results.append((chunk_id, float(scores[doc])))
+
+        results.sort(key=lambda item: -item[1])
+        return results[:k]
+
+    # --- Writing -----------------------------------------------------------------
+
+    def add(self, chunk_id: str, text: str):
+        tokens = tokenize(text)
+        with self._lock:
+            self._pending.append((chunk_id, Counter(tokens), len(tokens)))
+            self._dirty = True
+            full = len(self._pending) >= config.LEXICAL_SEGMENT_DOCS
+        if full:
+            self.commit()
+
+    def delete(self, chunk_ids: list[str]):
+        with self._lock:
+            removed = set(chunk_ids)
+            self._pending = [doc for doc in self._pending if doc[0] not in removed]
+            # Hides the copies written so far; the chunk may be added again into a later segment
+            for chunk_id in removed:
+                self.tombstones[chunk_id] = self.next_segment
+            self.dead_docs = self._count_dead()
+            self._dirty = True
+
+    def commit(self):
+        """Writes buffered chunks as a new segment and merges segments when there are too many."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            names = [os.path.basename(segment.path) for segment in self.segments]
+            if self._pending:
+                name = f"seg_{self.next_segment:06d}"
+                self.next_segment += 1
+                self._write_pending(os.path.join(self.path, name))
+                names.append(name)
+            garbage = []
+            if len(names) > config.LEXICAL_MAX_SEGMENTS or self.dead_docs > 0.2 * max(1, self.total_docs):
+                garbage = names
+                name = f"seg_{self.next_segment:06d}"
+                self.next_segment += 1
+                self._merge([os.path.join(self.path, n) for n in names], os.path.join(self.path, name))
+                names = [name]
+                self.tombstones = {}
+            self._write_meta(names)
+            self._load()
+        # Readers that still map old segments keep working on POSIX; elsewhere they are removed later
+        for name in garbage:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _write_pending(self, path: str):
+        doc_ids, lengths, hashes, docs, tfs = [], [], [], [], []
+        for doc, (chunk_id, counts, length) in enumerate(self._pending):
+            doc_ids.append(chunk_id)
+            lengths.append(length)
+            for term, count in counts.items():
+                hashes.append(term_hash(term))
+                docs.append(doc)
+                tfs.append(count)
+        Segment.write(
+            path, doc_ids, lengths,
+            np.array(hashes, dtype=np.uint64), np.array(docs, dtype=np.uint32), np.array(tfs, dtype=np.uint32)
+        )
+        self._pending = []
+
+    def _merge(self, paths: list[str], target: str):
+        """Rewrites segments into one, dropping tombstoned chunks, without re-tokenizing."""
+        doc_ids, lengths, hashes, docs, tfs = [], [], [], [], []
+        base = 0
+        for path in paths:
+            segment = Segment(path)
+            ids = [chunk_id.decode("utf-8") for chunk_id in segment.doc_ids]
+            keep = np.array([segment.number >= self.tombstones.get(chunk_id, 0) for chunk_id in ids], dtype=bool)
+            remap = np.cumsum(keep) - 1 + base
+            counts = np.diff(segment.term_offsets.astype(np.int64))
+            posting_hashes = np.repeat(np.asarray(segment.term_hashes), counts)
+            mask = keep[segment.post_docs] if len(segment.post_docs) else np.zeros(0, dtype=bool)
+            hashes.append(posting_hashes[mask])
+            docs.append(remap[np.asarray(segment.post_docs)[mask]].astype(np.uint32))
+            tfs.append(np.asarray(segment.post_tfs)[mask].astype(np.uint32))
+            doc_ids.extend(chunk_id for chunk_id, kept in zip(ids, keep) if kept)
+            lengths.append(np.asarray(segment.doc_lengths)[keep])
+            base += int(keep.sum())
+        Segment.write(
+            target, doc_ids, np.concatenate(lengths) if lengths else [],
+            np.concatenate(hashes) if hashes else np.array([], dtype=np.uint64),
+            np.concatenate(docs) if docs else np.array([], dtype=np.uint32),
+            np.concatenate(tfs) if tfs else np.array([], dtype=np.uint32)
+        )
+
+    def _write_meta(self, names: list[str]):
+        os.makedirs(self.path, exist_ok=True)
+        meta = {"segments": names, "next_segment": self.next_segment, "tombstones": dict(sorted(self.tombstones.items()))}
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
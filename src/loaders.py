@@ -0,0 +1,51 @@
+import os
+from typing import Iterator
+from src.chunking import Chunk, chunk_markdown
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+SUPPORTED_EXTENSIONS = (".md", ".txt", ".pdf")
+
+def iter_pdf_pages(path: str) -> Iterator[tuple[int, str]]:
+    """
+    Yields (page_number, text) one page at a time.
+    PdfReader is given an open file instead of a path: with a path it copies
+    the whole file into memory, with a file it seeks and parses pages lazily.
+    """
+    if PdfReader is None:
+        raise RuntimeError("pypdf is not installed, cannot read PDF files")
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        for number, page in enumerate(reader.pages, start=1):
+            yield number, page.extract_text() or ""
+
+def _chunk_pdf(path: str) -> Iterator[Chunk]:
+    # Pages are chunked separately so every chunk maps to exactly one page
+    for number, text in iter_pdf_pages(path):
+        for chunk in chunk_markdown(text):
+            chunk.page = number
+            yield chunk
+
+def _chunk_lines(path: str, errors: str) -> Iterator[Chunk]:
+    with open(path, "r", encoding="utf-8", errors=errors) as f:
+        yield from chunk_markdown(f)
+
+def doc_type(path: str) -> str:
+    return os.path.splitext(path)[1].lower().lstrip(".")
+
+def load_chunks(path: str) -> Iterator[Chunk]:
+    """
+    Streams a supported document into chunks without reading it whole.
+    Markdown must be valid UTF-8; plain text tolerates bad bytes.
+    """
+    kind = doc_type(path)
+    if kind == "pdf":
+        return _chunk_pdf(path)
+    if kind == "txt":
+        return _chunk_lines(path, errors="replace")
+    if kind == "md":
+        return _chunk_lines(path, errors="strict")
+    raise ValueError(f"Unsupported document type: {path}")
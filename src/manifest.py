@@ -0,0 +1,200 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from src.utils import setup_logger
+
+logger = setup_logger("Manifest")
+
+# Version 2: vectors come from /api/embed (unit length). Collections indexed with the
+# unnormalized /api/embeddings vectors have a version 1 manifest and are rebuilt.
+MANIFEST_VERSION = 2
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """Hashes a file in fixed-size blocks so large files are never read whole."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_text(text: str) -> str:
+    return hash_bytes(text.encode("utf-8"))
+
+def make_chunk_ids(source: str, chunk_hashes: list[str], seen: dict = None) -> list[str]:
+    """
+    Builds stable, content-addressed chunk IDs.
+    The same chunk keeps its ID when text is inserted above it, so only new
+    chunks need embedding. Repeated chunks within a file get a counter suffix;
+    pass the same `seen` dict for consecutive parts of one file.
+    """
+    source_key = hash_text(source)[:12]
+    seen = {} if seen is None else seen
+    ids = []
+    for chunk_hash in chunk_hashes:
+        base_id = f"{source_key}_{chunk_hash[:16]}"
+        count = seen.get(base_id, 0)
+        seen[base_id] = count + 1
+        ids.append(base_id if count == 0 else f"{base_id}_{count}")
+    return ids
+
+class IngestManifest:
+    """
+    Persistent record of what is already indexed: per-file content hash,
+    per-chunk IDs and hashes, and the embedding model that produced them.
+    A file may also reference near-duplicate chunks stored by other files
+    ("duplicates"); a chunk stays in the index while any file refers to it.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.embedding_model = None
+        self.files = {}
+        # chunk ID -> {source: owns_chunk}
+        self._refs = {}
+        self.exists = os.path.exists(path)
+        if self.exists:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                logger.warning(f"Manifest version mismatch in {self.path}, ignoring it.")
+                self.exists = False
+                return
+            self.embedding_model = data.get("embedding_model")
+            self.files = data.get("files", {})
+            for source, entry in self.files.items():
+                self._add_refs(source, entry)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read manifest {self.path}: {e}")
+            self.exists = False
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "embedding_model": self.embedding_model,
+            "updated_at": datetime.now().isoformat(),
+            "files": self.files
+        }
+        # Write to a temp file first so a crash never leaves a truncated manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def reset(self, embedding_model: str):
+        self.embedding_model = embedding_model
+        self.files = {}
+        self._refs = {}
+
+    def _add_refs(self, source: str, entry: dict):
+        for chunk in entry.get("chunks", []):
+            self._refs.setdefault(chunk["id"], {})[source] = True
+        for chunk in entry.get("duplicates", []):
+            self._refs.setdefault(chunk["id"], {}).setdefault(source, False)
+
+    def _drop_refs(self, source: str, entry: dict):
+        for chunk in entry.get("chunks", []) + entry.get("duplicates", []):
+            refs = self._refs.get(chunk["id"])
+            if refs is not None:
+                refs.pop(source, None)
+                if not refs:
+                    del self._refs[chunk["id"]]
+
+    def get(self, source: str) -> dict | None:
+        return self.files.get(source)
+
+    def is_unchanged(self, source: str, stat: os.stat_result) -> bool:
+        """Cheap check on size and mtime, so unchanged files are not even read."""
+        entry = self.files.get(source)
+        if not entry or not entry.get("file_hash"):
+            return False
+        return entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime
+
+    def update(
+        self,
+        source: str,
+        stat: os.stat_result,
+        file_hash: str,
+        chunk_ids: list[str],
+        chunk_hashes: list[str],
+        signatures: list[str] = None,
+        duplicates: dict[str, str] = None
+    ):
+        """
+        Records the chunks a file stores (with optional MinHash signatures) and
+        the near-duplicate chunks of other files it refers to ({chunk_id: signature}).
+        """
+        signatures = signatures or [None] * len(chunk_ids)
+        chunks = []
+        for cid, chash, signature in zip(chunk_ids, chunk_hashes, signatures):
+            chunk = {"id": cid, "hash": chash}
+            if signature:
+                chunk["minhash"] = signature
+            chunks.append(chunk)
+        self.remove(source)
+        self.files[source] = {
+            "file_hash": file_hash,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "chunks": chunks,
+            "duplicates": [{"id": cid, "minhash": signature} for cid, signature in (duplicates or {}).items()]
+        }
+        self._add_refs(source, self.files[source])
+
+    def touch(self, source: str, stat: os.stat_result):
+        """Records a new mtime for a file whose content hash did not change."""
+        entry = self.files.get(source)
+        if entry:
+            entry["size"] = stat.st_size
+            entry["mtime"] = stat.st_mtime
+
+    def remove(self, source: str) -> list[str]:
+        """Drops a file from the manifest and returns the IDs it stored or referred to."""
+        entry = self.files.pop(source, None)
+        if not entry:
+            return []
+        self._drop_refs(source, entry)
+        return [chunk["id"] for chunk in entry.get("chunks", []) + entry.get("duplicates", [])]
+
+    def chunk_ids(self, source: str) -> list[str]:
+        entry = self.files.get(source)
+        if not entry:
+            return []
+        return [chunk["id"] for chunk in entry.get("chunks", [])]
+
+    def duplicate_ids(self, source: str) -> list[str]:
+        entry = self.files.get(source)
+        if not entry:
+            return []
+        return [chunk["id"] for chunk in entry.get("duplicates", [])]
+
+    def stored_chunk_ids(self) -> set[str]:
+        """IDs of every chunk that should be in the collection."""
+        return set(self._refs)
+
+    def chunk_count(self) -> int:
+        return len(self._refs)
+
+    def sources_of(self, chunk_id: str) -> list[str]:
+        """Files that store or refer to a chunk, the storing file first."""
+        refs = self._refs.get(chunk_id, {})
+        return sorted(refs, key=lambda source: (not refs[source], source))
+
+    def stores(self, source: str, chunk_id: str) -> bool:
+        """Whether `source` stores the chunk itself rather than referring to it as a near-duplicate."""
+        return self._refs.get(chunk_id, {}).get(source, False)
+
+    def signatures(self):
+        """Yields (chunk_id, encoded MinHash) for every indexed chunk that has one."""
+        for entry in self.files.values():
+            for chunk in entry.get("chunks", []) + entry.get("duplicates", []):
+                if chunk.get("minhash"):
+                    yield chunk["id"], chunk["minhash"]
@@ -0,0 +1,58 @@
+import threading
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("Registry")
+
+# Heavy resources shared by every Agent and session in the process:
+# (kind, *identity) -> resource
+_resources = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+def get_or_create(key: tuple, factory):
+    """
+    Returns the resource stored under `key`, building it with `factory()` on
+    first use. Concurrent first callers wait for a single build. A factory
+    that returns None (a failed load) is not stored, so the next call retries.
+    """
+    resource = _resources.get(key)
+    if resource is not None:
+        return resource
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        resource = _resources.get(key)
+        if resource is None:
+            logger.info(f"Loading shared {key[0]} {key[1:]}...")
+            resource = factory()
+            if resource is not None:
+                _resources[key] = resource
+    return resource
+
+def loaded() -> list[tuple]:
+    """Keys of the resources loaded so far."""
+    return list(_resources)
+
+def clear(kind: str = None):
+    """Forgets loaded resources (all, or one kind) so they are rebuilt on next use."""
+    with _registry_lock:
+        for key in [key for key in _resources if kind is None or key[0] == kind]:
+            del _resources[key]
+
+def get_vector_client(backend: str = None):
+    """The client of the configured vector store (VECTOR_BACKEND)."""
+    from src.vector_store import open_vector_client
+    backend = backend or config.VECTOR_BACKEND
+    path = config.NUMPY_STORE_DIR if backend == "numpy" else config.CHROMA_DB_PATH
+    return get_or_create(("vector_store", backend, path), lambda: open_vector_client(backend, path))
+
+def get_reranker(encoder_cls=None):
+    """
+    The batching reranker for the configured model and engine (None if it cannot be loaded).
+    `encoder_cls` replaces CrossEncoder; every class gets its own shared instance.
+    """
+    from src.reranker import load_reranker, CrossEncoder
+    from src.score_cache import reranker_key
+    encoder_cls = encoder_cls or CrossEncoder
+    return get_or_create(("reranker", reranker_key(), encoder_cls), lambda: load_reranker(encoder_cls))
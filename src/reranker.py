@@ -0,0 +1,170 @@
+import queue
+import threading
+from sentence_transformers import CrossEncoder
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("Reranker")
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+def load_cross_encoder(
+    backend: str = None,
+    model: str = None,
+    threads: int = None,
+    max_length: int = None,
+    encoder_cls=CrossEncoder
+):
+    """
+    Loads RERANKER_MODEL for CPU inference with the requested engine:
+    - torch: full-precision PyTorch (the original path)
+    - torch-int8: PyTorch with Linear layers dynamically quantized to int8
+    - onnx / onnx-int8: ONNX Runtime, fp32 or the int8 export from RERANKER_ONNX_FILE
+    """
+    backend = backend or config.RERANKER_BACKEND
+    model = model or config.RERANKER_MODEL
+    threads = config.RERANKER_THREADS if threads is None else threads
+    max_length = max_length or config.RERANKER_MAX_LENGTH
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown reranker backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    if backend.startswith("onnx"):
+        import onnxruntime as ort
+        session_options = ort.SessionOptions()
+        if threads > 0:
+            session_options.intra_op_num_threads = threads
+            session_options.inter_op_num_threads = 1
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+        if backend == "onnx-int8":
+            model_kwargs["file_name"] = config.RERANKER_ONNX_FILE
+        return encoder_cls(model, backend="onnx", max_length=max_length, model_kwargs=model_kwargs)
+
+    import torch
+    if threads > 0:
+        # Process-wide setting, it also applies to any other torch model in the process
+        torch.set_num_threads(threads)
+    encoder = encoder_cls(model, device="cpu", max_length=max_length)
+    if backend == "torch-int8":
+        encoder = torch.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8)
+    return encoder
+
+def _gap(better: float, worse: float) -> float:
+    """Relative distance gap, independent of the embedding's distance scale."""
+    return (worse - better) / worse if worse > 0 else 0.0
+
+def cascade_plan(distances: list[float], vector_top_leads: bool = True) -> tuple[str, int]:
+    """
+    Decides how deep to cross-encode one query from its ascending vector distances:
+    - skip: the best hit is far ahead of the runner-up, keep the vector order
+    - short: the first few hits are well ahead of the rest, rerank CASCADE_MIN_CANDIDATES
+    - wide: the distances are nearly flat, rerank CASCADE_MAX_CANDIDATES
+    - full: otherwise rerank RETRIEVAL_CANDIDATES
+    `vector_top_leads` is False when lexical fusion put another chunk first,
+    which rules out skipping. Returns (decision, depth).
+    """
+    count = len(distances)
+    if count < 2:
+        return "skip", count
+    if vector_top_leads and _gap(distances[0], distances[1]) >= config.CASCADE_SKIP_MARGIN:
+        return "skip", count
+    short = config.CASCADE_MIN_CANDIDATES
+    if count > short and _gap(distances[0], distances[short]) >= config.CASCADE_SHORT_MARGIN:
+        return "short", short
+    full = min(config.RETRIEVAL_CANDIDATES, count)
+    if _gap(distances[0], distances[full - 1]) < config.CASCADE_WIDE_SPREAD:
+        return "wide", config.CASCADE_MAX_CANDIDATES
+    return "full", config.RETRIEVAL_CANDIDATES
+
+def select_by_score(ranked: list, scores: list[float] = None) -> list:
+    """
+    Keeps hits scoring at least RERANK_SCORE_THRESHOLD (best first), no fewer
+    than RERANK_MIN_RESULTS and no more than RERANK_MAX_RESULTS. Without scores
+    (reranking skipped) the first RERANK_MIN_RESULTS hits are kept.
+    """
+    if scores is None:
+        return ranked[:config.RERANK_MIN_RESULTS]
+    passing = sum(1 for score in scores if score >= config.RERANK_SCORE_THRESHOLD)
+    keep = max(config.RERANK_MIN_RESULTS, min(passing, config.RERANK_MAX_RESULTS))
+    return ranked[:keep]
+
+class _Request:
+    def __init__(self, pairs: list):
+        self.pairs = pairs
+        self.scores = None
+        self.error = None
+        self.done = threading.Event()
+
+class BatchingReranker:
+    """
+    Scores query-passage pairs on one worker thread. Requests from concurrent
+    queries that arrive while a batch is running are scored together in the
+    next forward pass, so a lone query pays no extra wait.
+    """
+    def __init__(self, encoder, batch_size: int = None, max_pairs: int = None):
+        self.encoder = encoder
+        self.batch_size = batch_size or config.RERANKER_BATCH_SIZE
+        self.max_pairs = max_pairs or config.RERANKER_MAX_BATCH_PAIRS
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="reranker", daemon=True)
+        self._worker.start()
+
+    def predict(self, pairs: list) -> list[float]:
+        if not pairs:
+            return []
+        request = _Request(pairs)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error:
+            raise request.error
+        return request.scores
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            pairs = len(batch[0].pairs)
+            while pairs < self.max_pairs:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                pairs += len(request.pairs)
+            self._score(batch)
+
+    def _score(self, batch: list[_Request]):
+        try:
+            scores = self.encoder.predict(
+                [pair for request in batch for pair in request.pairs],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            offset = 0
+            for request in batch:
+                request.scores = [float(score) for score in scores[offset:offset + len(request.pairs)]]
+                offset += len(request.pairs)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        for request in batch:
+            request.done.set()
+
+def load_reranker(encoder_cls=CrossEncoder) -> BatchingReranker | None:
+    """
+    Loads the configured reranker engine, falling back to the PyTorch path
+    if the optimized one cannot be loaded. Returns None if no model loads.
+    """
+    logger.info(f"Loading Reranker model: {config.RERANKER_MODEL} ({config.RERANKER_BACKEND})...")
+    try:
+        encoder = load_cross_encoder(encoder_cls=encoder_cls)
+    except Exception as e:
+        if config.RERANKER_BACKEND == "torch":
+            logger.error(f"Error loading Reranker: {e}")
+            return None
+        logger.error(f"Could not load {config.RERANKER_BACKEND} reranker, falling back to torch: {e}")
+        try:
+            encoder = load_cross_encoder(backend="torch", encoder_cls=encoder_cls)
+        except Exception as e:
+            logger.error(f"Error loading Reranker: {e}")
+            return None
+    logger.info("Reranker loaded successfully.")
+    return BatchingReranker(encoder)
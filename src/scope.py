@@ -0,0 +1,63 @@
+import os
+import fnmatch
+from src.config import config
+
+def relative_source(source: str) -> str:
+    """Source path relative to DOCS_SOURCE_PATH with forward slashes, as shown to the agent."""
+    relative = os.path.relpath(os.path.abspath(source), os.path.abspath(config.DOCS_SOURCE_PATH))
+    if relative.startswith(".."):
+        relative = os.path.normpath(source)
+    return relative.replace(os.sep, "/")
+
+def source_tags(source: str) -> list[str]:
+    """Tags from the directory layout: products/kafka/setup.md -> ["products", "kafka"]."""
+    return [part.lower() for part in relative_source(source).split("/")[:-1] if part not in ("", ".")]
+
+def merged_tags(sources: list[str]) -> list[str]:
+    """Tags of every file a (deduplicated) chunk occurs in, in first-seen order."""
+    return list(dict.fromkeys(tag for source in sources for tag in source_tags(source)))
+
+def any_of(key: str, values: list[str]) -> dict:
+    """Matches list metadata `key` that contains at least one of `values`."""
+    clauses = [{key: {"$contains": value}} for value in values]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+def matching_sources(sources, patterns: list[str]) -> list[str]:
+    """Sources whose relative or full path matches any of the glob patterns."""
+    return [
+        source for source in sources
+        if any(
+            fnmatch.fnmatch(relative_source(source), pattern) or fnmatch.fnmatch(source, pattern)
+            for pattern in patterns
+        )
+    ]
+
+def build_where(sources: list[str] = None, tags: list[str] = None, doc_types: list[str] = None) -> dict | None:
+    """
+    ChromaDB `where` clause for a search scope. Filters of different kinds must
+    all match; values within one kind are alternatives. `sources` are the
+    already resolved source paths. They are matched against the `sources`
+    list, so a deduplicated chunk is found through every file it occurs in,
+    not only the one that stored it. Tags are stored as a list too, so
+    `$contains` needs chromadb>=1.5.0 (the NumPy backend evaluates it itself).
+    """
+    clauses = []
+    if sources is not None:
+        clauses.append(any_of("sources", list(sources)))
+    if tags:
+        clauses.append(any_of("tags", [tag.lower() for tag in tags]))
+    if doc_types:
+        clauses.append({"doc_type": {"$in": [doc_type.lower().lstrip(".") for doc_type in doc_types]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def format_citation(metadata: dict | None) -> str:
+    if not metadata or not metadata.get("source"):
+        return "[Source: unknown]"
+    citation = f"Source: {relative_source(metadata['source'])}"
+    if metadata.get("page"):
+        citation += f", page {metadata['page']}"
+    if metadata.get("heading_path"):
+        citation += f" > {metadata['heading_path']}"
+    return f"[{citation}]"
@@ -0,0 +1,79 @@
+import re
+import sqlite3
+import hashlib
+from src.config import config
+from src.utils import setup_logger
+from src.sqlite_lru import SQLiteLRUCache
+
+logger = setup_logger("ScoreCache")
+
+_SPACE_RE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Case, surrounding punctuation and repeated whitespace do not change a query."""
+    return _SPACE_RE.sub(" ", query.lower()).strip(" \t\n?!.,;:")
+
+def reranker_key() -> str:
+    """Scores depend on the model and on how it runs (quantization, truncation)."""
+    return f"{config.RERANKER_MODEL}|{config.RERANKER_BACKEND}|{config.RERANKER_MAX_LENGTH}"
+
+class ScoreCache(SQLiteLRUCache):
+    """
+    Cross-encoder scores in a local SQLite file, keyed by
+    (reranker, sha256(normalized query), chunk content hash). A chunk whose
+    text changes gets a new hash and therefore new entries; ingestion also
+    drops the entries of deleted chunks. At most `max_entries` rows are kept,
+    the least recently used are evicted.
+    """
+    TABLE = "scores"
+    COLUMNS = {"chunk_id": "TEXT NOT NULL", "score": "REAL NOT NULL"}
+    INDEXES = {"chunk": "chunk_id"}
+    ITEM_NAME = "reranker scores"
+
+    def __init__(self, path: str, max_entries: int = 200000):
+        super().__init__(path, max_entries)
+
+    @staticmethod
+    def make_key(model: str, query: str, chunk_hash: str) -> str:
+        digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{model}|{digest}|{chunk_hash}"
+
+    def get_many(self, model: str, query: str, chunk_hashes: list[str]) -> dict[str, float]:
+        """Returns cached scores by chunk hash and refreshes their LRU timestamp."""
+        keys = {self.make_key(model, query, chunk_hash): chunk_hash for chunk_hash in chunk_hashes}
+        return {keys[key]: score for key, score in self._get(list(keys), "score").items()}
+
+    def put_many(self, model: str, query: str, items: list[tuple[str, str, float]]):
+        """Stores (chunk_id, chunk_hash, score) triples for one query."""
+        self._put([
+            (self.make_key(model, query, chunk_hash), chunk_id, float(score))
+            for chunk_id, chunk_hash, score in items
+        ])
+
+    def invalidate(self, chunk_ids: list[str]):
+        """Drops every score of chunks that were deleted or re-chunked at ingestion."""
+        self._delete_where("chunk_id", chunk_ids)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["max_entries"] = self.max_size
+        return stats
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            f"Reranker score cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.1%} hit rate), "
+            f"{s['entries']}/{s['max_entries']} entries"
+        )
+
+# Global cache instance shared by retrieval and ingestion
+_score_cache = None
+
+def get_score_cache() -> ScoreCache | None:
+    global _score_cache
+    if _score_cache is None and config.SCORE_CACHE_ENABLED:
+        try:
+            _score_cache = ScoreCache(config.SCORE_CACHE_PATH, config.SCORE_CACHE_MAX_ENTRIES)
+        except sqlite3.Error as e:
+            logger.error(f"Could not open reranker score cache at {config.SCORE_CACHE_PATH}: {e}")
+    return _score_cache
@@ -0,0 +1,102 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("SemanticCache")
+
+class SemanticCache:
+    """
+    Recent query embeddings with the retrieval result they produced. A query
+    whose embedding has cosine similarity >= `threshold` with a cached one
+    gets the cached result. Entries expire after `ttl_seconds`, the least
+    recently used go first beyond `max_entries`, and everything is dropped
+    when the index generation changes.
+    """
+    def __init__(self, threshold: float = None, max_entries: int = None, ttl_seconds: float = None):
+        self.threshold = config.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or config.SEMANTIC_CACHE_MAX_ENTRIES
+        self.ttl_seconds = config.SEMANTIC_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # entry ID -> (unit vector, result, created_at), oldest access first
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._generation = None
+        self._matrix = None
+        self._matrix_ids = []
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray | None:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            if self._entries:
+                logger.info(f"Index changed, dropping {len(self._entries)} cached retrieval results.")
+            self._entries.clear()
+            self._matrix = None
+            self._generation = generation
+
+    def _expire(self):
+        deadline = time.time() - self.ttl_seconds
+        expired = [entry_id for entry_id, (_, _, created) in self._entries.items() if created < deadline]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self._matrix = None
+
+    def get(self, vector, generation):
+        unit = self._unit(vector)
+        with self._lock:
+            self._check_generation(generation)
+            self._expire()
+            if unit is None or not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.stack([self._entries[entry_id][0] for entry_id in self._matrix_ids])
+            if self._matrix.shape[1] != unit.shape[0]:
+                self.misses += 1
+                return None
+            similarities = self._matrix @ unit
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry_id = self._matrix_ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id][1]
+
+    def put(self, vector, result, generation):
+        unit = self._unit(vector)
+        if unit is None:
+            return
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[self._next_id] = (unit, result, time.time())
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries)
+        }
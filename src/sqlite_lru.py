@@ -0,0 +1,139 @@
+import os
+import time
+import sqlite3
+import threading
+from src.utils import setup_logger
+
+logger = setup_logger("SQLiteLRU")
+
+class SQLiteLRUCache:
+    """
+    Base for the on-disk caches: one SQLite table of (key, values..., last_access)
+    capped at `max_size` and trimmed from the least recently used end.
+    Subclasses set the table layout and how the size of a row is measured,
+    and build their keys and values on top of _get/_put.
+    """
+    TABLE: str = None
+    # Value columns after the key, as SQL column definitions
+    COLUMNS: dict[str, str] = {}
+    # Extra indexes (besides the one on last_access) as index name suffix -> column
+    INDEXES: dict[str, str] = {}
+    # Size of one row towards max_size: "1" counts rows, "LENGTH(vector)" counts bytes
+    SIZE_SQL: str = "1"
+    # What the rows are, for the eviction log line
+    ITEM_NAME: str = "entries"
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = "".join(f"{name} {kind},\n" for name, kind in self.COLUMNS.items())
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                key TEXT PRIMARY KEY,
+                {columns}last_access REAL NOT NULL
+            )
+            """
+        )
+        for suffix, column in {"access": "last_access", **self.INDEXES}.items():
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_{suffix} ON {self.TABLE}({column})")
+        self._conn.commit()
+
+    def _get(self, keys: list[str], column: str) -> dict:
+        """Returns `column` by key for the cached keys and refreshes their LRU timestamp."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, {column} FROM {self.TABLE} WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.TABLE} SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def _put(self, rows: list[tuple]):
+        """Stores (key, *values) rows in COLUMNS order."""
+        if not rows:
+            return
+        now = time.time()
+        names = ", ".join(["key", *self.COLUMNS, "last_access"])
+        placeholders = ", ".join("?" * (len(self.COLUMNS) + 2))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({names}) VALUES ({placeholders})",
+                [(*row, now) for row in rows]
+            )
+            self._conn.commit()
+            self._writes_since_evict += len(rows)
+            # Measuring the table is a scan, so eviction runs in batches
+            if self._writes_since_evict >= 256:
+                self._evict()
+
+    def _delete_where(self, column: str, values: list):
+        if not values:
+            return
+        with self._lock:
+            self._conn.executemany(f"DELETE FROM {self.TABLE} WHERE {column} = ?", [(value,) for value in values])
+            self._conn.commit()
+
+    def _evict(self):
+        self._writes_since_evict = 0
+        total = self._conn.execute(f"SELECT COALESCE(SUM({self.SIZE_SQL}), 0) FROM {self.TABLE}").fetchone()[0]
+        if total <= self.max_size:
+            return
+        excess = total - self.max_size
+        stale = []
+        # Walks the last_access index from the oldest row and stops as soon as enough is freed
+        for key, size in self._conn.execute(
+            f"SELECT key, {self.SIZE_SQL} FROM {self.TABLE} ORDER BY last_access ASC"
+        ):
+            if excess <= 0:
+                break
+            stale.append((key,))
+            excess -= size
+        self._conn.executemany(f"DELETE FROM {self.TABLE} WHERE key = ?", stale)
+        self._conn.commit()
+        logger.info(f"Evicted {len(stale)} least recently used {self.ITEM_NAME}.")
+
+    def _usage(self) -> tuple[int, int]:
+        """(rows, total size in SIZE_SQL units)."""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM({self.SIZE_SQL}), 0) FROM {self.TABLE}"
+            ).fetchone()
+
+    def stats(self) -> dict:
+        entries, size = self._usage()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size": size
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,9 +1,20 @@
 import os
-import chromadb
 from sentence_transformers import CrossEncoder
 from ddgs import DDGS
 from src.config import config
-from src.utils import setup_logger, get_ollama_embedding
+from src.utils import setup_logger
+from src.embedding_cache import cached_embeddings
+from src.dedup import dedupe_texts
+from src.index_alias import live_collection_name, alias_mtime, manifest_path
+from src.semantic_cache import SemanticCache
+from src.scope import build_where, matching_sources
+from src.context import ContextAssembler
+from src.manifest import IngestManifest, hash_text
+from src.registry import get_vector_client, get_reranker
+from src.executors import run_blocking
+from src.reranker import cascade_plan, select_by_score
+from src.score_cache import get_score_cache, reranker_key
+from src.lexical import LexicalIndex, lexical_index_path, reciprocal_rank_fusion
 
 logger = setup_logger("Tools")
 
@@ -11,72 +22,308 @@ class ToolSet:
     def __init__(self, embedding_model: str = None):
         self.embedding_model = embedding_model if embedding_model else config.EMBEDDING_MODEL
         
-        # 1. ChromaDB Client
+        # 1. Vector store client, ChromaDB or the NumPy flat index (the collection is resolved through the index alias)
+        self._alias_mtime = alias_mtime()
         try:
-            self.chroma_client = chromadb.PersistentClient(path=config.CHROMA_DB_PATH)
-            self.collection = self.chroma_client.get_or_create_collection(name="devmind_docs")
+            self.chroma_client = get_vector_client()
+            self.collection = self.chroma_client.get_or_create_collection(name=live_collection_name())
         except Exception as e:
-            logger.error(f"Could not connect to ChromaDB: {e}")
+            logger.error(f"Could not connect to the {config.VECTOR_BACKEND} vector store: {e}")
             self.collection = None
+        self.lexical_index = self._open_lexical_index()
 
-        # 2. Reranker Model
-        logger.info(f"Loading Reranker model: {config.RERANKER_MODEL}...")
+        # 2. Reranker Model, shared by all ToolSets (concurrent queries are scored in shared batches)
+        self.reranker = get_reranker(CrossEncoder)
+
+        # 3. Recent queries and their results, matched by embedding similarity
+        self.semantic_cache = SemanticCache() if config.SEMANTIC_CACHE_ENABLED else None
+        # Indexed source paths for resolving scope globs: (generation, sources)
+        self._known_sources = (None, [])
+
+        # 4. Output directory
+        os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+
+    def _open_lexical_index(self) -> LexicalIndex | None:
+        if not config.LEXICAL_INDEX_ENABLED or self.collection is None:
+            return None
         try:
-            self.reranker = CrossEncoder(config.RERANKER_MODEL)
-            logger.info("Reranker loaded successfully.")
+            return LexicalIndex(lexical_index_path(self.collection.name))
         except Exception as e:
-            logger.error(f"Error loading Reranker: {e}")
-            self.reranker = None
-            
-        # 3. Output directory
-        os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+            logger.error(f"Could not open lexical index, using vector search only: {e}")
+            return None
+
+    def _refresh_collection(self):
+        """Switches to the new generation after a rebuild swapped the alias (one stat per query)."""
+        mtime = alias_mtime()
+        if mtime != self._alias_mtime and getattr(self, "chroma_client", None):
+            self._alias_mtime = mtime
+            name = live_collection_name()
+            if self.collection is None or self.collection.name != name:
+                try:
+                    self.collection = self.chroma_client.get_collection(name=name)
+                    self.lexical_index = self._open_lexical_index()
+                    logger.info(f"Switched to index generation {name}.")
+                except Exception as e:
+                    logger.error(f"Could not open index generation {name}, keeping the current one: {e}")
+        # The lexical index must belong to the collection, whichever way that was switched
+        if self.lexical_index is not None and self.collection is not None \
+                and self.lexical_index.path != lexical_index_path(self.collection.name):
+            self.lexical_index = self._open_lexical_index()
+
+    def _index_generation(self) -> tuple:
+        """
+        Identifies the indexed content: the live collection plus its manifest's
+        mtime, which every ingestion run (including the watcher) updates.
+        """
+        try:
+            mtime = os.stat(manifest_path(self.collection.name)).st_mtime
+        except OSError:
+            mtime = None
+        return self.collection.name, mtime
+
+    def _indexed_sources(self, generation: tuple) -> list[str]:
+        """Source paths in the live index, read from its manifest once per generation."""
+        if self._known_sources[0] != generation:
+            manifest = IngestManifest(manifest_path(self.collection.name))
+            self._known_sources = (generation, list(manifest.files))
+        return self._known_sources[1]
+
+    def _scope_where(self, generation: tuple, sources: list[str] = None, tags: list[str] = None,
+                     doc_types: list[str] = None) -> tuple[dict | None, str | None]:
+        """Builds the `where` clause for a search scope. Returns (where, error)."""
+        matched = None
+        if sources:
+            matched = matching_sources(self._indexed_sources(generation), sources)
+            if not matched:
+                return None, f"No indexed documents match {', '.join(sources)}."
+        return build_where(matched, tags, doc_types), None
 
-    def retrieve_knowledge(self, query: str) -> str:
+    def retrieve_knowledge(
+        self,
+        query: str | list[str],
+        sources: list[str] = None,
+        tags: list[str] = None,
+        doc_types: list[str] = None
+    ) -> str:
         """
         Search local knowledge base for technical details.
+        Several queries are embedded, searched and reranked in one batch, and
+        a chunk is returned only once across them. The search can be scoped to
+        source path globs, directory tags and document types.
         """
+        queries = [query] if isinstance(query, str) else [q for q in query if q and q.strip()]
+        if not queries:
+            return "Error: No query given."
+        self._refresh_collection()
         if not self.collection:
             return "Error: Database not initialized."
+        generation = self._index_generation()
+        where, scope_error = self._scope_where(generation, sources, tags, doc_types)
+        if scope_error:
+            return scope_error
+        if where:
+            logger.info(f"Scoped search: {where}")
 
-        # 1. Embed Query
-        query_vector = get_ollama_embedding(query, model=self.embedding_model)
-        if not query_vector:
-            return "Error: Could not generate embedding for query."
-
-        # 2. Vector Search
+        # 1. Embed Queries (one query too goes through the batch path, like the stored chunks)
         try:
-            results = self.collection.query(
-                query_embeddings=[query_vector],
-                n_results=10
-            )
+            vectors = cached_embeddings(queries, model=self.embedding_model)
         except Exception as e:
-            logger.error(f"ChromaDB query failed: {e}")
-            return f"Error querying database: {e}"
-        
-        if not results['documents'] or not results['documents'][0]:
-            return "No relevant information found in knowledge base."
-            
-        candidates = results['documents'][0]
-        
-        # Fallback if no reranker
-        if not self.reranker:
-            return "\n\n".join(candidates[:3])
+            logger.error(f"Error embedding queries: {e}")
+            vectors = []
+        if not vectors or not all(vectors):
+            return "Error: Could not generate embedding for query."
+
+        # Ranked (chunk_id, document, metadata) hits per query
+        ranked = [None] * len(queries)
+        # Cached results are unscoped, scoped searches bypass the cache
+        semantic_cache = self.semantic_cache if where is None else None
+        if semantic_cache:
+            for i, vector in enumerate(vectors):
+                ranked[i] = semantic_cache.get(vector, generation)
+            if any(hits is not None for hits in ranked):
+                logger.info("Semantic cache hit, reusing cached retrieval results.")
+        todo = [i for i, hits in enumerate(ranked) if hits is None]
+
+        if todo:
+            # 2. Vector Search, one round trip for all queries
+            cascade = config.RERANK_CASCADE_ENABLED and self.reranker is not None
+            depth = config.CASCADE_MAX_CANDIDATES if cascade else config.RETRIEVAL_CANDIDATES
+            try:
+                results = self.collection.query(
+                    query_embeddings=[vectors[i] for i in todo],
+                    n_results=depth,
+                    where=where
+                )
+            except Exception as e:
+                logger.error(f"Vector store query failed: {e}")
+                return f"Error querying database: {e}"
+
+            todo_queries = [queries[i] for i in todo]
+            hits = self._hybrid_candidates(todo_queries, results, depth, where)
+            plans = self._cascade_plans(todo_queries, results, hits) if cascade else [("full", depth)] * len(todo)
+            hits = [query_hits[:plan_depth] for query_hits, (_, plan_depth) in zip(hits, plans)]
+            # Copies of the same boilerplate would crowd out distinct results
+            if config.DEDUP_ENABLED:
+                hits = [self._drop_near_duplicates(query_hits) for query_hits in hits]
+
+            # 3. Cross-Encoding & Reranking, one predict call for all pairs
+            rerank = [q for q, (decision, _) in enumerate(plans) if self.reranker and decision != "skip"]
+            for q in range(len(todo)):
+                if q not in rerank:
+                    ranked[todo[q]] = select_by_score(hits[q]) if cascade else hits[q]
+            try:
+                scores = self._rerank_scores([todo_queries[q] for q in rerank], [hits[q] for q in rerank]) if rerank else []
+                for q, query_scores in zip(rerank, scores):
+                    order = sorted(zip(query_scores, hits[q]), key=lambda x: x[0], reverse=True)
+                    ranked[todo[q]] = [hit for _, hit in order]
+                    if cascade:
+                        ranked[todo[q]] = select_by_score(ranked[todo[q]], [score for score, _ in order])
+            except Exception as e:
+                logger.error(f"Reranking failed: {e}")
+                for q in rerank:
+                    ranked[todo[q]] = hits[q]
+            else:
+                if semantic_cache and self.reranker:
+                    for i in todo:
+                        if ranked[i]:
+                            semantic_cache.put(vectors[i], ranked[i], generation)
+            if cascade:
+                for q, (decision, _) in enumerate(plans):
+                    logger.info(
+                        f"Cascade for '{todo_queries[q][:60]}': {decision}, "
+                        f"reranked {len(hits[q]) if q in rerank else 0} candidates, returned {len(ranked[todo[q]])}."
+                    )
+
+        top_k = config.RERANK_MAX_RESULTS if config.RERANK_CASCADE_ENABLED else 3
+        return self._format_results(queries, ranked, top_k)
+
+    def _format_results(self, queries: list[str], ranked: list[list[tuple]], top_k: int = 3) -> str:
+        """
+        Top-k hits per query, stitched into cited passages within the context
+        token budget, which is shared between the queries. A chunk already
+        shown for an earlier query is skipped.
+        """
+        assembler = ContextAssembler(self.collection)
+        remaining = assembler.budget_tokens
+        seen = set()
+        sections = []
+        for position, (query, hits) in enumerate(zip(queries, ranked)):
+            top = []
+            for hit in hits or []:
+                if hit[0] in seen:
+                    continue
+                seen.add(hit[0])
+                top.append(hit)
+                if len(top) == top_k:
+                    break
+            body = None
+            if top:
+                # Budget left unused by earlier queries goes to the later ones
+                body, used = assembler.assemble(top, remaining // (len(queries) - position))
+                remaining -= used
+            sections.append((query, body or "No relevant information found in knowledge base."))
+        if len(sections) == 1:
+            return sections[0][1]
+        return "\n\n".join(f"### Query: {query}\n\n{body}" for query, body in sections)
+
+    @staticmethod
+    def _cascade_plans(queries: list[str], results: dict, hits: list[list[tuple]]) -> list[tuple[str, int]]:
+        """Rerank decision and depth per query from its vector distances (see cascade_plan)."""
+        plans = []
+        for query_ids, distances, query_hits in zip(results.get('ids') or [], results.get('distances') or [], hits):
+            leads = bool(query_hits) and bool(query_ids) and query_hits[0][0] == query_ids[0]
+            plans.append(cascade_plan(distances, vector_top_leads=leads))
+        return plans + [("full", config.RETRIEVAL_CANDIDATES)] * (len(queries) - len(plans))
+
+    def _drop_near_duplicates(self, hits: list[tuple]) -> list[tuple]:
+        unique = [hits[i] for i in dedupe_texts([hit[1] for hit in hits])]
+        if len(unique) < len(hits):
+            logger.info(f"Dropped {len(hits) - len(unique)} near-duplicate candidates before reranking.")
+        return unique
+
+    def _rerank_scores(self, queries: list[str], hits: list[list[tuple]]) -> list[list[float]]:
+        """
+        Cross-encoder scores for each query's (chunk_id, document, ...) hits, from a
+        single predict call. Pairs scored before for the same normalized query
+        and chunk content come from the score cache.
+        """
+        cache = get_score_cache()
+        model = reranker_key()
+        hashes = [[hash_text(hit[1]) for hit in query_hits] for query_hits in hits]
+        scores = [[None] * len(query_hits) for query_hits in hits]
+        if cache:
+            for q, (query, query_hashes) in enumerate(zip(queries, hashes)):
+                found = cache.get_many(model, query, query_hashes)
+                for j, chunk_hash in enumerate(query_hashes):
+                    scores[q][j] = found.get(chunk_hash)
+
+        missing = [(q, j) for q, query_scores in enumerate(scores) for j, score in enumerate(query_scores) if score is None]
+        if missing:
+            predicted = self.reranker.predict([[queries[q], hits[q][j][1]] for q, j in missing])
+            fresh = {}
+            for (q, j), score in zip(missing, predicted):
+                scores[q][j] = float(score)
+                fresh.setdefault(q, []).append((hits[q][j][0], hashes[q][j], score))
+            if cache:
+                for q, items in fresh.items():
+                    cache.put_many(model, queries[q], items)
+        total = sum(len(query_hits) for query_hits in hits)
+        logger.info(
+            f"Reranked {len(missing)} of {total} candidates for {len(queries)} queries, "
+            f"{total - len(missing)} scores from cache."
+        )
+        return scores
+
+    def _hybrid_candidates(
+        self,
+        queries: list[str],
+        results: dict,
+        depth: int = None,
+        where: dict = None
+    ) -> list[list[tuple[str, str, dict]]]:
+        """
+        Fuses vector hits with BM25 hits (reciprocal rank fusion), so exact
+        identifiers and error codes are found even when embeddings miss them.
+        Returns up to `depth` (chunk_id, document, metadata) hits per query, best first.
+        Lexical hits outside the `where` scope are dropped.
+        """
+        depth = depth or config.RETRIEVAL_CANDIDATES
+        vector_ids = results.get('ids') or [[] for _ in queries]
+        documents, metadatas = {}, {}
+        for ids, docs in zip(vector_ids, results.get('documents') or []):
+            documents.update(zip(ids, docs))
+        for ids, metas in zip(vector_ids, results.get('metadatas') or []):
+            metadatas.update(zip(ids, metas))
+        if not self.lexical_index:
+            return [[(i, documents[i], metadatas.get(i)) for i in ids] for ids in vector_ids]
 
-        # 3. Cross-Encoding & Reranking
-        pairs = [[query, doc] for doc in candidates]
         try:
-            scores = self.reranker.predict(pairs)
-            
-            scored_candidates = sorted(
-                zip(scores, candidates), 
-                key=lambda x: x[0], 
-                reverse=True
-            )
-            top_3 = [doc for score, doc in scored_candidates[:3]]
-            return "\n\n---\n\n".join(top_3)
+            self.lexical_index.refresh()
+            lexical_ids = [
+                [chunk_id for chunk_id, _ in self.lexical_index.search(query, depth)]
+                for query in queries
+            ]
         except Exception as e:
-            logger.error(f"Reranking failed: {e}")
-            return "\n\n".join(candidates[:3])
+            logger.error(f"Lexical search failed, using vector results only: {e}")
+            return [[(i, documents[i], metadatas.get(i)) for i in ids] for ids in vector_ids]
+
+        fused = [
+            reciprocal_rank_fusion([ids, lexical])[:depth]
+            for ids, lexical in zip(vector_ids, lexical_ids)
+        ]
+        missing = list(dict.fromkeys(chunk_id for ids in fused for chunk_id in ids if chunk_id not in documents))
+        if missing:
+            try:
+                fetched = self.collection.get(ids=missing, where=where, include=["documents", "metadatas"])
+                documents.update(zip(fetched['ids'], fetched['documents']))
+                metadatas.update(zip(fetched['ids'], fetched['metadatas']))
+            except Exception as e:
+                logger.error(f"Could not fetch lexical hits from the vector store: {e}")
+        # Chunks deleted since the lexical index was read, or out of scope, are skipped
+        return [
+            [(chunk_id, documents[chunk_id], metadatas.get(chunk_id)) for chunk_id in ids if documents.get(chunk_id)]
+            for ids in fused
+        ]
 
     def web_search(self, query: str) -> str:
         """
@@ -124,6 +371,26 @@ class ToolSet:
         logger.info(f"Plan Created: {steps}")
         return f"Plan created successfully with {len(steps)} steps:\n{plan_content}"
 
+    # Async versions for the agent loop: the blocking work runs on the shared pools
+
+    async def aretrieve_knowledge(
+        self,
+        query: str | list[str],
+        sources: list[str] = None,
+        tags: list[str] = None,
+        doc_types: list[str] = None
+    ) -> str:
+        """retrieve_knowledge on the retrieval pool (embedding, vector search, reranking)."""
+        return await run_blocking("retrieval", self.retrieve_knowledge, query, sources, tags, doc_types)
+
+    async def aweb_search(self, query: str) -> str:
+        """web_search on the I/O pool."""
+        return await run_blocking("io", self.web_search, query)
+
+    async def asave_solution(self, filename: str, content: str) -> str:
+        """save_solution on the I/O pool."""
+        return await run_blocking("io", self.save_solution, filename, content)
+
 # Define Tools Schema for OpenAI/Ollama
 TOOLS_SCHEMA = [
     {
@@ -137,9 +404,28 @@ TOOLS_SCHEMA = [
                     "query": {
                         "type": "string",
                         "description": "The search query."
+                    },
+                    "queries": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Several search queries answered in one batch (e.g. one per plan step). Use instead of `query`."
+                    },
+                    "sources": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Optional glob patterns for document paths to search in (e.g. 'kafka/**', '*.pdf')."
+                    },
+                    "tags": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Optional directory names to search in (e.g. 'kafka'); any of them may match."
+                    },
+                    "doc_types": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["md", "txt", "pdf"]},
+                        "description": "Optional document types to search in."
                     }
-                },
-                "required": ["query"]
+                }
             }
         }
     },
@@ -1,6 +1,8 @@
 import logging
+import math
 import sys
 import ollama
+import tiktoken
 from .config import config
 
 def setup_logger(name: str = "DevMind") -> logging.Logger:
@@ -30,16 +32,71 @@ def get_ollama_client():
 def get_ollama_embedding(text: str, model: str = config.EMBEDDING_MODEL) -> list[float]:
     """
     Wrapper for Ollama embeddings to be used across the project.
+    Uses the same /api/embed endpoint as get_ollama_embeddings, so single and
+    batched calls return the same (unit-length) vectors.
     """
     try:
         client = get_ollama_client()
-        response = client.embeddings(model=model, prompt=text)
-        return response.get("embedding", [])
+        response = client.embed(model=model, input=text)
+        embeddings = response.get("embeddings", [])
+        return list(embeddings[0]) if embeddings else []
     except Exception as e:
         logger = logging.getLogger("DevMind")
         logger.error(f"Error getting embedding: {e}")
         return []
 
+def get_ollama_embeddings(texts: list[str], model: str = config.EMBEDDING_MODEL) -> list[list[float]]:
+    """
+    Embeds a batch of texts with a single call to Ollama's /api/embed endpoint.
+    Unlike get_ollama_embedding, errors are raised so callers can retry the batch.
+    """
+    if not texts:
+        return []
+    client = get_ollama_client()
+    response = client.embed(model=model, input=texts)
+    embeddings = response.get("embeddings", [])
+    if len(embeddings) != len(texts):
+        raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+    return [list(vector) for vector in embeddings]
+
+# Tokenizer is loaded once; None means tiktoken could not load its encoding (e.g. offline)
+_tokenizer = None
+_tokenizer_loaded = False
+
+def get_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        _tokenizer_loaded = True
+        try:
+            _tokenizer = tiktoken.get_encoding(config.TOKENIZER_ENCODING)
+        except Exception as e:
+            logging.getLogger("DevMind").warning(
+                f"Could not load tiktoken encoding {config.TOKENIZER_ENCODING}, estimating tokens from length: {e}"
+            )
+    return _tokenizer
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with tiktoken, falling back to ~4 characters per token.
+    """
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return math.ceil(len(text) / 4)
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+def split_by_tokens(text: str, max_tokens: int) -> list[str]:
+    """
+    Hard-splits text into pieces of at most max_tokens tokens.
+    """
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        step = max_tokens * 4
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = tokenizer.encode(text, disallowed_special=())
+    return [tokenizer.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> list[str]:
     """
     Splits text into chunks with overlap.
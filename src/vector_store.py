@@ -0,0 +1,545 @@
+import os
+import json
+import shutil
+import sqlite3
+import threading
+import numpy as np
+import chromadb
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("VectorStore")
+
+VECTOR_BACKENDS = ("chroma", "numpy")
+# Stored vector encodings of the NumPy backend and their codes in the meta table
+QUANTIZATIONS = {"float16": 0, "int8": 1}
+# Per-row arrays; each epoch has one file per array
+ARRAY_NAMES = ("vectors", "norms", "scales", "full")
+# Vectors are appended, so the matrix file grows by doubling
+INITIAL_CAPACITY = 1024
+
+def open_vector_client(backend: str = None, path: str = None):
+    """
+    Opens the configured vector store. Both backends expose ChromaDB's client
+    and collection API (get_or_create_collection, upsert, query with `where`, ...),
+    so ingestion, the index alias and retrieval work with either.
+    """
+    backend = backend or config.VECTOR_BACKEND
+    if backend == "chroma":
+        return chromadb.PersistentClient(path=path or config.CHROMA_DB_PATH)
+    if backend == "numpy":
+        return FlatIndexClient(path or config.NUMPY_STORE_DIR)
+    raise ValueError(f"Unknown vector backend {backend!r}, expected one of {', '.join(VECTOR_BACKENDS)}")
+
+def _compare(value, operand, op) -> bool:
+    try:
+        return value is not None and op(value, operand)
+    except TypeError:
+        return False
+
+_OPERATORS = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: _compare(value, operand, lambda a, b: a > b),
+    "$gte": lambda value, operand: _compare(value, operand, lambda a, b: a >= b),
+    "$lt": lambda value, operand: _compare(value, operand, lambda a, b: a < b),
+    "$lte": lambda value, operand: _compare(value, operand, lambda a, b: a <= b),
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+    "$contains": lambda value, operand: isinstance(value, list) and operand in value,
+    "$not_contains": lambda value, operand: not (isinstance(value, list) and operand in value),
+}
+
+def matches_where(metadata: dict, where: dict | None) -> bool:
+    """Evaluates a ChromaDB `where` clause against one chunk's metadata."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported where operator {op}")
+                if not _OPERATORS[op](value, operand):
+                    return False
+    return True
+
+class FlatCollection:
+    """
+    Nearest-neighbour search over an on-disk, quantized embedding matrix.
+
+    Vectors live in `vectors.<epoch>.npy` (memory-mapped, one row per chunk),
+    stored as float16 or as int8 with a per-row scale (`scales.<epoch>.npy`),
+    with their exact squared norms in `norms.<epoch>.npy`. With re-scoring,
+    the float32 originals are kept in `full.<epoch>.npy`; only the rows of
+    the shortlist are read from it. IDs, documents and metadata live in a
+    SQLite sidecar that also records which rows are live.
+
+    Upserts append rows and replaced or deleted rows become dead until the
+    matrix is compacted into a new epoch. A query is a blocked matrix
+    multiply followed by argpartition, returning squared L2 distances like
+    ChromaDB's default space. Other processes' commits are picked up through
+    SQLite's data_version, so a reader sees the rows of one committed state.
+    The encoding is fixed when the collection is created (NUMPY_STORE_DTYPE,
+    NUMPY_RESCORE_ENABLED).
+    """
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(path, "store.sqlite3"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                row INTEGER NOT NULL UNIQUE,
+                document TEXT,
+                metadata TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+        self._data_version = None
+        self._load()
+
+    def _meta(self, key: str, default: int = 0) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _file(self, name: str, epoch: int) -> str:
+        return os.path.join(self.path, f"{name}.{epoch}.npy")
+
+    def _array_specs(self) -> dict[str, tuple]:
+        """Array name -> (dtype, row shape) for this collection's encoding."""
+        specs = {
+            "vectors": (np.int8 if self.quantization == "int8" else np.float16, (self.dim,)),
+            "norms": (np.float32, ())
+        }
+        if self.quantization == "int8":
+            specs["scales"] = (np.float32, ())
+        if self.rescore:
+            specs["full"] = (np.float32, (self.dim,))
+        return specs
+
+    def _load(self):
+        """Reads the committed state: row map, epoch and the mapped matrix."""
+        with self._lock:
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self.epoch = self._meta("epoch")
+            self.dim = self._meta("dim")
+            self.next_row = self._meta("next_row")
+            self.capacity = self._meta("capacity")
+            # Collections written before quantization existed are float16 without re-scoring
+            written = self.dim > 0
+            codes = {code: name for name, code in QUANTIZATIONS.items()}
+            self.quantization = codes[self._meta(
+                "quantization", QUANTIZATIONS["float16"] if written else QUANTIZATIONS[config.NUMPY_STORE_DTYPE]
+            )]
+            self.rescore = bool(self._meta("rescore", 0 if written else int(config.NUMPY_RESCORE_ENABLED)))
+            self._row_ids = {}
+            for chunk_id, row in self._conn.execute("SELECT id, row FROM chunks"):
+                self._row_ids[row] = chunk_id
+            self._id_rows = {chunk_id: row for row, chunk_id in self._row_ids.items()}
+            self._live = np.zeros(self.capacity, dtype=bool)
+            if self._row_ids:
+                self._live[np.fromiter(self._row_ids, dtype=np.int64)] = True
+            self._metadatas = None
+            self._where_cache = {}
+            self.arrays = {}
+            if self.capacity:
+                self.arrays = {name: np.load(self._file(name, self.epoch), mmap_mode="r+") for name in self._array_specs()}
+
+    def _refresh(self):
+        """Reloads after another process committed (one PRAGMA per call)."""
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load()
+
+    def _row_metadatas(self) -> dict[int, dict]:
+        """Parsed metadata by row, loaded on the first filtered call."""
+        if self._metadatas is None:
+            self._metadatas = {
+                row: json.loads(metadata) if metadata else {}
+                for row, metadata in self._conn.execute("SELECT row, metadata FROM chunks")
+            }
+        return self._metadatas
+
+    def _where_rows(self, where: dict | None) -> np.ndarray:
+        """Live rows matching `where`; filtered row sets are cached until the next write."""
+        live = np.flatnonzero(self._live[:self.next_row])
+        if not where:
+            return live
+        key = json.dumps(where, sort_keys=True)
+        rows = self._where_cache.get(key)
+        if rows is None:
+            metadatas = self._row_metadatas()
+            rows = np.array([row for row in live if matches_where(metadatas[row], where)], dtype=np.int64)
+            self._where_cache[key] = rows
+        return rows
+
+    def _allocate(self, rows: int):
+        """Makes room for `rows` more vectors, copying into a larger epoch when full."""
+        needed = self.next_row + rows
+        if needed <= self.capacity:
+            return
+        capacity = max(INITIAL_CAPACITY, self.capacity * 2, needed)
+        self._write_epoch(capacity, np.arange(self.next_row))
+
+    def _write_epoch(self, capacity: int, rows: np.ndarray):
+        """Copies `rows` (in order) into new array files of `capacity` rows."""
+        epoch = self.epoch + 1
+        block = config.NUMPY_SEARCH_BLOCK_ROWS
+        arrays = {}
+        for name, (dtype, shape) in self._array_specs().items():
+            target = np.lib.format.open_memmap(self._file(name, epoch), mode="w+", dtype=dtype, shape=(capacity,) + shape)
+            for start in range(0, len(rows), block):
+                chunk = rows[start:start + block]
+                target[start:start + len(chunk)] = self.arrays[name][chunk]
+            target.flush()
+            del target
+            arrays[name] = np.load(self._file(name, epoch), mmap_mode="r+")
+        self.epoch, self.capacity, self.arrays = epoch, capacity, arrays
+        live = np.zeros(capacity, dtype=bool)
+        live[:min(len(self._live), capacity)] = self._live[:capacity]
+        self._live = live
+
+    def _commit_meta(self):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("epoch", self.epoch), ("dim", self.dim), ("next_row", self.next_row), ("capacity", self.capacity),
+                ("quantization", QUANTIZATIONS[self.quantization]), ("rescore", int(self.rescore))
+            ]
+        )
+        self._conn.commit()
+        # Readers that still map an older epoch keep working on POSIX
+        for name in os.listdir(self.path):
+            parts = name.split(".")
+            if len(parts) == 3 and parts[0] in ARRAY_NAMES and parts[1].isdigit() and int(parts[1]) < self.epoch:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def _compact(self):
+        """Rewrites the matrix with live rows only once dead rows outnumber them."""
+        live = len(self._row_ids)
+        dead = self.next_row - live
+        if dead <= max(live, INITIAL_CAPACITY):
+            return
+        order = np.array(sorted(self._row_ids), dtype=np.int64)
+        self._live[:] = False
+        self._live[:live] = True
+        self._write_epoch(max(INITIAL_CAPACITY, live * 2), order)
+        remap = {int(old): new for new, old in enumerate(order)}
+        # Rows are UNIQUE, so they move through negative values first
+        self._conn.execute("UPDATE chunks SET row = -row - 1")
+        self._conn.executemany("UPDATE chunks SET row = ? WHERE row = ?", [(new, -old - 1) for old, new in remap.items()])
+        self.next_row = live
+        self._commit_meta()
+        logger.info(f"Compacted {self.name}: dropped {dead} dead rows.")
+        self._load()
+
+    def _encode(self, vectors: np.ndarray) -> dict[str, np.ndarray]:
+        """Per-array values for new rows. int8 rows are scaled by their largest component."""
+        encoded = {"norms": np.einsum("ij,ij->i", vectors, vectors)}
+        if self.quantization == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            encoded["vectors"] = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            encoded["scales"] = scales
+        else:
+            encoded["vectors"] = vectors.astype(np.float16)
+        if self.rescore:
+            encoded["full"] = vectors
+        return encoded
+
+    def _decode(self, rows) -> np.ndarray:
+        """float32 approximations of the stored vectors at `rows` (a slice or an index array)."""
+        vectors = self.arrays["vectors"][rows].astype(np.float32)
+        if self.quantization == "int8":
+            vectors *= self.arrays["scales"][rows][:, None]
+        return vectors
+
+    def storage_bytes(self) -> dict[str, int]:
+        """Bytes per array for the rows in use; all but `full` are scanned by every query."""
+        return {
+            name: self.next_row * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+            for name, (dtype, shape) in self._array_specs().items()
+        } if self.dim else {}
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._row_ids)
+
+    def upsert(self, ids: list[str], embeddings=None, documents: list[str] = None, metadatas: list[dict] = None):
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("upsert needs one embedding per id")
+        if len(set(ids)) != len(ids):
+            raise ValueError("upsert got duplicate ids")
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            self._refresh()
+            if not self.dim:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimensionality {self.dim}")
+            self._allocate(len(ids))
+            rows = np.arange(self.next_row, self.next_row + len(ids))
+            # A new row is written before the commit that makes it visible
+            for name, values in self._encode(vectors).items():
+                self.arrays[name][rows] = values
+                self.arrays[name].flush()
+            replaced = [self._id_rows[chunk_id] for chunk_id in ids if chunk_id in self._id_rows]
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, row, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (chunk_id, int(row), document, json.dumps(metadata) if metadata else None)
+                    for chunk_id, row, document, metadata in zip(ids, rows, documents, metadatas)
+                ]
+            )
+            self.next_row += len(ids)
+            self._commit_meta()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self._where_cache = {}
+            for row in replaced:
+                self._live[row] = False
+                self._row_ids.pop(row, None)
+            for chunk_id, row, metadata in zip(ids, rows, metadatas):
+                row = int(row)
+                self._live[row] = True
+                self._row_ids[row] = chunk_id
+                self._id_rows[chunk_id] = row
+                if self._metadatas is not None:
+                    self._metadatas[row] = metadata or {}
+
+    add = upsert
+
+    def update(self, ids: list[str], metadatas: list[dict] = None, documents: list[str] = None, embeddings=None):
+        """
+        Changes existing records like ChromaDB: unknown ids are skipped and
+        metadata is merged into the stored one (a None value removes the key).
+        """
+        with self._lock:
+            self._refresh()
+            positions = [i for i, chunk_id in enumerate(ids or []) if chunk_id in self._id_rows]
+            if not positions:
+                return
+            rows = [self._id_rows[ids[i]] for i in positions]
+            current = self._fetch(rows, ["documents", "metadatas"])
+            new_documents = [
+                documents[i] if documents is not None and documents[i] is not None else current["documents"][j]
+                for j, i in enumerate(positions)
+            ]
+            new_metadatas = []
+            for j, i in enumerate(positions):
+                merged = dict(current["metadatas"][j] or {})
+                if metadatas is not None and metadatas[i]:
+                    merged.update(metadatas[i])
+                new_metadatas.append({key: value for key, value in merged.items() if value is not None})
+
+            if embeddings is not None:
+                # New vectors need new rows, which upsert writes together with the merged record
+                self.upsert(
+                    ids=[ids[i] for i in positions],
+                    embeddings=[embeddings[i] for i in positions],
+                    documents=new_documents,
+                    metadatas=new_metadatas
+                )
+                return
+            self._conn.executemany(
+                "UPDATE chunks SET document = ?, metadata = ? WHERE row = ?",
+                [
+                    (document, json.dumps(metadata) if metadata else None, row)
+                    for document, metadata, row in zip(new_documents, new_metadatas, rows)
+                ]
+            )
+            self._conn.commit()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self._where_cache = {}
+            if self._metadatas is not None:
+                for row, metadata in zip(rows, new_metadatas):
+                    self._metadatas[row] = metadata
+
+    def delete(self, ids: list[str] = None, where: dict = None):
+        with self._lock:
+            self._refresh()
+            if ids is not None:
+                rows = [self._id_rows[chunk_id] for chunk_id in ids if chunk_id in self._id_rows]
+                if where:
+                    metadatas = self._row_metadatas()
+                    rows = [row for row in rows if matches_where(metadatas[row], where)]
+            else:
+                rows = [int(row) for row in self._where_rows(where)]
+            if not rows:
+                return
+            self._conn.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row in rows])
+            self._conn.commit()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self._where_cache = {}
+            for row in rows:
+                self._live[row] = False
+                del self._id_rows[self._row_ids.pop(row)]
+            self._compact()
+
+    def _fetch(self, rows: list[int], include: list[str]) -> dict:
+        """Documents and metadata of `rows`, in the same order."""
+        found = {}
+        needs_rows = "documents" in include or "metadatas" in include
+        for start in range(0, len(rows) if needs_rows else 0, 500):
+            batch = rows[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for row, document, metadata in self._conn.execute(
+                f"SELECT row, document, metadata FROM chunks WHERE row IN ({placeholders})", batch
+            ):
+                found[row] = (document, json.loads(metadata) if metadata else None)
+        result = {}
+        if "documents" in include:
+            result["documents"] = [found.get(row, (None, None))[0] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [found.get(row, (None, None))[1] for row in rows]
+        if "embeddings" in include:
+            source = self.arrays.get("full")
+            result["embeddings"] = [
+                np.array(source[row]) if source is not None else self._decode(np.array([row]))[0] for row in rows
+            ]
+        return result
+
+    def get(self, ids: list[str] = None, where: dict = None, limit: int = None, offset: int = None,
+            include: list[str] = None) -> dict:
+        include = ["documents", "metadatas"] if include is None else include
+        with self._lock:
+            self._refresh()
+            if ids is not None:
+                rows = [self._id_rows[chunk_id] for chunk_id in ids if chunk_id in self._id_rows]
+                if where:
+                    metadatas = self._row_metadatas()
+                    rows = [row for row in rows if matches_where(metadatas[row], where)]
+            else:
+                rows = [int(row) for row in self._where_rows(where)]
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            result = {"ids": [self._row_ids[row] for row in rows]}
+            result.update(self._fetch(rows, include))
+            return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: dict = None, include: list[str] = None) -> dict:
+        include = ["documents", "metadatas", "distances"] if include is None else include
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        with self._lock:
+            self._refresh()
+            candidates = self._where_rows(where)
+            if self.dim and queries.shape[1] != self.dim:
+                raise ValueError(f"Query dimension {queries.shape[1]} does not match collection dimensionality {self.dim}")
+            rows, distances = self._search(queries, candidates, n_results)
+            result = {"ids": [[self._row_ids[row] for row in query_rows] for query_rows in rows]}
+            fetched = [self._fetch(query_rows, include) for query_rows in rows]
+            for key in ("documents", "metadatas", "embeddings"):
+                if key in include:
+                    result[key] = [f[key] for f in fetched]
+            if "distances" in include:
+                result["distances"] = distances
+            return result
+
+    def _search(self, queries: np.ndarray, candidates: np.ndarray, k: int) -> tuple[list[list[int]], list[list[float]]]:
+        """
+        Top-k by squared L2 distance over the candidate rows. The quantized
+        matrix is scanned block by block for a shortlist, which is re-scored
+        against the float32 originals when they are kept.
+        """
+        k = min(k, len(candidates))
+        if k <= 0:
+            return [[] for _ in queries], [[] for _ in queries]
+        shortlist = min(len(candidates), k * config.NUMPY_RESCORE_FACTOR) if self.rescore else k
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        norms = self.arrays["norms"]
+        # Contiguous candidates are read as slices, filtered ones are gathered
+        contiguous = len(candidates) == self.next_row
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best = np.empty((len(queries), 0), dtype=np.float32)
+        block = config.NUMPY_SEARCH_BLOCK_ROWS
+        for start in range(0, len(candidates), block):
+            rows = candidates[start:start + block]
+            selection = slice(int(rows[0]), int(rows[-1]) + 1) if contiguous else rows
+            vectors = self._decode(selection)
+            distances = norms[selection][None, :] - 2.0 * (queries @ vectors.T) + query_norms[:, None]
+            best_rows = np.concatenate([best_rows, np.broadcast_to(rows, distances.shape)], axis=1)
+            best = np.concatenate([best, distances], axis=1)
+            if best.shape[1] > shortlist:
+                top = np.argpartition(best, shortlist - 1, axis=1)[:, :shortlist]
+                best = np.take_along_axis(best, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+        if self.rescore:
+            full = self.arrays["full"]
+            best = np.stack([
+                ((full[np.sort(rows)] - query) ** 2).sum(axis=1) for rows, query in zip(best_rows, queries)
+            ])
+            best_rows = np.sort(best_rows, axis=1)
+        order = np.argsort(best, axis=1, kind="stable")[:, :k]
+        best = np.maximum(np.take_along_axis(best, order, axis=1), 0.0)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [[int(row) for row in rows] for rows in best_rows], [[float(d) for d in dists] for dists in best]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class FlatIndexClient:
+    """Collections of the NumPy backend, one directory each under `path`."""
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._collections = {}
+
+    def _open(self, name: str) -> FlatCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = FlatCollection(os.path.join(self.path, name), name)
+                self._collections[name] = collection
+            return collection
+
+    def _exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, name, "store.sqlite3"))
+
+    def get_or_create_collection(self, name: str, **kwargs) -> FlatCollection:
+        return self._open(name)
+
+    def get_collection(self, name: str, **kwargs) -> FlatCollection:
+        if not self._exists(name):
+            raise ValueError(f"Collection {name} does not exist.")
+        return self._open(name)
+
+    def create_collection(self, name: str, **kwargs) -> FlatCollection:
+        if self._exists(name):
+            raise ValueError(f"Collection {name} already exists.")
+        return self._open(name)
+
+    def delete_collection(self, name: str):
+        if not self._exists(name):
+            raise ValueError(f"Collection {name} does not exist.")
+        with self._lock:
+            collection = self._collections.pop(name, None)
+        if collection:
+            collection.close()
+        shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def list_collections(self) -> list[str]:
+        return sorted(name for name in os.listdir(self.path) if self._exists(name))
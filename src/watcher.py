@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+from datetime import datetime
+from src.config import config
+from src.utils import setup_logger
+from src.ingestion import (
+    IngestionPipeline, SUPPORTED_EXTENSIONS, open_collection, open_lexical_index, finish_run, scan_documents, log_stats
+)
+
+logger = setup_logger("Watcher")
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Reads (opened / closed_no_write) must not trigger a re-index
+CHANGE_EVENTS = {"created", "modified", "deleted", "moved", "closed"}
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards file system events for watched files to the watcher."""
+    def __init__(self, watcher: "KnowledgeBaseWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        self.watcher.mark(event.src_path)
+        dest_path = getattr(event, "dest_path", None)
+        if dest_path:
+            self.watcher.mark(dest_path)
+
+class KnowledgeBaseWatcher:
+    """
+    Keeps devmind_docs in sync with DOCS_SOURCE_PATH.
+    File events (inotify via watchdog, or periodic polling as a fallback) mark
+    files as dirty; once a file has been quiet for `debounce` seconds it is
+    re-chunked and re-embedded incrementally, or its chunks are deleted.
+    """
+    def __init__(
+        self,
+        path: str = None,
+        debounce: float = config.WATCH_DEBOUNCE_SECONDS,
+        poll_interval: float = config.WATCH_POLL_INTERVAL,
+        force_polling: bool = False,
+        collection=None,
+        manifest=None,
+        **pipeline_options
+    ):
+        self.path = path or config.DOCS_SOURCE_PATH
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.pipeline_options = pipeline_options
+        self.backend = "polling" if force_polling or Observer is None else "inotify"
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshot = {}
+        self.last_sync = None
+        self.last_sync_lag = 0.0
+        self.synced_files = 0
+
+        # Only a collection opened here may be a rebuilt generation that needs publishing
+        self.client = None
+        if collection is None or manifest is None:
+            self.client, collection, manifest = open_collection()
+            self.pipeline_options.setdefault("lexical_index", open_lexical_index(collection))
+        self.collection = collection
+        self.manifest = manifest
+
+    # --- Event intake ------------------------------------------------------------
+
+    def mark(self, path: str):
+        if not path.endswith(SUPPORTED_EXTENSIONS):
+            return
+        with self._lock:
+            # Keep the first event time so lag covers the whole burst
+            first_seen, _ = self._pending.get(path, (time.time(), None))
+            self._pending[path] = (first_seen, time.time())
+
+    def _poll(self):
+        """Fallback change detection: compare size and mtime of every file."""
+        current = {}
+        for source in scan_documents(self.path):
+            try:
+                stat = os.stat(source)
+            except OSError:
+                continue
+            current[source] = (stat.st_size, stat.st_mtime)
+        for source, signature in current.items():
+            if self._snapshot.get(source) != signature:
+                self.mark(source)
+        for source in self._snapshot.keys() - current.keys():
+            self.mark(source)
+        self._snapshot = current
+
+    # --- Sync ----------------------------------------------------------------------
+
+    def _due(self) -> list[tuple[str, float]]:
+        """Pops files whose last event is older than the debounce window."""
+        now = time.time()
+        with self._lock:
+            due = [(path, first) for path, (first, last) in self._pending.items() if now - last >= self.debounce]
+            for path, _ in due:
+                del self._pending[path]
+        return due
+
+    def sync(self, sources: list[str]) -> dict:
+        """Re-indexes changed files and drops chunks of removed ones."""
+        existing = [s for s in sources if os.path.exists(s)]
+        removed = [s for s in sources if not os.path.exists(s) and self.manifest.get(s)]
+
+        options = dict(self.pipeline_options)
+        # A process pool is not worth starting for a handful of files
+        if len(existing) < 4:
+            options["workers"] = 0
+        pipeline = IngestionPipeline(self.collection, self.manifest, **options)
+        pipeline.remove_sources(removed)
+        return pipeline.run(existing)
+
+    def initial_sync(self):
+        logger.info(f"Initial sync of {self.path}...")
+        files = scan_documents(self.path)
+        on_disk = set(files)
+        pipeline = IngestionPipeline(self.collection, self.manifest, **self.pipeline_options)
+        pipeline.remove_sources([s for s in self.manifest.files if s not in on_disk])
+        log_stats(pipeline.run(files))
+        if self.client:
+            built = self.collection.name
+            self.collection = finish_run(self.client, self.collection, self.manifest, not pipeline.stop_event.is_set())
+            if self.collection.name != built:
+                logger.critical(f"Rebuilt index {built} could not be published. Stopping the watcher.")
+                self.stop()
+        self.last_sync = datetime.now()
+        if self.backend == "polling":
+            self._poll()
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            depth = len(self._pending)
+            oldest = min((first for first, _ in self._pending.values()), default=None)
+        return {
+            "backend": self.backend,
+            "queue_depth": depth,
+            "last_sync": self.last_sync.isoformat(timespec="seconds") if self.last_sync else None,
+            # Time since the oldest unsynced change, or the lag of the last sync when idle
+            "lag_seconds": round(now - oldest, 1) if oldest else round(self.last_sync_lag, 1),
+            "synced_files": self.synced_files,
+            "chunks_in_index": self.collection.count()
+        }
+
+    def _log_status(self):
+        s = self.status()
+        logger.info(
+            f"Status: backend={s['backend']}, queue={s['queue_depth']}, last_sync={s['last_sync']}, "
+            f"lag={s['lag_seconds']}s, synced_files={s['synced_files']}, chunks={s['chunks_in_index']}"
+        )
+
+    # --- Main loop ------------------------------------------------------------------
+
+    def run(self, status_interval: float = 60.0):
+        os.makedirs(self.path, exist_ok=True)
+
+        # Start watching before the initial sync so edits made during it are not lost
+        observer = None
+        if self.backend == "inotify":
+            observer = Observer()
+            observer.schedule(_EventHandler(self), self.path, recursive=True)
+            observer.start()
+        self.initial_sync()
+        logger.info(f"Watching {self.path} ({self.backend}, debounce {self.debounce}s). Press Ctrl+C to stop.")
+
+        last_poll = time.time()
+        last_status = time.time()
+        try:
+            while not self._stop.is_set():
+                now = time.time()
+                if self.backend == "polling" and now - last_poll >= self.poll_interval:
+                    self._poll()
+                    last_poll = now
+
+                due = self._due()
+                if due:
+                    started = min(first for _, first in due)
+                    stats = self.sync([path for path, _ in due])
+                    self.last_sync = datetime.now()
+                    self.last_sync_lag = time.time() - started
+                    self.synced_files += len(due)
+                    logger.info(
+                        f"Synced {len(due)} file(s): {stats['updated']} updated, {stats['removed']} removed, "
+                        f"{stats['embedded']} chunks embedded, {stats['deleted_chunks']} deleted "
+                        f"(lag {self.last_sync_lag:.1f}s)."
+                    )
+
+                if now - last_status >= status_interval:
+                    self._log_status()
+                    last_status = now
+                self._stop.wait(0.5)
+        except KeyboardInterrupt:
+            logger.info("Stopping watcher...")
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,68 @@
+import unittest
+import io
+from src.chunking import chunk_markdown, iter_blocks
+
+class TestChunking(unittest.TestCase):
+
+    def test_blocks(self):
+        """Заголовки, абзацы и блоки кода распознаются как отдельные блоки."""
+        text = "# Title\nPara line 1\nline 2\n\n```\ncode\n\nmore code\n```\n"
+        kinds = [kind for kind, _ in iter_blocks(text.splitlines(keepends=True))]
+        self.assertEqual(kinds, ["heading", "paragraph", "code"])
+
+    def test_fence_closes_only_on_bare_fence(self):
+        """Строка вида ```python внутри блока кода не закрывает его."""
+        text = "````\nExample:\n```python\nx = 1\n```\n````\nafter\n"
+        blocks = list(iter_blocks(text.splitlines(keepends=True)))
+        self.assertEqual([kind for kind, _ in blocks], ["code", "paragraph"])
+        self.assertTrue(blocks[0][1].endswith("```\n````"))
+
+        text = "```\ncode\n```python\n# not a heading\n```\n"
+        self.assertEqual([kind for kind, _ in iter_blocks(text.splitlines(keepends=True))], ["code"])
+
+    def test_trailing_headings_kept(self):
+        """Заголовки в конце документа не теряются."""
+        for text in ["text\n\n# Trailing heading\n", "text\n\n# Trailing heading\n\n## Sub heading\n"]:
+            chunks = list(chunk_markdown(text, max_tokens=100, min_tokens=50))
+            joined = "\n\n".join(c.text for c in chunks)
+            self.assertIn("text", joined)
+            self.assertIn("# Trailing heading", joined)
+        self.assertIn("## Sub heading", joined)
+
+    def test_code_block_not_split(self):
+        """Блок кода, помещающийся в лимит, не разрезается."""
+        text = "# A\n" + "intro text. " * 40 + "\n\n```python\n" + "x = 1\n" * 20 + "```\n"
+        chunks = list(chunk_markdown(text, max_tokens=150, min_tokens=0))
+        code_chunks = [c for c in chunks if "```python" in c.text]
+        self.assertEqual(len(code_chunks), 1)
+        self.assertTrue(code_chunks[0].text.rstrip().endswith("```"))
+
+    def test_heading_path(self):
+        """Каждый чанк несёт путь заголовков."""
+        text = "# Guide\n\n## Install\n" + "pip install. " * 30 + "\n\n## Usage\n" + "run it. " * 30 + "\n"
+        chunks = list(chunk_markdown(text, max_tokens=500, min_tokens=10))
+        self.assertEqual(chunks[-1].heading_path, "Guide > Usage")
+        self.assertIn("Guide > Install", [c.heading_path for c in chunks])
+
+    def test_max_tokens_respected(self):
+        """Ни один чанк не превышает лимит токенов."""
+        text = "# T\n" + "long sentence without end " * 500 + "\n\n```\n" + "y = 2\n" * 500 + "```\n"
+        for chunk in chunk_markdown(text, max_tokens=100, min_tokens=0):
+            self.assertLessEqual(chunk.tokens, 100)
+
+    def test_no_overlap(self):
+        """Чанки не дублируют текст друг друга."""
+        text = "\n\n".join(f"Paragraph number {i}." for i in range(200))
+        chunks = list(chunk_markdown(text, max_tokens=60, min_tokens=0))
+        joined = " ".join(c.text for c in chunks)
+        self.assertEqual(joined.count("Paragraph number 42."), 1)
+
+    def test_streaming_input(self):
+        """Чанкер принимает поток строк (например, открытый файл)."""
+        stream = io.StringIO("# Title\n\nhello world\n")
+        chunks = list(chunk_markdown(stream))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].heading_path, "Title")
+
+if __name__ == "__main__":
+    unittest.main()
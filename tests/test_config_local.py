@@ -2,7 +2,7 @@ import unittest
 from unittest.mock import patch, MagicMock
 import os
 from src.config import config
-from src.utils import get_ollama_embedding
+from src.utils import get_ollama_embedding, get_ollama_embeddings
 
 class TestLocalConfig(unittest.TestCase):
     def test_config_values(self):
@@ -18,16 +18,38 @@ class TestLocalConfig(unittest.TestCase):
         # Setup mock
         mock_client_instance = MagicMock()
         mock_client_cls.return_value = mock_client_instance
-        mock_client_instance.embeddings.return_value = {"embedding": [0.1, 0.2]}
+        mock_client_instance.embed.return_value = {"embeddings": [[0.1, 0.2]]}
 
         # Call function
-        get_ollama_embedding("test")
+        vector = get_ollama_embedding("test")
 
         # Verify Client was initialized with correct host
         mock_client_cls.assert_called_with(host="http://192.168.88.21:91")
         
-        # Verify embeddings was called
-        mock_client_instance.embeddings.assert_called()
+        # Single texts go through the same /api/embed endpoint as batches
+        mock_client_instance.embed.assert_called_with(model=config.EMBEDDING_MODEL, input="test")
+        mock_client_instance.embeddings.assert_not_called()
+        self.assertEqual(vector, [0.1, 0.2])
+
+    @patch("src.utils.get_ollama_client")
+    def test_batch_embedding_single_request(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_get_client.return_value = mock_client
+        mock_client.embed.return_value = {"embeddings": [[0.1, 0.2], [0.3, 0.4]]}
+
+        vectors = get_ollama_embeddings(["a", "b"])
+
+        self.assertEqual(vectors, [[0.1, 0.2], [0.3, 0.4]])
+        mock_client.embed.assert_called_once()
+
+    @patch("src.utils.get_ollama_client")
+    def test_batch_embedding_count_mismatch_raises(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_get_client.return_value = mock_client
+        mock_client.embed.return_value = {"embeddings": [[0.1, 0.2]]}
+
+        with self.assertRaises(ValueError):
+            get_ollama_embeddings(["a", "b"])
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import chromadb
+from src.context import ContextAssembler, strip_overlap
+from src.utils import chunk_text, count_tokens
+
+SOURCE = "./data/knowledge_base/guide.md"
+CITATION = "[Source: guide.md]"
+
+def hit(index, document, source=SOURCE):
+    return (f"{source}:{index}", document, {"source": source, "chunk_index": index})
+
+class TestContextAssembler(unittest.TestCase):
+
+    def setUp(self):
+        self.client = chromadb.EphemeralClient()
+        self.collection = self.client.get_or_create_collection(name="test_context")
+        self.sections = [f"Section {i}. " + f"Step {i} explains setting number {i}. " * 5 for i in range(6)]
+        self.collection.add(
+            ids=[f"{SOURCE}:{i}" for i in range(6)],
+            documents=self.sections,
+            embeddings=[[float(i), 1.0] for i in range(6)],
+            metadatas=[{"source": SOURCE, "chunk_index": i} for i in range(6)]
+        )
+
+    def tearDown(self):
+        self.client.delete_collection(name="test_context")
+
+    def test_overlap_is_removed(self):
+        """Перекрытие соседних чанков фиксированного размера удаляется при склейке."""
+        text = "".join(f"Sentence number {i} of the document. " for i in range(100))
+        chunks = chunk_text(text, chunk_size=300, overlap=50)
+        self.assertEqual(strip_overlap(chunks[0], chunks[1]), chunks[1][50:])
+        self.assertIsNone(strip_overlap("unrelated text here", "completely different text"))
+
+        hits = [hit(i, chunk) for i, chunk in enumerate(chunks[:3])]
+        context, _ = ContextAssembler(budget_tokens=10000, neighbors=0).assemble(hits)
+        self.assertEqual(context, f"{CITATION}\n{text[:800]}")
+
+    def test_adjacent_hits_merge_with_neighbours(self):
+        """Соседние попадания из одного файла объединяются и дополняются соседними чанками."""
+        assembler = ContextAssembler(self.collection, budget_tokens=10000, neighbors=1)
+        context, tokens = assembler.assemble([hit(2, self.sections[2]), hit(3, self.sections[3])])
+
+        self.assertEqual(context.count("[Source:"), 1)
+        self.assertEqual(context.split("\n", 1)[1], "\n\n".join(self.sections[1:5]))
+        self.assertEqual(tokens, count_tokens(context))
+
+    def test_budget_limits_context(self):
+        """Контекст не превышает бюджет токенов, лучший фрагмент всегда попадает в него."""
+        hits = [hit(0, self.sections[0]), hit(4, self.sections[4])]
+        full, full_tokens = ContextAssembler(self.collection, budget_tokens=10000, neighbors=1).assemble(hits)
+        self.assertIn(self.sections[5], full)
+
+        budget = full_tokens // 2
+        context, tokens = ContextAssembler(self.collection, budget_tokens=budget, neighbors=1).assemble(hits)
+        self.assertLessEqual(tokens, budget)
+        self.assertTrue(context.startswith(f"{CITATION}\n{self.sections[0]}"))
+
+        tiny, tokens = ContextAssembler(budget_tokens=10, neighbors=0).assemble(hits)
+        self.assertLessEqual(tokens, 10)
+        self.assertTrue(tiny.startswith("[Source:"))
+
+    def test_exhausted_budget_gives_no_context(self):
+        """Исчерпанный бюджет (0 или меньше) не заменяется бюджетом по умолчанию."""
+        hits = [hit(0, self.sections[0])]
+        assembler = ContextAssembler(budget_tokens=100, neighbors=0)
+        self.assertEqual(assembler.assemble(hits, 0), ("", 0))
+        self.assertEqual(assembler.assemble(hits, -5), ("", 0))
+        self.assertGreater(assembler.assemble(hits)[1], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from src.dedup import MinHashIndex, minhash, similarity, dedupe_texts, encode_signature, decode_signature
+
+LICENSE = (
+    "Licensed under the Apache License, Version 2.0; you may not use this file except in compliance "
+    "with the License. Unless required by applicable law or agreed to in writing, software distributed "
+    "under the License is distributed on an AS IS BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND."
+)
+OTHER = (
+    "Configure the proxy by editing the settings file and restarting the agent service "
+    "on every node of the cluster before running the migration script."
+)
+
+class TestDedup(unittest.TestCase):
+
+    def test_similarity_of_near_duplicates(self):
+        """Почти одинаковые тексты похожи, разные — нет."""
+        edited = LICENSE.replace("Version 2.0", "Version 3.0")
+        self.assertGreaterEqual(similarity(minhash(LICENSE), minhash(edited)), 0.8)
+        self.assertLess(similarity(minhash(LICENSE), minhash(OTHER)), 0.2)
+
+    def test_signature_roundtrip(self):
+        """Сигнатура переживает сериализацию в манифест."""
+        signature = minhash(LICENSE)
+        self.assertTrue((decode_signature(encode_signature(signature)) == signature).all())
+
+    def test_index_find_and_exclude(self):
+        """Индекс находит ближайший дубликат и пропускает исключённые ID."""
+        index = MinHashIndex(threshold=0.8)
+        index.add("license", minhash(LICENSE))
+        index.add("other", minhash(OTHER))
+        query = minhash(LICENSE + " Copyright holders.")
+        self.assertEqual(index.find(query), "license")
+        self.assertIsNone(index.find(query, exclude={"license"}))
+        index.remove("license")
+        self.assertIsNone(index.find(query))
+
+    def test_dedupe_texts_keeps_first(self):
+        """Из группы дубликатов остаётся первый, порядок сохраняется."""
+        texts = [LICENSE, OTHER, LICENSE.replace("2.0", "3.0"), "", LICENSE]
+        self.assertEqual(dedupe_texts(texts), [0, 1, 3])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+from src import embedding_cache
+from src.embedding_cache import EmbeddingCache
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_embedding_cache"
+        self.cache = EmbeddingCache(os.path.join(self.test_dir, "cache.sqlite3"), max_mb=1)
+
+    def tearDown(self):
+        self.cache.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_hit_and_miss(self):
+        """Повторный запрос берётся из кэша, счётчики обновляются."""
+        self.cache.put_many("m", {"hello": [0.5, 0.25]})
+        found = self.cache.get_many("m", ["hello", "world"])
+        self.assertEqual(found, {"hello": [0.5, 0.25]})
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_keys_separate_models(self):
+        """Векторы разных моделей не смешиваются."""
+        self.cache.put_many("m1", {"t": [1.0]})
+        self.assertEqual(self.cache.get_many("m2", ["t"]), {})
+        self.assertEqual(self.cache.get_many("m1", ["t"]), {"t": [1.0]})
+
+    def test_lru_eviction(self):
+        """При превышении лимита удаляются давно не используемые записи."""
+        vector = [0.0] * 1024  # 4 KB per entry, 1 MB cap
+        self.cache.put_many("m", {"keep": vector})
+        self.cache.put_many("m", {f"t{i}": vector for i in range(200)})
+        self.cache.get_many("m", ["keep"])
+        self.cache.put_many("m", {f"u{i}": vector for i in range(60)})
+
+        stats = self.cache.stats()
+        self.assertLessEqual(stats["size_mb"], 1.0)
+        self.assertIn("keep", self.cache.get_many("m", ["keep"]))
+        self.assertEqual(self.cache.get_many("m", ["t0"]), {})
+
+    def test_cached_embeddings_only_embeds_missing(self):
+        """В Ollama отправляются только тексты, которых нет в кэше."""
+        self.cache.put_many("m", {"a": [1.0]})
+        with patch.object(embedding_cache, "get_embedding_cache", return_value=self.cache), \
+             patch.object(embedding_cache, "get_ollama_embeddings", return_value=[[2.0]]) as mock_embed:
+            vectors = embedding_cache.cached_embeddings(["a", "b"], model="m")
+
+        self.assertEqual(vectors, [[1.0], [2.0]])
+        mock_embed.assert_called_once_with(["b"], model="m")
+
+if __name__ == "__main__":
+    unittest.main()
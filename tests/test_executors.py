@@ -0,0 +1,136 @@
+import unittest
+import time
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+from src import registry, agent as agent_module
+from src.agent import Agent
+from src.config import config
+from src.executors import get_executor, run_blocking
+from src.tools import ToolSet
+from tests.test_streaming import fake_stream, answer_chunks, tool_call_chunks
+
+async def slow_llm(messages, **kwargs):
+    """Asks for one web search, then answers; every request takes 0.2 s."""
+    if messages[-1]["role"] == "tool":
+        return fake_stream(answer_chunks(f"Answer: {messages[-1]['content']}"), delay=0.1)
+    return fake_stream(tool_call_chunks("call1", "web_search", {"query": messages[-1]["content"]}), delay=0.07)
+
+class TestAsyncExecution(unittest.TestCase):
+
+    def setUp(self):
+        registry.clear()
+        agent_module._llm_clients.clear()
+
+    def tearDown(self):
+        registry.clear()
+        agent_module._llm_clients.clear()
+
+    def test_run_blocking_uses_pool(self):
+        """Блокирующий вызов выполняется в потоке пула нужного вида, размер пула берётся из настроек."""
+        async def call():
+            return await run_blocking("io", lambda: threading.current_thread().name)
+
+        self.assertTrue(asyncio.run(call()).startswith("devmind-io"))
+        with patch.object(config, "RETRIEVAL_POOL_WORKERS", 3):
+            self.assertEqual(get_executor("retrieval")._max_workers, 3)
+
+    @patch("src.agent.AsyncOpenAI")
+    @patch("src.agent.ToolSet")
+    def test_sessions_do_not_block_each_other(self, mock_toolset, mock_openai):
+        """Медленные LLM и веб-поиск не блокируют цикл событий: параллельные сессии выполняются одновременно."""
+        def slow_search(query):
+            time.sleep(0.3)
+            return f"results for {query}"
+
+        def make_tools(**kwargs):
+            tools = ToolSet.__new__(ToolSet)
+            tools.web_search = slow_search
+            return tools
+
+        mock_toolset.side_effect = make_tools
+        mock_openai.return_value.chat.completions.create.side_effect = slow_llm
+        agents = [Agent() for _ in range(4)]
+        for agent in agents:
+            agent.tracker = MagicMock()
+
+        async def main():
+            ticks = 0
+            events = []
+
+            async def heartbeat():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            async def callback(event, data):
+                events.append(event)
+
+            beat = asyncio.create_task(heartbeat())
+            started = time.perf_counter()
+            answers = await asyncio.gather(*(agent.run(f"q{i}", callback=callback) for i, agent in enumerate(agents)))
+            elapsed = time.perf_counter() - started
+            beat.cancel()
+            return answers, elapsed, ticks, events
+
+        answers, elapsed, ticks, events = asyncio.run(main())
+        self.assertEqual(answers, [f"Answer: results for q{i}" for i in range(4)])
+        self.assertEqual(events.count("tool_start"), 4)
+        self.assertEqual(events.count("tool_end"), 4)
+        # Sequentially the four runs would take 4 x 0.7 s
+        self.assertLess(elapsed, 1.5)
+        self.assertGreater(ticks, 20)
+
+    @patch("src.agent.AsyncOpenAI")
+    @patch("src.agent.ToolSet")
+    def test_tool_calls_of_one_step_run_concurrently(self, mock_toolset, mock_openai):
+        """Вызовы инструментов одного шага выполняются параллельно (с ограничением), результаты идут в исходном порядке."""
+        delays = {"slow": 0.4, "medium": 0.2, "fast": 0.1}
+        responses = [
+            sum((tool_call_chunks(f"call_{name}", "web_search", {"query": name}, index=i) for i, name in enumerate(delays)), []),
+            answer_chunks("Done")
+        ]
+
+        async def create(**kwargs):
+            return fake_stream(responses.pop(0))
+
+        mock_openai.return_value.chat.completions.create.side_effect = create
+        agent = Agent()
+        agent.tracker = MagicMock()
+        running = []
+        peak = []
+
+        async def fake_tool(name, args):
+            running.append(args["query"])
+            peak.append(len(running))
+            await asyncio.sleep(delays[args["query"]])
+            running.remove(args["query"])
+            return f"result {args['query']}"
+        agent._execute_tool = fake_tool
+
+        events = []
+
+        async def callback(event, data):
+            if event != "token":
+                events.append((event, data["id"]))
+
+        started = time.perf_counter()
+        with patch.object(config, "TOOL_CALL_CONCURRENCY", 2):
+            self.assertEqual(asyncio.run(agent.run("q", callback=callback)), "Done")
+        elapsed = time.perf_counter() - started
+
+        # slow (0.4 s) runs alongside medium then fast; sequentially it would be 0.7 s
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(
+            [(m["tool_call_id"], m["content"]) for m in agent.history if m["role"] == "tool"],
+            [(f"call_{name}", f"result {name}") for name in delays]
+        )
+        self.assertEqual(agent.current_contexts, [f"result {name}" for name in delays])
+        for name in delays:
+            self.assertLess(events.index(("tool_start", f"call_{name}")), events.index(("tool_end", f"call_{name}")))
+        self.assertEqual(len(events), 6)
+
+if __name__ == "__main__":
+    unittest.main()
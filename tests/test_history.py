@@ -0,0 +1,105 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from src import registry, agent as agent_module
+from src.agent import Agent
+from src.history import HistoryManager, SUMMARY_HEADER, prompt_tokens
+from tests.test_streaming import fake_stream, answer_chunks
+
+SYSTEM = {"role": "system", "content": "You are DevMind."}
+
+def turn(i, tool_words=300):
+    """A finished turn with one retrieval call and its long result."""
+    result = f"[Source: guide{i}.md]\n" + " ".join(f"detail{i}" for _ in range(tool_words))
+    return [
+        {"role": "user", "content": f"Question {i}?"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": f"call{i}", "type": "function", "function": {"name": "retrieve_knowledge", "arguments": f'{{"query": "q{i}"}}'}}
+        ]},
+        {"tool_call_id": f"call{i}", "role": "tool", "name": "retrieve_knowledge", "content": result},
+        {"role": "assistant", "content": f"Answer {i}."}
+    ]
+
+class TestHistoryManager(unittest.TestCase):
+
+    def setUp(self):
+        self.history = [SYSTEM] + turn(0) + turn(1) + turn(2)[:3]
+
+    def test_tool_outputs_are_compacted_first(self):
+        """Сначала сокращаются старые результаты инструментов, последний обмен не меняется."""
+        budget = prompt_tokens(self.history) - 300
+        compacted = HistoryManager(budget_tokens=budget, tool_output_tokens=20).compact(self.history)
+
+        self.assertLessEqual(prompt_tokens(compacted), budget)
+        self.assertEqual(len(compacted), len(self.history))
+        self.assertEqual(compacted[0], SYSTEM)
+        self.assertTrue(compacted[3]["content"].startswith("[Compacted retrieve_knowledge output"))
+        self.assertIn("[Source: guide0.md]", compacted[3]["content"])
+        # Only as much as needed: the second turn still has its full result
+        self.assertEqual(compacted[7], self.history[7])
+        self.assertEqual(compacted[-3:], self.history[-3:])
+        # The history is not modified in place
+        self.assertFalse(self.history[3]["content"].startswith("[Compacted"))
+
+    def test_old_turns_are_summarized(self):
+        """Затем старые ходы сворачиваются в сводку, пары вызов-результат не разрываются."""
+        budget = prompt_tokens(self.history[-3:]) + 120
+        manager = HistoryManager(budget_tokens=budget, tool_output_tokens=20)
+        compacted = manager.compact(self.history)
+
+        self.assertLessEqual(prompt_tokens(compacted), budget)
+        self.assertEqual(compacted[0], SYSTEM)
+        self.assertTrue(compacted[1]["content"].startswith(SUMMARY_HEADER))
+        self.assertIn("- User: Question 0? | Tools: retrieve_knowledge | Answer: Answer 0.", compacted[1]["content"])
+        self.assertEqual(compacted[-3:], self.history[-3:])
+        tool_ids = {m["tool_call_id"] for m in compacted if m["role"] == "tool"}
+        call_ids = {c["id"] for m in compacted for c in m.get("tool_calls") or []}
+        self.assertEqual(tool_ids, call_ids)
+
+        # Later turns join the existing summary
+        longer = compacted + [{"role": "assistant", "content": "Answer 2."}] + turn(3)[:3]
+        again = manager.compact(longer)
+        self.assertEqual(sum(1 for m in again if m["content"] and m["content"].startswith(SUMMARY_HEADER)), 1)
+        self.assertIn("Answer 2.", again[1]["content"])
+        self.assertEqual(again[-3:], longer[-3:])
+
+    def test_within_budget_is_unchanged(self):
+        """История в пределах бюджета (или с бюджетом 0) не меняется."""
+        self.assertIs(HistoryManager(budget_tokens=100000).compact(self.history), self.history)
+        self.assertIs(HistoryManager(budget_tokens=0).compact(self.history), self.history)
+
+class TestAgentHistory(unittest.TestCase):
+
+    def setUp(self):
+        registry.clear()
+        agent_module._llm_clients.clear()
+
+    def tearDown(self):
+        registry.clear()
+        agent_module._llm_clients.clear()
+
+    @patch("src.agent.AsyncOpenAI")
+    @patch("src.agent.ToolSet")
+    def test_step_prompt_tokens(self, mock_toolset, mock_openai):
+        """Агент сжимает историю перед запросом и сохраняет число токенов промпта на каждом шаге."""
+        sent = []
+
+        async def create(messages, **kwargs):
+            sent.append(prompt_tokens(messages))
+            usage = SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=321))
+            return fake_stream(answer_chunks("Fine.") + [usage])
+
+        mock_openai.return_value.chat.completions.create.side_effect = create
+        agent = Agent(system_prompt=SYSTEM["content"])
+        agent.tracker = MagicMock()
+        agent.history_manager = HistoryManager(budget_tokens=200, tool_output_tokens=20)
+        agent.history += turn(0) + turn(1)
+
+        self.assertEqual(asyncio.run(agent.run("Next question?")), "Fine.")
+        self.assertLessEqual(sent[0], 200)
+        self.assertEqual(agent.step_tokens, [{"step": 1, "estimated": sent[0], "reported": 321}])
+        self.assertEqual(agent.history[-2:], [{"role": "user", "content": "Next question?"}, {"role": "assistant", "content": "Fine."}])
+
+if __name__ == "__main__":
+    unittest.main()
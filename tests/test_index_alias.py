@@ -0,0 +1,106 @@
+import unittest
+import os
+import json
+import shutil
+import chromadb
+from unittest.mock import patch
+from src import ingestion
+from src.config import config
+from src.index_alias import COLLECTION_NAME, live_collection_name, manifest_path
+from src.ingestion import IngestionPipeline, open_collection, finish_run
+from src.manifest import MANIFEST_VERSION
+
+def fake_embeddings(texts, model=None):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+class TestBlueGreenRebuild(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_index_alias"
+        self.docs_dir = os.path.join(self.test_dir, "docs")
+        os.makedirs(self.docs_dir, exist_ok=True)
+        for i in range(3):
+            with open(os.path.join(self.docs_dir, f"doc{i}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# Doc {i}\n\nContent number {i} " + "word " * (10 * (i + 1)))
+
+        self.client = chromadb.EphemeralClient()
+        self.patches = [
+            patch.object(config, "INDEX_ALIAS_PATH", os.path.join(self.test_dir, "alias.json")),
+            patch.object(config, "INGEST_MANIFEST_PATH", os.path.join(self.test_dir, "manifest.json")),
+            patch.object(config, "INDEX_KEEP_GENERATIONS", 1),
+            patch.object(ingestion, "cached_embeddings", side_effect=fake_embeddings)
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        for collection in self.client.list_collections():
+            name = collection if isinstance(collection, str) else collection.name
+            if name.startswith(COLLECTION_NAME):
+                self.client.delete_collection(name=name)
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _index(self, full: bool = False, stop: bool = False):
+        client, collection, manifest = open_collection(full=full, model="test-model", client=self.client)
+        pipeline = IngestionPipeline(collection, manifest, model="test-model", workers=0)
+        if stop:
+            pipeline.stop_event.set()
+        pipeline.run(ingestion.scan_documents(self.docs_dir))
+        return collection, finish_run(client, collection, manifest, completed=not stop)
+
+    def test_rebuild_goes_live_only_after_swap(self):
+        """Полная переиндексация строится рядом и подменяет живой индекс атомарно."""
+        first, live = self._index()
+        self.assertEqual(live.name, COLLECTION_NAME)
+        served = first.count()
+
+        client, shadow, manifest = open_collection(full=True, model="test-model", client=self.client)
+        self.assertNotEqual(shadow.name, COLLECTION_NAME)
+        IngestionPipeline(shadow, manifest, model="test-model", workers=0).run(ingestion.scan_documents(self.docs_dir))
+        # Queries still go to the old generation, which is untouched
+        self.assertEqual(live_collection_name(), COLLECTION_NAME)
+        self.assertEqual(self.client.get_collection(COLLECTION_NAME).count(), served)
+
+        live = finish_run(client, shadow, manifest, completed=True)
+        self.assertEqual(live.name, shadow.name)
+        self.assertEqual(live_collection_name(), shadow.name)
+        self.assertTrue(os.path.exists(manifest_path(shadow.name)))
+
+    def test_old_generations_are_collected(self):
+        """Хранится только одно предыдущее поколение."""
+        self._index()
+        _, second = self._index(full=True)
+        _, third = self._index(full=True)
+        names = {c if isinstance(c, str) else c.name for c in self.client.list_collections()}
+        self.assertIn(third.name, names)
+        self.assertIn(second.name, names)
+        self.assertNotIn(COLLECTION_NAME, names)
+
+    def test_unfinished_rebuild_is_discarded(self):
+        """Прерванная пересборка не публикуется и удаляется."""
+        self._index()
+        shadow, live = self._index(full=True, stop=True)
+        self.assertEqual(live.name, COLLECTION_NAME)
+        self.assertEqual(live_collection_name(), COLLECTION_NAME)
+        names = {c if isinstance(c, str) else c.name for c in self.client.list_collections()}
+        self.assertNotIn(shadow.name, names)
+
+    def test_outdated_manifest_forces_rebuild(self):
+        """Коллекция со старой версией манифеста (векторы /api/embeddings) пересобирается."""
+        self._index()
+        path = manifest_path(COLLECTION_NAME)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data["version"] = MANIFEST_VERSION - 1
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+        _, collection, manifest = open_collection(model="test-model", client=self.client)
+        self.assertNotEqual(collection.name, COLLECTION_NAME)
+        self.assertEqual(manifest.files, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+import os
+import shutil
+import threading
+import chromadb
+from unittest.mock import patch
+from src import ingestion
+from src.ingestion import IngestionPipeline
+from src.config import config
+from src.context import ContextAssembler
+from src.manifest import IngestManifest
+from src.scope import build_where
+from tests.test_loaders import write_pdf
+
+def fake_embeddings(texts, model=None):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+class TestIngestionPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_ingestion"
+        self.docs_dir = os.path.join(self.test_dir, "docs")
+        os.makedirs(self.docs_dir, exist_ok=True)
+        for i in range(5):
+            with open(os.path.join(self.docs_dir, f"doc{i}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# Doc {i}\n\n" + "\n\n".join(f"## Part {j}\n" + "text " * 50 for j in range(4)))
+
+        client = chromadb.EphemeralClient()
+        self.collection = client.get_or_create_collection(name="test_ingestion")
+        self.manifest = IngestManifest(os.path.join(self.test_dir, "manifest.json"))
+        self.manifest.reset("test-model")
+
+    def tearDown(self):
+        chromadb.EphemeralClient().delete_collection(name="test_ingestion")
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _run(self, **options):
+        files = ingestion.scan_documents(self.docs_dir)
+        options.setdefault("workers", 0)
+        pipeline = IngestionPipeline(
+            self.collection, self.manifest, model="test-model", upsert_batch_size=8, **options
+        )
+        with patch.object(ingestion, "cached_embeddings", side_effect=fake_embeddings) as mock_embed:
+            stats = pipeline.run(files)
+        return stats, mock_embed
+
+    def test_pipeline_indexes_all_files(self):
+        """Все файлы проходят через стадии и попадают в коллекцию."""
+        stats, _ = self._run(batch_size=3, concurrency=2)
+        self.assertEqual(stats["updated"], 5)
+        self.assertEqual(self.collection.count(), stats["embedded"])
+        self.assertGreater(stats["embedded"], 0)
+
+    def test_second_run_skips_unchanged(self):
+        """Повторный запуск ничего не эмбеддит."""
+        self._run()
+        stats, mock_embed = self._run()
+        self.assertEqual(stats["skipped"], 5)
+        mock_embed.assert_not_called()
+
+    def test_failed_batch_does_not_block_other_files(self):
+        """Ошибка эмбеддинга одного файла не мешает остальным."""
+        files = ingestion.scan_documents(self.docs_dir)
+        pipeline = IngestionPipeline(self.collection, self.manifest, model="test-model", workers=0, max_retries=1, batch_size=1)
+
+        def flaky(texts, model=None):
+            if any("Doc 0" in text for text in texts):
+                raise ConnectionError("Ollama down")
+            return fake_embeddings(texts)
+
+        with patch.object(ingestion, "cached_embeddings", side_effect=flaky):
+            pipeline.run(files)
+
+        sources = {m["source"] for m in self.collection.get()["metadatas"]}
+        self.assertEqual(len(sources), 5)
+        doc0 = [s for s in sources if s.endswith("doc0.md")][0]
+        self.assertIsNone(self.manifest.get(doc0)["file_hash"])
+
+    def test_writer_error_is_raised_from_run(self):
+        """Ошибка в потоке записи останавливает конвейер и пробрасывается из run(), а не вешает его."""
+        files = ingestion.scan_documents(self.docs_dir)
+        pipeline = IngestionPipeline(
+            self.collection, self.manifest, model="test-model", workers=0, queue_size=1, upsert_batch_size=1
+        )
+        errors = []
+
+        def run():
+            try:
+                pipeline.run(files)
+            except OSError as e:
+                errors.append(e)
+
+        with patch.object(ingestion, "cached_embeddings", side_effect=fake_embeddings), \
+                patch.object(self.manifest, "update", side_effect=OSError("disk full")):
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            thread.join(timeout=30)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([str(e) for e in errors], ["disk full"])
+        self.assertTrue(pipeline.stop_event.is_set())
+
+    def test_verify_compares_raw_vectors(self):
+        """Проверка сравнивает сами векторы: тот же вектор в другом масштабе не проходит."""
+        vector = [0.6, 0.8, 0.0]
+        with patch.object(ingestion, "get_ollama_embedding", return_value=[0.6, 0.8, 0.0]):
+            self.assertTrue(ingestion.verify_embeddings("text", vector, "test-model"))
+        with patch.object(ingestion, "get_ollama_embedding", return_value=[6.0, 8.0, 0.0]):
+            self.assertFalse(ingestion.verify_embeddings("text", vector, "test-model"))
+
+    def test_near_duplicates_stored_once(self):
+        """Общий шаблонный текст хранится один раз со списком источников."""
+        shutil.rmtree(self.docs_dir)
+        os.makedirs(self.docs_dir)
+        boilerplate = "## License\n\n" + " ".join(f"clause{i} of the shared license text" for i in range(30))
+        for name in ("a", "b"):
+            with open(os.path.join(self.docs_dir, f"{name}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# Guide {name}\n\n" + f"unique {name} content " * 40 + "\n\n" + boilerplate)
+
+        stats, _ = self._run(dedup=True)
+        self.assertEqual(stats["deduplicated"], 1)
+        shared = [m for m in self.collection.get()["metadatas"] if len(m["sources"]) > 1]
+        self.assertEqual(len(shared), 1)
+        self.assertEqual(len(shared[0]["sources"]), 2)
+
+        # The chunk outlives the file that stored it while another file refers to it
+        owner = shared[0]["source"]
+        pipeline = IngestionPipeline(self.collection, self.manifest, model="test-model", workers=0)
+        pipeline.remove_sources([owner])
+        remaining = [m for m in self.collection.get()["metadatas"] if "License" in m["heading_path"]]
+        self.assertEqual(len(remaining), 1)
+        self.assertNotEqual(remaining[0]["source"], owner)
+        # Its position was in the removed file, so it is no longer stitched to neighbours
+        self.assertNotIn("chunk_index", remaining[0])
+        shared = self.collection.get(where={"sources": {"$contains": remaining[0]["source"]}})
+        hits = [hit for hit in zip(shared["ids"], shared["documents"], shared["metadatas"]) if "License" in hit[2]["heading_path"]]
+        context, _ = ContextAssembler(self.collection, budget_tokens=10000, neighbors=1).assemble(hits)
+        self.assertEqual(context.split("\n", 1)[1], hits[0][1])
+
+        pipeline.remove_sources([remaining[0]["source"]])
+        self.assertEqual(self.collection.count(), 0)
+
+    def test_scope_finds_shared_chunk_through_every_file(self):
+        """Дедуплицированный чанк находится по пути и тегам каждого файла, где он встречается."""
+        shutil.rmtree(self.docs_dir)
+        boilerplate = "## License\n\n" + " ".join(f"clause{i} of the shared license text" for i in range(30))
+        for directory in ("kafka", "redis"):
+            os.makedirs(os.path.join(self.docs_dir, directory))
+            with open(os.path.join(self.docs_dir, directory, "guide.md"), "w", encoding="utf-8") as f:
+                f.write(f"# Guide {directory}\n\n" + f"unique {directory} content " * 40 + "\n\n" + boilerplate)
+
+        with patch.object(config, "DOCS_SOURCE_PATH", self.docs_dir):
+            stats, _ = self._run(dedup=True)
+            self.assertEqual(stats["deduplicated"], 1)
+            sources = ingestion.scan_documents(self.docs_dir)
+            for scope in [{"tags": ["kafka"]}, {"tags": ["redis"]}] + [{"sources": [source]} for source in sources]:
+                found = self.collection.get(where=build_where(**scope))["metadatas"]
+                self.assertEqual(sum("License" in m["heading_path"] for m in found), 1, scope)
+
+            # Once a file is gone, its tags no longer reach the shared chunk
+            owner = next(m for m in self.collection.get()["metadatas"] if len(m["sources"]) > 1)["source"]
+            IngestionPipeline(self.collection, self.manifest, model="test-model", workers=0).remove_sources([owner])
+            shared = [m for m in self.collection.get()["metadatas"] if "License" in m["heading_path"]]
+            self.assertEqual(shared[0]["tags"], [os.path.basename(os.path.dirname(shared[0]["source"]))])
+
+    def test_large_file_is_embedded_in_parts(self):
+        """Чанки файла уходят на эмбеддинг частями, но индекс тот же, что и при одной части."""
+        whole, _ = self._run(part_size=1000)
+        ids = {source: self.manifest.chunk_ids(source) for source in self.manifest.files}
+        self.manifest.reset("test-model")
+        self.collection.delete(ids=self.collection.get()["ids"])
+
+        # A worker process reads the files and puts their parts on the shared queue
+        stats, mock_embed = self._run(part_size=2, batch_size=100, workers=1)
+        self.assertEqual(stats["embedded"], whole["embedded"])
+        self.assertTrue(all(len(call.args[0]) <= 2 for call in mock_embed.call_args_list))
+        self.assertEqual({source: self.manifest.chunk_ids(source) for source in self.manifest.files}, ids)
+        for source in ids:
+            metadatas = self.collection.get(where={"source": source})["metadatas"]
+            self.assertEqual(sorted(m["chunk_index"] for m in metadatas), list(range(len(ids[source]))))
+
+    def test_pdf_and_txt_are_indexed(self):
+        """PDF и .txt индексируются, у PDF в метаданных есть номер страницы."""
+        write_pdf(os.path.join(self.docs_dir, "manual.pdf"), ["First page", "Second page"])
+        with open(os.path.join(self.docs_dir, "notes.txt"), "w", encoding="utf-8") as f:
+            f.write("plain text notes")
+
+        stats, _ = self._run()
+        self.assertEqual(stats["updated"], 7)
+        metadatas = self.collection.get(where={"doc_type": "pdf"})["metadatas"]
+        self.assertEqual(sorted(m["page"] for m in metadatas), [1, 2])
+        self.assertEqual(len(self.collection.get(where={"doc_type": "txt"})["ids"]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
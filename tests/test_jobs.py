@@ -0,0 +1,92 @@
+import unittest
+import os
+import time
+import shutil
+import chromadb
+from unittest.mock import patch
+from src import ingestion
+from src.config import config
+from src.jobs import IngestionJob
+
+def fake_embeddings(texts, model=None):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+class TestIngestionJob(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_jobs"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.files = []
+        for i in range(3):
+            path = os.path.join(self.test_dir, f"doc{i}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"# Doc {i}\n\nSome content {i}.")
+            self.files.append(path)
+
+        self.client = chromadb.EphemeralClient()
+        self.patches = [
+            patch.object(config, "INGEST_MANIFEST_PATH", os.path.join(self.test_dir, "manifest.json")),
+            patch.object(config, "LEXICAL_INDEX_DIR", os.path.join(self.test_dir, "lexical")),
+            patch.object(ingestion, "cached_embeddings", side_effect=fake_embeddings)
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.client.delete_collection(name=ingestion.COLLECTION_NAME)
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _wait(self, job):
+        deadline = time.time() + 10
+        while job.running and time.time() < deadline:
+            time.sleep(0.05)
+
+    def test_job_indexes_only_given_files(self):
+        """Задача индексирует только переданные файлы и сообщает прогресс."""
+        job = IngestionJob(files=self.files[:2] + ["image.png"], embedding_model="test-model", client=self.client)
+        job.start()
+        self._wait(job)
+
+        snap = job.snapshot()
+        self.assertEqual(snap["status"], "completed")
+        self.assertEqual((snap["done"], snap["total"]), (2, 2))
+        self.assertEqual(snap["progress"], 1.0)
+        sources = {m["source"] for m in job.collection.get()["metadatas"]}
+        self.assertEqual(sources, set(self.files[:2]))
+
+    def test_cancel_before_start(self):
+        """Отменённая задача не обрабатывает файлы."""
+        job = IngestionJob(files=self.files, embedding_model="test-model", client=self.client)
+        job.cancel()
+        job.start()
+        self._wait(job)
+        self.assertEqual(job.snapshot()["status"], "cancelled")
+        self.assertEqual(job.collection.count(), 0)
+
+    def test_rebuild_indexes_whole_knowledge_base(self):
+        """Если загрузка требует новой генерации индекса, индексируется вся база знаний, а не только загруженные файлы."""
+        with patch.object(config, "DOCS_SOURCE_PATH", self.test_dir), \
+             patch.object(config, "INDEX_ALIAS_PATH", os.path.join(self.test_dir, "alias.json")):
+            first = IngestionJob(embedding_model="test-model", client=self.client).start()
+            self._wait(first)
+            self.assertEqual(first.snapshot()["status"], "completed")
+
+            # Another embedding model forces a rebuild
+            upload = os.path.join(self.test_dir, "upload.md")
+            with open(upload, "w", encoding="utf-8") as f:
+                f.write("# Upload\n\nUploaded content.")
+            job = IngestionJob(files=[upload], embedding_model="other-model", client=self.client).start()
+            self._wait(job)
+
+            snap = job.snapshot()
+            self.assertEqual(snap["status"], "completed")
+            self.assertNotEqual(job.collection.name, ingestion.COLLECTION_NAME)
+            sources = {m["source"] for m in job.collection.get()["metadatas"]}
+            self.assertEqual({os.path.basename(s) for s in sources}, {"doc0.md", "doc1.md", "doc2.md", "upload.md"})
+            self.client.delete_collection(name=job.collection.name)
+
+if __name__ == "__main__":
+    unittest.main()
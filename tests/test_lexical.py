@@ -0,0 +1,115 @@
+import unittest
+import os
+import shutil
+import chromadb
+from unittest.mock import patch
+from src import ingestion
+from src.config import config
+from src.lexical import LexicalIndex, tokenize, reciprocal_rank_fusion
+
+def fake_embeddings(texts, model=None):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_lexical"
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_identifiers_are_searchable(self):
+        """Идентификаторы и коды ошибок находятся целиком и по частям."""
+        self.assertIn("get_ollama_embedding", tokenize("call get_ollama_embedding()"))
+        self.assertIn("ollama", tokenize("call get_ollama_embedding()"))
+
+        index = LexicalIndex(self.test_dir)
+        index.add("a", "Error E1234 means the proxy rejected the request.")
+        index.add("b", "Set CHROMA_DB_PATH to move the database.")
+        index.add("c", "General notes about the proxy and the database.")
+        index.commit()
+
+        self.assertEqual(index.search("E1234")[0][0], "a")
+        self.assertEqual(index.search("CHROMA_DB_PATH")[0][0], "b")
+        # A fresh reader sees the committed segment
+        self.assertEqual(LexicalIndex(self.test_dir).doc_count(), 3)
+
+    def test_delete_and_merge(self):
+        """Удалённые чанки не находятся и вычищаются при слиянии сегментов."""
+        index = LexicalIndex(self.test_dir)
+        for i in range(5):
+            index.add(f"doc{i}", f"shared words plus token{i}")
+            index.commit()
+        index.delete(["doc1", "doc2"])
+        index.commit()
+
+        found = [chunk_id for chunk_id, _ in index.search("shared words", k=10)]
+        self.assertEqual(sorted(found), ["doc0", "doc3", "doc4"])
+        self.assertEqual(len(index.segments), 1)
+        self.assertEqual(index.doc_count(), 3)
+
+    def test_deleted_chunk_can_come_back(self):
+        """Чанк с тем же ID, добавленный после удаления, снова находится; удалённая копия остаётся скрытой."""
+        index = LexicalIndex(self.test_dir)
+        for i in range(10):
+            index.add(f"doc{i}", f"common text number{i}")
+        index.add("restored", "kafka consumer timeout")
+        index.commit()
+
+        index.delete(["restored"])
+        index.commit()
+        self.assertEqual(index.search("kafka"), [])
+        self.assertEqual(index.doc_count(), 10)
+
+        # Same content-addressed ID, e.g. a reverted edit
+        index.add("restored", "kafka consumer timeout")
+        index.commit()
+        found = [chunk_id for chunk_id, _ in index.search("kafka", k=10)]
+        self.assertEqual(found, ["restored"])
+        self.assertEqual(index.doc_count(), 11)
+        # A fresh reader agrees, and the next merge keeps only the new copy
+        self.assertEqual(LexicalIndex(self.test_dir).doc_count(), 11)
+        with patch.object(config, "LEXICAL_MAX_SEGMENTS", 1):
+            index.add("doc10", "common text number10")
+            index.commit()
+        self.assertEqual(len(index.segments), 1)
+        self.assertEqual(index.total_docs, 12)
+        self.assertEqual([chunk_id for chunk_id, _ in index.search("kafka", k=10)], ["restored"])
+
+    def test_reciprocal_rank_fusion(self):
+        """Документ из обоих списков поднимается выше."""
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["d", "c"]], k=60)
+        self.assertEqual(fused[0], "c")
+        self.assertEqual(set(fused), {"a", "b", "c", "d"})
+
+    def test_pipeline_keeps_index_in_step(self):
+        """Пайплайн индексации добавляет и удаляет чанки в лексическом индексе."""
+        docs_dir = os.path.join(self.test_dir, "docs")
+        os.makedirs(docs_dir)
+        path = os.path.join(docs_dir, "errors.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# Errors\n\nE4711 is raised when the cache is full.")
+
+        client = chromadb.EphemeralClient()
+        collection = client.get_or_create_collection(name="test_lexical_docs")
+        manifest = ingestion.IngestManifest(os.path.join(self.test_dir, "manifest.json"))
+        lexical = LexicalIndex(os.path.join(self.test_dir, "index"))
+        try:
+            with patch.object(ingestion, "cached_embeddings", side_effect=fake_embeddings):
+                pipeline = ingestion.IngestionPipeline(
+                    collection, manifest, model="test-model", workers=0, lexical_index=lexical
+                )
+                pipeline.run([path])
+                self.assertEqual(lexical.doc_count(), collection.count())
+                self.assertEqual(lexical.search("E4711")[0][0], collection.get()["ids"][0])
+
+                pipeline.remove_sources([path])
+                lexical.commit()
+                self.assertEqual(lexical.search("E4711"), [])
+        finally:
+            client.delete_collection(name="test_lexical_docs")
+
+if __name__ == "__main__":
+    unittest.main()
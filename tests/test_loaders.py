@@ -0,0 +1,71 @@
+import unittest
+import os
+import shutil
+from src.loaders import load_chunks, iter_pdf_pages
+
+def write_pdf(path: str, pages: list[str]):
+    """Пишет минимальный PDF с одной строкой текста на странице."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(data)
+
+class TestLoaders(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_loaders"
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_pdf_pages_keep_numbers(self):
+        """PDF читается постранично, номер страницы попадает в чанк."""
+        path = os.path.join(self.test_dir, "manual.pdf")
+        write_pdf(path, ["Install the agent", "Configure the proxy", "Troubleshooting"])
+
+        pages = list(iter_pdf_pages(path))
+        self.assertEqual([number for number, _ in pages], [1, 2, 3])
+
+        chunks = list(load_chunks(path))
+        self.assertEqual([chunk.page for chunk in chunks], [1, 2, 3])
+        self.assertIn("Configure the proxy", chunks[1].text)
+
+    def test_txt_tolerates_bad_bytes(self):
+        """Текстовый файл с битой кодировкой всё равно индексируется."""
+        path = os.path.join(self.test_dir, "notes.txt")
+        with open(path, "wb") as f:
+            f.write(b"plain notes \xff here\n\nsecond paragraph\n")
+
+        chunks = list(load_chunks(path))
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("second paragraph", chunks[0].text)
+        self.assertIsNone(chunks[0].page)
+
+    def test_unsupported_extension(self):
+        """Неизвестный формат отклоняется явно."""
+        with self.assertRaises(ValueError):
+            load_chunks("image.png")
+
+if __name__ == "__main__":
+    unittest.main()
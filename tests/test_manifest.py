@@ -0,0 +1,74 @@
+import unittest
+import os
+import shutil
+from src.manifest import IngestManifest, hash_text, make_chunk_ids
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_manifest"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.path = os.path.join(self.test_dir, "manifest.json")
+        self.doc_path = os.path.join(self.test_dir, "doc.md")
+        with open(self.doc_path, "w", encoding="utf-8") as f:
+            f.write("# Doc")
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_chunk_ids_stable_on_insert(self):
+        """ID чанка не зависит от его позиции в файле."""
+        hashes = [hash_text("a"), hash_text("b")]
+        before = make_chunk_ids("doc.md", hashes)
+        after = make_chunk_ids("doc.md", [hash_text("new")] + hashes)
+        self.assertEqual(before, after[1:])
+
+    def test_duplicate_chunks_get_unique_ids(self):
+        """Повторяющиеся чанки получают разные ID."""
+        ids = make_chunk_ids("doc.md", [hash_text("a"), hash_text("a")])
+        self.assertEqual(len(set(ids)), 2)
+
+    def test_roundtrip(self):
+        """Манифест сохраняется и загружается без потерь."""
+        stat = os.stat(self.doc_path)
+        manifest = IngestManifest(self.path)
+        self.assertFalse(manifest.exists)
+        manifest.reset("nomic-embed-text")
+        manifest.update(self.doc_path, stat, "hash", ["id1"], ["h1"])
+        manifest.save()
+
+        loaded = IngestManifest(self.path)
+        self.assertTrue(loaded.exists)
+        self.assertEqual(loaded.embedding_model, "nomic-embed-text")
+        self.assertEqual(loaded.chunk_ids(self.doc_path), ["id1"])
+        self.assertTrue(loaded.is_unchanged(self.doc_path, stat))
+        self.assertEqual(loaded.remove(self.doc_path), ["id1"])
+        self.assertIsNone(loaded.get(self.doc_path))
+
+    def test_failed_file_is_not_unchanged(self):
+        """Файл с неудачными чанками (без хеша) проверяется повторно."""
+        stat = os.stat(self.doc_path)
+        manifest = IngestManifest(self.path)
+        manifest.update(self.doc_path, stat, None, [], [])
+        self.assertFalse(manifest.is_unchanged(self.doc_path, stat))
+
+    def test_shared_chunk_references(self):
+        """Ссылки на общий чанк переживают перезагрузку, владелец идёт первым."""
+        stat = os.stat(self.doc_path)
+        manifest = IngestManifest(self.path)
+        manifest.reset("nomic-embed-text")
+        manifest.update("b.md", stat, "hb", [], [], duplicates={"shared": "sig"})
+        manifest.update("a.md", stat, "ha", ["shared"], ["h"], ["sig"])
+        manifest.save()
+
+        loaded = IngestManifest(self.path)
+        self.assertEqual(loaded.sources_of("shared"), ["a.md", "b.md"])
+        self.assertEqual(dict(loaded.signatures()), {"shared": "sig"})
+        loaded.remove("a.md")
+        self.assertEqual(loaded.sources_of("shared"), ["b.md"])
+        loaded.remove("b.md")
+        self.assertEqual(loaded.sources_of("shared"), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,9 +21,9 @@ class TestPhase3(unittest.TestCase):
         if os.path.exists(os.environ["CHROMA_DB_PATH"]):
             shutil.rmtree(os.environ["CHROMA_DB_PATH"])
 
-    @patch("src.tools.chromadb.PersistentClient")
+    @patch("src.tools.get_vector_client")
     @patch("src.tools.CrossEncoder")
-    def test_toolset_initialization(self, mock_reranker, mock_chroma):
+    def test_toolset_initialization(self, mock_reranker, mock_vector_client):
         """Проверка инициализации ToolSet."""
         tools = ToolSet()
         self.assertIsNotNone(tools.chroma_client)
@@ -45,8 +45,8 @@ class TestPhase3(unittest.TestCase):
 
     def test_save_solution(self):
         """Проверка сохранения файла."""
-        # Патчим CrossEncoder и ChromaClient чтобы не грузить их реально
-        with patch("src.tools.chromadb.PersistentClient"), \
+        # Патчим CrossEncoder и клиент векторного хранилища, чтобы не грузить их реально
+        with patch("src.tools.get_vector_client"), \
              patch("src.tools.CrossEncoder"):
             
             tools = ToolSet()
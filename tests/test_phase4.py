@@ -1,10 +1,13 @@
 import unittest
 import os
 import json
+import asyncio
 import shutil
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
+from src import registry, agent as agent_module
 from src.agent import Agent
 from src.tracker import RagasTracker
+from tests.test_streaming import fake_stream, answer_chunks
 
 class TestPhase4(unittest.TestCase):
     
@@ -12,8 +15,13 @@ class TestPhase4(unittest.TestCase):
         os.environ["OLLAMA_BASE_URL"] = "http://mock-url"
         os.environ["LLM_MODEL"] = "mock-model"
         self.test_log_file = "data/test_evaluation/dataset.jsonl"
+        # Модели и клиенты общие для процесса, тест должен получить свои моки
+        registry.clear()
+        agent_module._llm_clients.clear()
         
     def tearDown(self):
+        registry.clear()
+        agent_module._llm_clients.clear()
         if os.path.exists(os.path.dirname(self.test_log_file)):
             shutil.rmtree(os.path.dirname(self.test_log_file))
 
@@ -30,24 +38,23 @@ class TestPhase4(unittest.TestCase):
             self.assertEqual(data["answer"], "A")
             self.assertEqual(data["contexts"], ["C1", "C2"])
 
-    @patch("src.agent.OpenAI")
+    @patch("src.agent.AsyncOpenAI")
     @patch("src.agent.ToolSet")
     def test_agent_run_simple(self, mock_toolset, mock_openai):
         """Проверка простого ответа агента без инструментов."""
-        # Мокаем ответ OpenAI
-        mock_client = mock_openai.return_value
-        mock_response = MagicMock()
-        mock_response.choices[0].message.tool_calls = None
-        mock_response.choices[0].message.content = "Hello, User!"
-        mock_client.chat.completions.create.return_value = mock_response
-        
+        # Мокаем потоковый ответ OpenAI
+        async def create(**kwargs):
+            return fake_stream(answer_chunks("Hello, User!"))
+
+        mock_openai.return_value.chat.completions.create.side_effect = create
+
         agent = Agent()
         # Подменяем трекер на тестовый
         agent.tracker = RagasTracker(log_file=self.test_log_file)
-        
-        response = agent.run("Hi")
+
+        response = asyncio.run(agent.run("Hi"))
         self.assertEqual(response, "Hello, User!")
-        
+
         # Проверяем что лог записался
         self.assertTrue(os.path.exists(self.test_log_file))
 
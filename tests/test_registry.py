@@ -0,0 +1,77 @@
+import unittest
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from src import registry
+from src.agent import Agent
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        registry.clear()
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_resource_is_built_once(self):
+        """Одновременные первые обращения загружают ресурс один раз."""
+        builds = []
+        started = threading.Event()
+
+        def factory():
+            started.wait(1)
+            builds.append(1)
+            return object()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(registry.get_or_create, ("model", "m1"), factory) for _ in range(8)]
+            started.set()
+            resources = {id(future.result()) for future in futures}
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(len(resources), 1)
+        self.assertIn(("model", "m1"), registry.loaded())
+
+    def test_failed_load_is_retried(self):
+        """Неудачная загрузка (None) не запоминается."""
+        self.assertIsNone(registry.get_or_create(("model", "m2"), lambda: None))
+        self.assertEqual(registry.get_or_create(("model", "m2"), lambda: "loaded"), "loaded")
+
+    @patch("src.reranker.load_cross_encoder", side_effect=lambda encoder_cls, **kwargs: encoder_cls())
+    def test_reranker_is_shared_per_encoder_class(self, mock_load):
+        """Реранкер кэшируется отдельно для каждого класса энкодера."""
+        first_cls, second_cls = MagicMock(), MagicMock()
+        first = registry.get_reranker(first_cls)
+        self.assertIs(registry.get_reranker(first_cls), first)
+        second = registry.get_reranker(second_cls)
+        self.assertIsNot(second, first)
+        self.assertIs(second.encoder, second_cls.return_value)
+        self.assertEqual(mock_load.call_count, 2)
+
+    @patch("src.agent.AsyncOpenAI")
+    @patch("src.agent.ToolSet")
+    def test_agents_share_models_not_history(self, mock_toolset, mock_openai):
+        """Агенты разных сессий делят модели и клиенты, но не историю диалога."""
+        mock_toolset.side_effect = lambda **kwargs: MagicMock()
+        first = Agent()
+        second = Agent(system_prompt="Custom prompt")
+        other_embedding = Agent(embedding_model="other-embedding")
+
+        self.assertIs(first.tools, second.tools)
+        self.assertIsNot(first.tools, other_embedding.tools)
+
+        async def clients():
+            return first.client, second.client
+
+        first_client, second_client = asyncio.run(clients())
+        self.assertIs(first_client, second_client)
+        self.assertEqual(mock_openai.call_count, 1)
+
+        first.history.append({"role": "user", "content": "Hi"})
+        self.assertEqual(len(second.history), 1)
+        first.reset()
+        self.assertEqual(first.history, [{"role": "system", "content": first.system_prompt}])
+
+if __name__ == "__main__":
+    unittest.main()
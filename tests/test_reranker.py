@@ -0,0 +1,51 @@
+import unittest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.reranker import BatchingReranker
+
+class FakeEncoder:
+    """Оценка пары — длина документа; первый вызов ждёт, пока накопятся запросы."""
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.release.wait(5)
+        self.calls.append(len(pairs))
+        return [float(len(doc)) for _, doc in pairs]
+
+class FailingEncoder:
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        raise RuntimeError("model crashed")
+
+class TestBatchingReranker(unittest.TestCase):
+
+    def test_concurrent_queries_share_batches(self):
+        """Параллельные запросы склеиваются в один батч, каждый получает свои оценки."""
+        encoder = FakeEncoder()
+        reranker = BatchingReranker(encoder, batch_size=8, max_pairs=100)
+        queries = [[["q", "x" * (i + j)] for j in range(3)] for i in range(6)]
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(reranker.predict, pairs) for pairs in queries]
+            # The first batch blocks in the encoder until the rest are queued
+            while reranker._queue.qsize() < 5:
+                pass
+            encoder.release.set()
+            results = [future.result() for future in futures]
+
+        for i, scores in enumerate(results):
+            self.assertEqual(scores, [float(i), float(i + 1), float(i + 2)])
+        self.assertEqual(encoder.calls, [3, 15])
+
+    def test_errors_reach_the_caller(self):
+        """Ошибка модели пробрасывается вызывающему, воркер продолжает работать."""
+        reranker = BatchingReranker(FailingEncoder())
+        with self.assertRaises(RuntimeError):
+            reranker.predict([["q", "doc"]])
+        with self.assertRaises(RuntimeError):
+            reranker.predict([["q", "doc"]])
+        self.assertEqual(reranker.predict([]), [])
+
+if __name__ == "__main__":
+    unittest.main()
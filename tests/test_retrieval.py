@@ -0,0 +1,146 @@
+import unittest
+import shutil
+import chromadb
+from unittest.mock import MagicMock, patch
+from src import tools
+from src.config import config
+from src.lexical import LexicalIndex, lexical_index_path
+from src.reranker import cascade_plan, select_by_score
+from src.tools import ToolSet
+
+DOCS = {
+    "proxy": "Set HTTP_PROXY before starting the agent.",
+    "cache": "The embedding cache lives in data/embedding_cache.sqlite3.",
+    "logs": "Logs are written to stdout by setup_logger.",
+}
+VECTORS = {"proxy": [1.0, 0.0, 0.0], "cache": [0.0, 1.0, 0.0], "logs": [0.0, 0.0, 1.0]}
+METADATAS = {
+    "proxy": {"source": "./data/knowledge_base/network/proxy.md", "doc_type": "md", "tags": ["network"]},
+    "cache": {"source": "./data/knowledge_base/storage/cache.pdf", "doc_type": "pdf", "page": 2, "tags": ["storage"]},
+    "logs": {"source": "./data/knowledge_base/logging.txt", "doc_type": "txt"},
+}
+for metadata in METADATAS.values():
+    metadata["sources"] = [metadata["source"]]
+
+def fake_embeddings(texts, model=None):
+    return [VECTORS["proxy"] if "proxy" in text else VECTORS["cache"] for text in texts]
+
+class TestMultiQueryRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        self.client = chromadb.EphemeralClient()
+        self.collection = self.client.get_or_create_collection(name="test_retrieval")
+        self.collection.add(
+            ids=list(DOCS),
+            documents=list(DOCS.values()),
+            embeddings=[VECTORS[k] for k in DOCS],
+            metadatas=[METADATAS[k] for k in DOCS]
+        )
+
+        self.toolset = ToolSet.__new__(ToolSet)
+        self.toolset.embedding_model = "test-model"
+        self.toolset.collection = self.collection
+        self.toolset.lexical_index = None
+        self.toolset.semantic_cache = None
+        self.toolset._alias_mtime = None
+        self.toolset._known_sources = (None, [])
+        self.toolset.reranker = MagicMock()
+        # Closest to the query wins: documents sharing a word with it score higher
+        self.toolset.reranker.predict.side_effect = lambda pairs: [
+            float(len(set(q.lower().split()) & set(d.lower().split()))) for q, d in pairs
+        ]
+
+    def tearDown(self):
+        self.client.delete_collection(name="test_retrieval")
+
+    def test_queries_share_one_round_trip(self):
+        """Несколько запросов: один батч эмбеддингов, один запрос к ChromaDB, один вызов реранкера."""
+        with patch.object(tools, "cached_embeddings", side_effect=fake_embeddings) as embed, \
+             patch.object(tools, "get_score_cache", return_value=None), \
+             patch.object(self.collection, "query", wraps=self.collection.query) as query:
+            result = self.toolset.retrieve_knowledge(["proxy settings", "embedding cache location"])
+
+        self.assertEqual(embed.call_count, 1)
+        self.assertEqual(query.call_count, 1)
+        self.assertEqual(self.toolset.reranker.predict.call_count, 1)
+        self.assertIn("### Query: proxy settings", result)
+        self.assertIn("### Query: embedding cache location", result)
+
+    def test_lexical_index_follows_collection(self):
+        """Лексический индекс переоткрывается, если коллекция сменилась в обход алиаса."""
+        with patch.object(config, "LEXICAL_INDEX_DIR", "data/test_retrieval_lexical"):
+            self.toolset.lexical_index = LexicalIndex(lexical_index_path("devmind_docs_old"))
+            self.toolset._refresh_collection()
+            self.assertEqual(self.toolset.lexical_index.path, lexical_index_path("test_retrieval"))
+        shutil.rmtree("data/test_retrieval_lexical", ignore_errors=True)
+
+    def test_chunks_are_not_repeated_across_queries(self):
+        """Один и тот же чанк возвращается только для первого запроса."""
+        with patch.object(tools, "cached_embeddings", side_effect=fake_embeddings), \
+             patch.object(tools, "get_score_cache", return_value=None):
+            result = self.toolset.retrieve_knowledge(["proxy", "proxy again"])
+
+        for doc in DOCS.values():
+            self.assertLessEqual(result.count(doc), 1)
+
+    def test_scope_filters_and_cites_sources(self):
+        """Фильтры по типу, тегу и пути сужают поиск, а результаты содержат ссылки на источники."""
+        with patch.object(tools, "cached_embeddings", return_value=[VECTORS["proxy"]]) as embed, \
+             patch.object(tools, "get_score_cache", return_value=None), \
+             patch.object(config, "DOCS_SOURCE_PATH", "./data/knowledge_base"):
+            unscoped = self.toolset.retrieve_knowledge("proxy")
+            by_type = self.toolset.retrieve_knowledge("proxy", doc_types=["pdf"])
+            by_tag = self.toolset.retrieve_knowledge("proxy", tags=["Network"])
+            with patch.object(self.toolset, "_indexed_sources", return_value=[m["source"] for m in METADATAS.values()]):
+                by_path = self.toolset.retrieve_knowledge("proxy", sources=["*.txt"])
+                no_match = self.toolset.retrieve_knowledge("proxy", sources=["kafka/**"])
+
+        self.assertIn("[Source: network/proxy.md]", unscoped)
+        self.assertEqual(by_type, f"[Source: storage/cache.pdf, page 2]\n{DOCS['cache']}")
+        self.assertNotIn(DOCS["cache"], by_tag)
+        self.assertNotIn(DOCS["logs"], by_tag)
+        self.assertEqual(by_path, f"[Source: logging.txt]\n{DOCS['logs']}")
+        self.assertIn("No indexed documents match", no_match)
+        # A single query uses the batch embedding path as well
+        embed.assert_called_with(["proxy"], model=self.toolset.embedding_model)
+
+class TestCascadeReranking(unittest.TestCase):
+
+    def setUp(self):
+        self.patches = [
+            patch.object(config, "CASCADE_MIN_CANDIDATES", 3),
+            patch.object(config, "CASCADE_MAX_CANDIDATES", 20),
+            patch.object(config, "RETRIEVAL_CANDIDATES", 6),
+            patch.object(config, "CASCADE_SKIP_MARGIN", 0.35),
+            patch.object(config, "CASCADE_SHORT_MARGIN", 0.2),
+            patch.object(config, "CASCADE_WIDE_SPREAD", 0.05),
+            patch.object(config, "RERANK_SCORE_THRESHOLD", 0.5),
+            patch.object(config, "RERANK_MIN_RESULTS", 1),
+            patch.object(config, "RERANK_MAX_RESULTS", 4),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_depth_follows_distance_gaps(self):
+        """Глубина реранкинга зависит от разрыва между расстояниями."""
+        self.assertEqual(cascade_plan([0.2, 0.9, 1.0, 1.0, 1.1, 1.2]), ("skip", 6))
+        # Lexical fusion put another chunk first, so the reranker must decide
+        self.assertEqual(cascade_plan([0.2, 0.9, 1.0, 1.0, 1.1, 1.2], vector_top_leads=False)[0], "short")
+        self.assertEqual(cascade_plan([0.5, 0.55, 0.6, 0.9, 1.0, 1.1]), ("short", 3))
+        self.assertEqual(cascade_plan([0.80, 0.81, 0.81, 0.82, 0.83, 0.83]), ("wide", 20))
+        self.assertEqual(cascade_plan([0.5, 0.55, 0.58, 0.6, 0.65, 0.7]), ("full", 6))
+
+    def test_result_count_follows_threshold(self):
+        """Число возвращаемых чанков определяется порогом оценки."""
+        ranked = ["a", "b", "c", "d", "e", "f"]
+        self.assertEqual(select_by_score(ranked, [0.9, 0.8, 0.2, 0.1, 0.0, 0.0]), ["a", "b"])
+        self.assertEqual(select_by_score(ranked, [0.1, 0.0, 0.0, 0.0, 0.0, 0.0]), ["a"])
+        self.assertEqual(select_by_score(ranked, [0.9] * 6), ["a", "b", "c", "d"])
+        self.assertEqual(select_by_score(ranked), ["a"])
+
+if __name__ == "__main__":
+    unittest.main()
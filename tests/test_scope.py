@@ -0,0 +1,50 @@
+import unittest
+from unittest.mock import patch
+from src.config import config
+from src.scope import build_where, format_citation, matching_sources, source_tags
+
+class TestScope(unittest.TestCase):
+
+    def setUp(self):
+        self.patch = patch.object(config, "DOCS_SOURCE_PATH", "./data/knowledge_base")
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_tags_follow_directory_layout(self):
+        """Теги берутся из каталогов относительно базы знаний."""
+        self.assertEqual(source_tags("./data/knowledge_base/Products/kafka/setup.md"), ["products", "kafka"])
+        self.assertEqual(source_tags("./data/knowledge_base/readme.md"), [])
+
+    def test_globs_match_relative_paths(self):
+        """Шаблоны путей сравниваются с путём относительно базы знаний."""
+        sources = [
+            "./data/knowledge_base/kafka/setup.md",
+            "./data/knowledge_base/kafka/errors.pdf",
+            "./data/knowledge_base/redis/setup.md",
+        ]
+        self.assertEqual(matching_sources(sources, ["kafka/*"]), sources[:2])
+        self.assertEqual(matching_sources(sources, ["*.pdf", "redis/*"]), sources[1:])
+        self.assertEqual(matching_sources(sources, ["nginx/*"]), [])
+
+    def test_where_clause(self):
+        """Фильтры разных видов объединяются через $and, теги одного вида — через $or."""
+        self.assertIsNone(build_where())
+        self.assertEqual(build_where(doc_types=[".PDF"]), {"doc_type": {"$in": ["pdf"]}})
+        self.assertEqual(
+            build_where(sources=["a.md"], tags=["Kafka", "redis"]),
+            {"$and": [
+                {"sources": {"$contains": "a.md"}},
+                {"$or": [{"tags": {"$contains": "kafka"}}, {"tags": {"$contains": "redis"}}]}
+            ]}
+        )
+
+    def test_citation(self):
+        """Ссылка на источник содержит путь, страницу и заголовок."""
+        metadata = {"source": "./data/knowledge_base/kafka/errors.pdf", "page": 3, "heading_path": "Errors > Timeouts"}
+        self.assertEqual(format_citation(metadata), "[Source: kafka/errors.pdf, page 3 > Errors > Timeouts]")
+        self.assertEqual(format_citation(None), "[Source: unknown]")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import os
+import shutil
+from unittest.mock import MagicMock, patch
+from src import tools
+from src.score_cache import ScoreCache, normalize_query
+from src.tools import ToolSet
+
+class TestScoreCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_score_cache"
+        self.cache = ScoreCache(os.path.join(self.test_dir, "scores.sqlite3"), max_entries=100)
+
+    def tearDown(self):
+        self.cache.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_normalized_queries_share_scores(self):
+        """Запросы, отличающиеся регистром и пробелами, попадают в одну запись."""
+        self.assertEqual(normalize_query("  How to  configure Proxy? "), "how to configure proxy")
+        self.cache.put_many("m", "How to configure proxy?", [("c1", "h1", 0.75)])
+        self.assertEqual(self.cache.get_many("m", "how to   configure proxy", ["h1", "h2"]), {"h1": 0.75})
+        self.assertEqual(self.cache.get_many("other-model", "how to configure proxy", ["h1"]), {})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_invalidate_and_evict(self):
+        """Удалённые при индексации чанки и старые записи вытесняются."""
+        self.cache.put_many("m", "q", [("c1", "h1", 1.0), ("c2", "h2", 2.0)])
+        self.cache.invalidate(["c1"])
+        self.assertEqual(self.cache.get_many("m", "q", ["h1", "h2"]), {"h2": 2.0})
+
+        self.cache.put_many("m", "q", [(f"x{i}", f"x{i}", float(i)) for i in range(300)])
+        self.assertLessEqual(self.cache.stats()["entries"], 100)
+
+    def test_retrieval_scores_only_uncached_pairs(self):
+        """Повторный запрос не отправляет в кросс-энкодер уже оценённые пары."""
+        toolset = ToolSet.__new__(ToolSet)
+        toolset.reranker = MagicMock()
+        toolset.reranker.predict.side_effect = lambda pairs: [float(len(doc)) for _, doc in pairs]
+        hits = [("c1", "short"), ("c2", "a longer text")]
+
+        with patch.object(tools, "get_score_cache", return_value=self.cache):
+            self.assertEqual(toolset._rerank_scores(["query"], [hits]), [[5.0, 13.0]])
+            hits.append(("c3", "new"))
+            self.assertEqual(toolset._rerank_scores(["Query?"], [hits]), [[5.0, 13.0, 3.0]])
+
+        self.assertEqual(toolset.reranker.predict.call_args_list[-1].args[0], [["Query?", "new"]])
+
+if __name__ == "__main__":
+    unittest.main()
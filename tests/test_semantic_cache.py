@@ -0,0 +1,37 @@
+import unittest
+from unittest.mock import patch
+from src.semantic_cache import SemanticCache
+
+class TestSemanticCache(unittest.TestCase):
+
+    def test_similar_query_hits(self):
+        """Перефразированный запрос с близким эмбеддингом получает сохранённый ответ."""
+        cache = SemanticCache(threshold=0.95, max_entries=10, ttl_seconds=60)
+        cache.put([1.0, 0.0, 0.1], "proxy docs", generation=("docs", 1.0))
+
+        self.assertEqual(cache.get([0.99, 0.0, 0.12], ("docs", 1.0)), "proxy docs")
+        self.assertIsNone(cache.get([0.0, 1.0, 0.0], ("docs", 1.0)))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_generation_change_invalidates(self):
+        """После переиндексации старые ответы не возвращаются."""
+        cache = SemanticCache(threshold=0.95, max_entries=10, ttl_seconds=60)
+        cache.put([1.0, 0.0], "old result", generation=("docs", 1.0))
+        self.assertIsNone(cache.get([1.0, 0.0], ("docs", 2.0)))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_ttl_and_size_eviction(self):
+        """Записи устаревают по TTL и вытесняются по размеру (LRU)."""
+        cache = SemanticCache(threshold=0.99, max_entries=2, ttl_seconds=60)
+        cache.put([1.0, 0.0, 0.0], "a", "g")
+        cache.put([0.0, 1.0, 0.0], "b", "g")
+        cache.get([1.0, 0.0, 0.0], "g")
+        cache.put([0.0, 0.0, 1.0], "c", "g")
+        self.assertEqual(cache.get([1.0, 0.0, 0.0], "g"), "a")
+        self.assertIsNone(cache.get([0.0, 1.0, 0.0], "g"))
+
+        with patch("src.semantic_cache.time.time", return_value=10 ** 12):
+            self.assertIsNone(cache.get([1.0, 0.0, 0.0], "g"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import asyncio
+import re
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from src import registry, agent as agent_module
+from src.agent import Agent
+
+def chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+def tool_delta(index, call_id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+async def fake_stream(chunks, delay=0.0):
+    for item in chunks:
+        await asyncio.sleep(delay)
+        yield item
+
+def answer_chunks(text):
+    return [chunk(content=word) for word in re.findall(r"\S+\s*", text)]
+
+def tool_call_chunks(call_id, name, args, index=0):
+    """One tool call split like a streamed response: id and name first, arguments in pieces."""
+    arguments = json.dumps(args)
+    middle = len(arguments) // 2
+    return [
+        chunk(tool_calls=[tool_delta(index, call_id, name, "")]),
+        chunk(tool_calls=[tool_delta(index, arguments=arguments[:middle])]),
+        chunk(tool_calls=[tool_delta(index, arguments=arguments[middle:])])
+    ]
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        registry.clear()
+        agent_module._llm_clients.clear()
+
+    def tearDown(self):
+        registry.clear()
+        agent_module._llm_clients.clear()
+
+    @patch("src.agent.AsyncOpenAI")
+    @patch("src.agent.ToolSet")
+    def test_tokens_and_tool_call_deltas(self, mock_toolset, mock_openai):
+        """Токены ответа приходят событиями token, фрагменты вызовов инструментов собираются по индексу."""
+        responses = [
+            tool_call_chunks("call1", "retrieve_knowledge", {"query": "kafka timeouts"})
+            + tool_call_chunks("call2", "web_search", {"query": "kafka"}, index=1),
+            answer_chunks("Increase the session timeout.")
+        ]
+
+        async def create(**kwargs):
+            self.assertTrue(kwargs["stream"])
+            return fake_stream(responses.pop(0))
+
+        mock_openai.return_value.chat.completions.create.side_effect = create
+        agent = Agent()
+        agent.tracker = MagicMock()
+
+        async def fake_tool(name, args):
+            return f"{name}: {args['query']}"
+        agent._execute_tool = fake_tool
+
+        events = []
+
+        async def callback(event, data):
+            events.append((event, data))
+
+        answer = asyncio.run(agent.run("Why does Kafka time out?", callback=callback))
+        self.assertEqual(answer, "Increase the session timeout.")
+        tokens = [data["text"] for event, data in events if event == "token"]
+        self.assertEqual(len(tokens), 4)
+        self.assertEqual("".join(tokens), answer)
+
+        tool_message = agent.history[2]
+        self.assertEqual(
+            [(call["id"], call["function"]["name"], json.loads(call["function"]["arguments"])) for call in tool_message["tool_calls"]],
+            [("call1", "retrieve_knowledge", {"query": "kafka timeouts"}), ("call2", "web_search", {"query": "kafka"})]
+        )
+        self.assertEqual([m["content"] for m in agent.history[3:5]], ["retrieve_knowledge: kafka timeouts", "web_search: kafka"])
+        self.assertEqual(agent.history[-1], {"role": "assistant", "content": answer})
+        self.assertEqual([event for event, _ in events if event != "token"], ["tool_start", "tool_end", "tool_start", "tool_end"])
+
+    @patch("src.agent.AsyncOpenAI")
+    def test_client_per_event_loop(self, mock_openai):
+        """Клиент LLM общий для агентов одного цикла событий и свой для каждого цикла."""
+        mock_openai.side_effect = lambda **kwargs: MagicMock()
+
+        async def clients():
+            return agent_module.get_llm_client(), agent_module.get_llm_client()
+
+        first, same = asyncio.run(clients())
+        second, _ = asyncio.run(clients())
+        self.assertIs(first, same)
+        self.assertIsNot(first, second)
+        # Clients of closed loops are dropped
+        self.assertEqual(len(agent_module._llm_clients), 1)
+
+if __name__ == "__main__":
+    unittest.main()
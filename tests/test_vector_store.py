@@ -0,0 +1,239 @@
+import unittest
+import os
+import shutil
+import zlib
+import chromadb
+import numpy as np
+from unittest.mock import patch
+from src import ingestion, vector_store
+from src.config import config
+from src.index_alias import live_collection_name
+from src.ingestion import IngestionPipeline, open_collection, finish_run
+from src.vector_store import FlatIndexClient, matches_where
+
+def fake_embeddings(texts, model=None):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+class TestFlatIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_vector_store"
+        self.client = FlatIndexClient(os.path.join(self.test_dir, "numpy"))
+        self.collection = self.client.get_or_create_collection(name="test_flat")
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(300, 16)).astype(np.float32)
+        self.ids = [f"chunk{i}" for i in range(300)]
+        self.metadatas = [{"source": f"doc{i % 3}.md", "chunk_index": i, "tags": [f"t{i % 2}"]} for i in range(300)]
+        self.collection.upsert(
+            ids=self.ids,
+            embeddings=self.vectors,
+            documents=[f"text {i}" for i in range(300)],
+            metadatas=self.metadatas
+        )
+
+    def tearDown(self):
+        self.client.delete_collection(name="test_flat")
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_query_matches_exact_search(self):
+        """Поиск совпадает с точным перебором в float32, формат ответа как у ChromaDB."""
+        queries = np.random.default_rng(1).normal(size=(4, 16)).astype(np.float32)
+        with patch.object(config, "NUMPY_SEARCH_BLOCK_ROWS", 64):
+            results = self.collection.query(query_embeddings=queries, n_results=10)
+
+        exact = ((queries[:, None, :] - self.vectors[None, :, :]) ** 2).sum(axis=2)
+        for i, ids in enumerate(results["ids"]):
+            expected = [self.ids[j] for j in np.argsort(exact[i])[:10]]
+            self.assertEqual(len(set(ids) & set(expected)), 10)
+            self.assertTrue(np.allclose(results["distances"][i], np.sort(exact[i])[:10], rtol=1e-2, atol=1e-2))
+        self.assertEqual(results["documents"][0][0], f"text {self.ids.index(results['ids'][0][0])}")
+        self.assertEqual(results["metadatas"][0][0]["source"][:3], "doc")
+
+    def test_where_filters(self):
+        """Фильтры where работают так же, как в ChromaDB."""
+        where = {"$and": [{"source": {"$in": ["doc1.md"]}}, {"tags": {"$contains": "t0"}}]}
+        results = self.collection.query(query_embeddings=self.vectors[:1], n_results=5, where=where)
+        for metadata in results["metadatas"][0]:
+            self.assertEqual(metadata["source"], "doc1.md")
+            self.assertIn("t0", metadata["tags"])
+
+        chroma = chromadb.EphemeralClient().get_or_create_collection(name="test_flat_where")
+        try:
+            chroma.add(ids=self.ids, embeddings=self.vectors, metadatas=self.metadatas)
+            for clause in (where, {"chunk_index": {"$gte": 290}}, {"$or": [{"source": "doc0.md"}, {"chunk_index": 1}]}):
+                self.assertEqual(
+                    sorted(self.collection.get(where=clause)["ids"]),
+                    sorted(chroma.get(where=clause)["ids"])
+                )
+        finally:
+            chromadb.EphemeralClient().delete_collection(name="test_flat_where")
+        self.assertFalse(matches_where({"page": None}, {"page": {"$gt": 1}}))
+
+    def test_upsert_delete_and_reopen(self):
+        """Обновления, удаления и уплотнение видны и после повторного открытия."""
+        self.collection.upsert(ids=["chunk0"], embeddings=[self.vectors[1]], documents=["moved"])
+        with patch.object(vector_store, "INITIAL_CAPACITY", 16):
+            self.collection.delete(ids=self.ids[100:])
+        self.assertEqual(self.collection.count(), 100)
+        # Dead rows outnumbered live ones, so the matrix was rewritten
+        self.assertEqual(self.collection.next_row, 100)
+
+        # A second client (another process) sees the committed state
+        other = FlatIndexClient(os.path.join(self.test_dir, "numpy")).get_collection(name="test_flat")
+        self.assertEqual(other.count(), 100)
+        stored = other.get(ids=["chunk0", "chunk150"], include=["documents", "embeddings"])
+        self.assertEqual(stored["ids"], ["chunk0"])
+        self.assertEqual(stored["documents"], ["moved"])
+        self.assertTrue(np.allclose(stored["embeddings"][0], self.vectors[1], atol=1e-2))
+        result = other.query(query_embeddings=[self.vectors[5]], n_results=1, include=["distances"])
+        self.assertEqual(result["ids"], [["chunk5"]])
+        self.assertLess(result["distances"][0][0], 1e-3)
+
+        self.collection.upsert(ids=["new"], embeddings=[self.vectors[7]])
+        self.assertEqual(other.count(), 101)
+        self.assertEqual(sorted(self.client.list_collections()), ["test_flat"])
+
+    def test_int8_with_rescoring(self):
+        """int8-хранилище в 4 раза меньше float32, а дооценка по оригиналам возвращает точные расстояния."""
+        queries = np.random.default_rng(2).normal(size=(20, 16)).astype(np.float32)
+        exact = ((queries[:, None, :] - self.vectors[None, :, :]) ** 2).sum(axis=2)
+        recalls = {}
+        for rescore in (False, True):
+            with patch.object(config, "NUMPY_STORE_DTYPE", "int8"), \
+                 patch.object(config, "NUMPY_RESCORE_ENABLED", rescore):
+                collection = self.client.get_or_create_collection(name=f"test_int8_{rescore}")
+            collection.upsert(ids=self.ids, embeddings=self.vectors)
+            self.assertEqual(collection.quantization, "int8")
+            sizes = collection.storage_bytes()
+            self.assertEqual(sizes["vectors"], self.vectors.size)
+            self.assertEqual("full" in sizes, rescore)
+
+            results = collection.query(query_embeddings=queries, n_results=10, include=["distances"])
+            found = [{int(i[5:]) for i in ids} for ids in results["ids"]]
+            truth = [set(np.argsort(row)[:10]) for row in exact]
+            recalls[rescore] = np.mean([len(f & t) / 10 for f, t in zip(found, truth)])
+            if rescore:
+                for i, ids in enumerate(results["ids"]):
+                    expected = [exact[i][int(chunk_id[5:])] for chunk_id in ids]
+                    self.assertTrue(np.allclose(results["distances"][i], expected, rtol=1e-4, atol=1e-4))
+            self.client.delete_collection(name=f"test_int8_{rescore}")
+        self.assertGreaterEqual(recalls[False], 0.8)
+        self.assertEqual(recalls[True], 1.0)
+
+    def test_update_merges_metadata(self):
+        """update меняет документ и сливает метаданные, как ChromaDB; неизвестные id пропускаются."""
+        self.collection.get(where={"source": "doc0.md"})
+        self.collection.update(
+            ids=["chunk0", "missing"],
+            metadatas=[{"source": "moved.md", "tags": None}, {"source": "x.md"}],
+            documents=["new text", "y"]
+        )
+        stored = self.collection.get(ids=["chunk0"])
+        self.assertEqual(stored["documents"], ["new text"])
+        self.assertEqual(stored["metadatas"], [{"source": "moved.md", "chunk_index": 0}])
+        self.assertEqual(self.collection.get(where={"source": "moved.md"})["ids"], ["chunk0"])
+        self.assertNotIn("chunk0", self.collection.get(where={"source": "doc0.md"})["ids"])
+        self.assertEqual(self.collection.count(), 300)
+
+        self.collection.update(ids=["chunk1"], embeddings=[self.vectors[2]])
+        result = self.collection.query(query_embeddings=[self.vectors[2]], n_results=2, include=["metadatas"])
+        self.assertEqual(sorted(result["ids"][0]), ["chunk1", "chunk2"])
+        self.assertEqual(self.collection.get(ids=["chunk1"])["metadatas"][0]["chunk_index"], 1)
+
+    def test_encoding_is_fixed_at_creation(self):
+        """Кодировка коллекции не меняется при смене настроек."""
+        with patch.object(config, "NUMPY_STORE_DTYPE", "int8"):
+            reopened = FlatIndexClient(os.path.join(self.test_dir, "numpy")).get_collection(name="test_flat")
+        self.assertEqual(reopened.quantization, "float16")
+
+class TestFlatIndexIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_vector_store_ingest"
+        self.docs_dir = os.path.join(self.test_dir, "docs")
+        os.makedirs(self.docs_dir, exist_ok=True)
+        for i in range(3):
+            with open(os.path.join(self.docs_dir, f"doc{i}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# Doc {i}\n\nContent number {i} " + "word " * (10 * (i + 1)))
+
+        self.client = FlatIndexClient(os.path.join(self.test_dir, "numpy"))
+        self.patches = [
+            patch.object(config, "INDEX_ALIAS_PATH", os.path.join(self.test_dir, "alias.json")),
+            patch.object(config, "INGEST_MANIFEST_PATH", os.path.join(self.test_dir, "manifest.json")),
+            patch.object(config, "LEXICAL_INDEX_DIR", os.path.join(self.test_dir, "lexical")),
+            patch.object(ingestion, "cached_embeddings", side_effect=fake_embeddings)
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_rebuild_publishes_flat_collection(self):
+        """Полная переиндексация в NumPy-хранилище проходит проверку и становится живым индексом."""
+        client, collection, manifest = open_collection(full=True, model="test-model", client=self.client)
+        IngestionPipeline(collection, manifest, model="test-model", workers=0).run(
+            ingestion.scan_documents(self.docs_dir)
+        )
+        live = finish_run(client, collection, manifest, completed=True)
+
+        self.assertEqual(live_collection_name(), collection.name)
+        self.assertEqual(live.count(), manifest.chunk_count())
+        hits = live.query(query_embeddings=fake_embeddings(["x" * 40]), n_results=1)
+        self.assertEqual(len(hits["ids"][0]), 1)
+
+    def test_int8_rebuild_without_rescoring_publishes(self):
+        """Пересборка в int8 без дооценки проходит проверку, хотя расстояние вектора до себя не нулевое."""
+        def random_embeddings(texts, model=None):
+            return [np.random.default_rng(zlib.crc32(text.encode())).normal(size=32).tolist() for text in texts]
+
+        with patch.object(config, "NUMPY_STORE_DTYPE", "int8"), patch.object(config, "NUMPY_RESCORE_ENABLED", False):
+            client, collection, manifest = open_collection(full=True, model="test-model", client=self.client)
+        with patch.object(ingestion, "cached_embeddings", side_effect=random_embeddings):
+            IngestionPipeline(collection, manifest, model="test-model", workers=0).run(
+                ingestion.scan_documents(self.docs_dir)
+            )
+        self.assertEqual(collection.quantization, "int8")
+        stored = collection.get(include=["embeddings"])
+        self_distances = collection.query(query_embeddings=stored["embeddings"], n_results=1, include=["distances"])
+        self.assertGreater(max(d[0] for d in self_distances["distances"]), 1e-3)
+
+        live = finish_run(client, collection, manifest, completed=True)
+        self.assertEqual(live.name, collection.name)
+        self.assertEqual(live_collection_name(), collection.name)
+
+    def test_incremental_run_after_edit(self):
+        """Повторная индексация изменённого файла в NumPy-хранилище обновляет неизменённые чанки без ошибок."""
+        path = os.path.join(self.docs_dir, "long.md")
+        sections = [f"## Part {i}\n\n" + f"Paragraph {i} explains setting {i}. " * 40 for i in range(3)]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(sections))
+
+        def ingest():
+            client, collection, manifest = open_collection(model="test-model", client=self.client)
+            stats = IngestionPipeline(collection, manifest, model="test-model", workers=0).run(
+                ingestion.scan_documents(self.docs_dir)
+            )
+            finish_run(client, collection, manifest, completed=True)
+            return stats, collection, manifest
+
+        with patch.object(config, "CHUNK_MAX_TOKENS", 200):
+            ingest()
+            # A new first part moves the unchanged chunks, whose metadata is updated in place
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(["## Intro\n\n" + "New introduction text. " * 40] + sections))
+            stats, collection, manifest = ingest()
+
+        self.assertEqual(stats["failed"], 0)
+        self.assertEqual(stats["updated"], 1)
+        source = [f for f in manifest.files if f.endswith("long.md")][0]
+        stored = collection.get(where={"source": source})
+        self.assertEqual(sorted(stored["ids"]), sorted(manifest.chunk_ids(source)))
+        by_index = {m["chunk_index"]: d for d, m in zip(stored["documents"], stored["metadatas"])}
+        self.assertIn("New introduction", by_index[0])
+        self.assertIn("Paragraph 2", by_index[max(by_index)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import time
+import shutil
+import threading
+import chromadb
+from unittest.mock import patch
+from src import ingestion
+from src.manifest import IngestManifest
+from src.watcher import KnowledgeBaseWatcher
+
+def fake_embeddings(texts, model=None):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "data/test_watcher"
+        self.docs_dir = os.path.join(self.test_dir, "docs")
+        os.makedirs(self.docs_dir, exist_ok=True)
+        self.doc_path = os.path.join(self.docs_dir, "doc.md")
+        with open(self.doc_path, "w", encoding="utf-8") as f:
+            f.write("# Doc\n\nFirst version.")
+
+        self.collection = chromadb.EphemeralClient().get_or_create_collection(name="test_watcher")
+        self.manifest = IngestManifest(os.path.join(self.test_dir, "manifest.json"))
+        self.manifest.reset("test-model")
+        self.embed_patch = patch.object(ingestion, "cached_embeddings", side_effect=fake_embeddings)
+        self.embed_patch.start()
+
+    def tearDown(self):
+        self.embed_patch.stop()
+        chromadb.EphemeralClient().delete_collection(name="test_watcher")
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _watcher(self, **options):
+        return KnowledgeBaseWatcher(
+            path=self.docs_dir, collection=self.collection, manifest=self.manifest,
+            model="test-model", workers=0, **options
+        )
+
+    def test_debounce(self):
+        """Файл синхронизируется только после паузы в событиях."""
+        watcher = self._watcher(debounce=0.2)
+        watcher.mark(self.doc_path)
+        watcher.mark(self.doc_path)
+        watcher.mark(os.path.join(self.docs_dir, "image.png"))
+        self.assertEqual(watcher.status()["queue_depth"], 1)
+        self.assertEqual(watcher._due(), [])
+        time.sleep(0.3)
+        self.assertEqual([path for path, _ in watcher._due()], [self.doc_path])
+
+    def test_sync_removed_file(self):
+        """Чанки удалённого файла удаляются из коллекции."""
+        watcher = self._watcher()
+        watcher.initial_sync()
+        self.assertGreater(self.collection.count(), 0)
+
+        os.remove(self.doc_path)
+        watcher.sync([self.doc_path])
+        self.assertEqual(self.collection.count(), 0)
+        self.assertIsNone(self.manifest.get(self.doc_path))
+
+    def test_polling_picks_up_changes(self):
+        """В режиме опроса изменения подхватываются автоматически."""
+        watcher = self._watcher(debounce=0.1, poll_interval=0.1, force_polling=True)
+        thread = threading.Thread(target=watcher.run, daemon=True)
+        thread.start()
+        try:
+            time.sleep(0.5)
+            new_path = os.path.join(self.docs_dir, "new.md")
+            with open(new_path, "w", encoding="utf-8") as f:
+                f.write("# New\n\nAdded while watching.")
+
+            deadline = time.time() + 5
+            while time.time() < deadline and not self.manifest.get(new_path):
+                time.sleep(0.1)
+            self.assertIsNotNone(self.manifest.get(new_path))
+            self.assertIsNotNone(watcher.status()["last_sync"])
+        finally:
+            watcher.stop()
+            thread.join(timeout=5)
+
+if __name__ == "__main__":
+    unittest.main()